@@ -1,3 +1,5 @@
+import os
+
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -11,6 +13,10 @@ from src.backend_streaming.providers.opta.infra.models import Base
 # access to the values within the .ini file in use.
 config = context.config
 
+# the app's database (DATABASE_URL) wins over sqlalchemy.url of alembic.ini
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
@@ -0,0 +1,99 @@
+"""player_match_stats / player_season_stats, incrementally maintained from match_projection
+
+Revision ID: 2e6a9c4f1b83
+Revises: 9d3a7b2c4e61
+Create Date: 2025-03-19 11:04:52.208316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e6a9c4f1b83'
+down_revision: Union[str, None] = '9d3a7b2c4e61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# same as domain.player_stats.STAT_COLUMNS
+STAT_COLUMNS = (
+    'events', 'passes', 'passes_completed', 'shots', 'shots_on_target', 'goals', 'own_goals',
+    'tackles', 'tackles_won', 'interceptions', 'aerials', 'aerials_won', 'take_ons', 'take_ons_won',
+    'duels', 'duels_won',
+)
+
+# the rules of domain.player_stats.event_stats in SQL (at the time of writing), for the backfill
+OWN_GOAL = """coalesce(qualifiers @> '[{"qualifierId": 28}]', false)"""
+BLOCKED = """coalesce(qualifiers @> '[{"qualifierId": 82}]', false)"""
+STAT_FILTERS = {
+    'events': 'true',
+    'passes': 'type_id = 1',
+    'passes_completed': 'type_id = 1 AND outcome = 1',
+    'shots': f'type_id IN (13, 14, 15) OR (type_id = 16 AND NOT {OWN_GOAL})',
+    'shots_on_target': f'(type_id = 15 AND NOT {BLOCKED}) OR (type_id = 16 AND NOT {OWN_GOAL})',
+    'goals': f'type_id = 16 AND NOT {OWN_GOAL}',
+    'own_goals': f'type_id = 16 AND {OWN_GOAL}',
+    'tackles': 'type_id = 7',
+    'tackles_won': 'type_id = 7 AND outcome = 1',
+    'interceptions': 'type_id = 8',
+    'aerials': 'type_id = 44',
+    'aerials_won': 'type_id = 44 AND outcome = 1',
+    'take_ons': 'type_id = 3',
+    'take_ons_won': 'type_id = 3 AND outcome = 1',
+    'duels': 'type_id IN (3, 7, 44, 45)',
+    'duels_won': 'type_id IN (3, 7, 44) AND outcome = 1',
+}
+
+
+def _stat_columns():
+    return [sa.Column(name, sa.Integer(), nullable=False, server_default='0') for name in STAT_COLUMNS]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'match_tournaments',
+        sa.Column('match_id', sa.String(), nullable=False),
+        sa.Column('tournament_id', sa.String(), nullable=False),
+        sa.Column('competition_id', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('match_id'),
+    )
+    op.create_index('ix_match_tournaments_tournament_id', 'match_tournaments', ['tournament_id'])
+    op.create_table(
+        'player_match_stats',
+        sa.Column('match_id', sa.String(), nullable=False),
+        sa.Column('player_id', sa.String(), nullable=False),
+        sa.Column('contestant_id', sa.String(), nullable=True),
+        sa.Column('updated_on', sa.DateTime(), nullable=False),
+        *_stat_columns(),
+        sa.PrimaryKeyConstraint('match_id', 'player_id'),
+    )
+    op.create_table(
+        'player_season_stats',
+        sa.Column('tournament_id', sa.String(), nullable=False),
+        sa.Column('player_id', sa.String(), nullable=False),
+        sa.Column('matches', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_on', sa.DateTime(), nullable=False),
+        *_stat_columns(),
+        sa.PrimaryKeyConstraint('tournament_id', 'player_id'),
+    )
+
+    # backfill from the current projections (no season yet: match_tournaments is filled by the fixtures)
+    counts = ', '.join(f'count(*) FILTER (WHERE {condition})' for condition in STAT_FILTERS.values())
+    op.execute(
+        f"INSERT INTO player_match_stats (match_id, player_id, contestant_id, updated_on, {', '.join(STAT_FILTERS)}) "
+        f"SELECT match_id, player_id, max(contestant_id), now() AT TIME ZONE 'utc', {counts} "
+        "FROM match_projection WHERE player_id IS NOT NULL AND type_id IS DISTINCT FROM 43 "
+        "GROUP BY match_id, player_id"
+    )
+    # NOTE: after the backfill (faster than maintaining it row by row)
+    op.create_index('ix_player_match_stats_player_match', 'player_match_stats', ['player_id', 'match_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('player_season_stats')
+    op.drop_index('ix_player_match_stats_player_match', table_name='player_match_stats')
+    op.drop_table('player_match_stats')
+    op.drop_index('ix_match_tournaments_tournament_id', table_name='match_tournaments')
+    op.drop_table('match_tournaments')
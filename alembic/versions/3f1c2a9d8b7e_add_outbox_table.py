@@ -0,0 +1,47 @@
+"""add outbox table
+
+Revision ID: 3f1c2a9d8b7e
+Revises: e5d72e401bc2
+Create Date: 2025-03-10 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d8b7e'
+down_revision: Union[str, None] = 'e5d72e401bc2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('aggregate_id', sa.String(), nullable=False),
+        sa.Column('exchange', sa.String(), nullable=False),
+        sa.Column('routing_key', sa.String(), nullable=False),
+        sa.Column('body', sa.LargeBinary(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=True),
+        sa.Column('content_encoding', sa.String(), nullable=True),
+        sa.Column('headers', sa.JSON(), nullable=True),
+        sa.Column('freshness', sa.JSON(), nullable=True),
+        sa.Column('created_on', sa.DateTime(), nullable=False),
+        sa.Column('published_on', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    # partial index: the relay only scans unpublished rows
+    op.create_index(
+        'ix_outbox_unpublished', 'outbox', ['id'],
+        postgresql_where=sa.text('published_on IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_unpublished', table_name='outbox')
+    op.drop_table('outbox')
@@ -0,0 +1,58 @@
+"""id_mappings: WhoScored -> Opta ids, imported from the mapping json files
+
+Revision ID: 4c8f2a6d1e37
+Revises: 2e6a9c4f1b83
+Create Date: 2025-03-24 16:21:07.540912
+
+"""
+import json
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend_streaming.providers.whoscored.infra.config.config import get_paths
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8f2a6d1e37'
+down_revision: Union[str, None] = '2e6a9c4f1b83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# kind -> json file of the mappings directory, read by FileRepository until this revision
+MAPPING_FILES = {
+    'player': 'player_ids.json',
+    'team': 'team_ids.json',
+    'match': 'ws_to_opta_match_ids.json',
+    'competition': 'competition_ids.json',
+    'tournament': 'tournament_ids.json',
+}
+
+
+def upgrade() -> None:
+    id_mappings = op.create_table(
+        'id_mappings',
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('source_id', sa.String(), nullable=False),
+        sa.Column('target_id', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('kind', 'source_id'),
+        sa.UniqueConstraint('kind', 'target_id', name='uq_id_mappings_kind_target'),
+    )
+
+    mappings_dir = get_paths().mappings_dir
+    for kind, file_name in MAPPING_FILES.items():
+        path = mappings_dir / file_name
+        if not path.exists():
+            continue
+        with open(path) as f:
+            mapping = json.load(f)
+        rows = [{'kind': kind, 'source_id': str(source), 'target_id': str(target)} for source, target in mapping.items()]
+        if rows:
+            op.bulk_insert(id_mappings, rows)
+
+
+def downgrade() -> None:
+    op.drop_table('id_mappings')
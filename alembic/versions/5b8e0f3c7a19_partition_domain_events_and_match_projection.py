@@ -0,0 +1,151 @@
+"""partition domain_events and match_projection by match id
+
+Revision ID: 5b8e0f3c7a19
+Revises: c7e19b3a5d24
+Create Date: 2025-03-17 10:12:31.402718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e0f3c7a19'
+down_revision: Union[str, None] = 'c7e19b3a5d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# same as models.HASH_PARTITIONS (changing it later means repartitioning)
+PARTITIONS = 16
+
+DOMAIN_EVENT_COLUMNS = 'domain_event_id, aggregate_id, event_type, occurred_on, payload'
+MATCH_PROJECTION_COLUMNS = (
+    'match_id, event_id, local_event_id, type_id, period_id, time_min, time_sec, player_id, contestant_id, '
+    'player_name, outcome, x, y, qualifiers, time_stamp, last_modified, version'
+)
+
+
+def _domain_events_columns():
+    return [
+        sa.Column('domain_event_id', sa.String(), nullable=False),
+        sa.Column('aggregate_id', sa.String(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('occurred_on', sa.DateTime(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+    ]
+
+
+def _match_projection_columns():
+    return [
+        sa.Column('match_id', sa.String(), nullable=False),
+        sa.Column('event_id', sa.BigInteger(), nullable=False),
+        sa.Column('local_event_id', sa.Integer(), nullable=True),
+        sa.Column('type_id', sa.Integer(), nullable=True),
+        sa.Column('period_id', sa.Integer(), nullable=True),
+        sa.Column('time_min', sa.Integer(), nullable=True),
+        sa.Column('time_sec', sa.Integer(), nullable=True),
+        sa.Column('player_id', sa.String(), nullable=True),
+        sa.Column('contestant_id', sa.String(), nullable=True),
+        sa.Column('player_name', sa.String(), nullable=True),
+        sa.Column('outcome', sa.Integer(), nullable=True),
+        sa.Column('x', sa.Float(), nullable=True),
+        sa.Column('y', sa.Float(), nullable=True),
+        sa.Column('qualifiers', sa.JSON(), nullable=True),
+        sa.Column('time_stamp', sa.String(), nullable=True),
+        sa.Column('last_modified', sa.String(), nullable=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['player_id'], ['players.player_id']),
+        sa.ForeignKeyConstraint(['contestant_id'], ['teams.team_id']),
+    ]
+
+
+def _set_aside(table: str) -> str:
+    """Rename a table (and its primary key, whose index name must stay unique) out of the way."""
+    old = f'{table}_old'
+    op.rename_table(table, old)
+    op.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey')
+    return old
+
+
+def _create_partitions(table: str):
+    for i in range(PARTITIONS):
+        op.execute(
+            f'CREATE TABLE {table}_p{i} PARTITION OF {table} '
+            f'FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i})'
+        )
+
+
+def _copy(source: str, target: str, columns: str):
+    op.execute(f'INSERT INTO {target} ({columns}) SELECT {columns} FROM {source}')
+
+
+def upgrade() -> None:
+    # domain_events: hash partitioned by match (aggregate) id, PK (aggregate_id, domain_event_id)
+    op.drop_index('ix_domain_events_aggregate_id', table_name='domain_events')
+    old = _set_aside('domain_events')
+    op.create_table(
+        'domain_events',
+        *_domain_events_columns(),
+        sa.PrimaryKeyConstraint('aggregate_id', 'domain_event_id'),
+        postgresql_partition_by='HASH (aggregate_id)',
+    )
+    _create_partitions('domain_events')
+    _copy(old, 'domain_events', DOMAIN_EVENT_COLUMNS)
+    op.drop_table(old)
+    # NOTE: indexes are created after the copy (faster than maintaining them row by row)
+    op.create_index('ix_domain_events_aggregate_occurred', 'domain_events', ['aggregate_id', 'occurred_on'])
+
+    # match_projection: hash partitioned by match id, PK (match_id, event_id)
+    op.drop_index('ix_match_projection_match_id', table_name='match_projection')
+    op.drop_index('ix_match_projection_match_version_event', table_name='match_projection')
+    old = _set_aside('match_projection')
+    op.create_table(
+        'match_projection',
+        *_match_projection_columns(),
+        sa.PrimaryKeyConstraint('match_id', 'event_id'),
+        postgresql_partition_by='HASH (match_id)',
+    )
+    _create_partitions('match_projection')
+    _copy(old, 'match_projection', MATCH_PROJECTION_COLUMNS)
+    op.drop_table(old)
+    op.create_index(
+        'ix_match_projection_match_version_event', 'match_projection', ['match_id', 'version', 'event_id']
+    )
+    op.create_index(
+        'ix_match_projection_match_timeline', 'match_projection', ['match_id', 'period_id', 'time_min', 'time_sec'],
+        postgresql_include=['type_id', 'player_id'],
+    )
+    op.create_index('ix_match_projection_event_id', 'match_projection', ['event_id'])
+
+
+def downgrade() -> None:
+    # NOTE: fails if the same event_id was stored for two matches (only unique per match after upgrade)
+    op.drop_index('ix_match_projection_event_id', table_name='match_projection')
+    op.drop_index('ix_match_projection_match_timeline', table_name='match_projection')
+    op.drop_index('ix_match_projection_match_version_event', table_name='match_projection')
+    old = _set_aside('match_projection')
+    op.create_table(
+        'match_projection',
+        *_match_projection_columns(),
+        sa.PrimaryKeyConstraint('event_id'),
+    )
+    _copy(old, 'match_projection', MATCH_PROJECTION_COLUMNS)
+    # drops the partitions too
+    op.drop_table(old)
+    op.create_index('ix_match_projection_match_id', 'match_projection', ['match_id'])
+    op.create_index(
+        'ix_match_projection_match_version_event', 'match_projection', ['match_id', 'version', 'event_id']
+    )
+
+    op.drop_index('ix_domain_events_aggregate_occurred', table_name='domain_events')
+    old = _set_aside('domain_events')
+    op.create_table(
+        'domain_events',
+        *_domain_events_columns(),
+        sa.PrimaryKeyConstraint('domain_event_id'),
+    )
+    _copy(old, 'domain_events', DOMAIN_EVENT_COLUMNS)
+    op.drop_table(old)
+    op.create_index('ix_domain_events_aggregate_id', 'domain_events', ['aggregate_id'])
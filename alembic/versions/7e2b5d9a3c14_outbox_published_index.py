@@ -0,0 +1,29 @@
+"""outbox: index of the published rows, purged by the relay after their retention
+
+Revision ID: 7e2b5d9a3c14
+Revises: 4c8f2a6d1e37
+Create Date: 2025-03-26 09:40:12.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2b5d9a3c14'
+down_revision: Union[str, None] = '4c8f2a6d1e37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_outbox_published_on', 'outbox', ['published_on'],
+        postgresql_where=sa.text('published_on IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_published_on', table_name='outbox')
@@ -0,0 +1,37 @@
+"""add match_projection_version table
+
+Revision ID: 8a4d6c1e2f90
+Revises: 3f1c2a9d8b7e
+Create Date: 2025-03-12 09:41:07.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4d6c1e2f90'
+down_revision: Union[str, None] = '3f1c2a9d8b7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'match_projection_version',
+        sa.Column('match_id', sa.String(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('updated_on', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('match_id'),
+    )
+    # matches that already have projections start at version 1
+    op.execute(
+        "INSERT INTO match_projection_version (match_id, version, updated_on) "
+        "SELECT DISTINCT match_id, 1, now() FROM match_projection"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('match_projection_version')
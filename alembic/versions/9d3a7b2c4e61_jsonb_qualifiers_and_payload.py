@@ -0,0 +1,50 @@
+"""jsonb qualifiers / payload with gin and feed_event_id indexes
+
+Revision ID: 9d3a7b2c4e61
+Revises: 5b8e0f3c7a19
+Create Date: 2025-03-18 15:27:09.551043
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3a7b2c4e61'
+down_revision: Union[str, None] = '5b8e0f3c7a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NOTE: rewrites both tables (on the partitioned parents, so every partition follows)
+    op.alter_column(
+        'match_projection', 'qualifiers',
+        type_=postgresql.JSONB(), existing_type=sa.JSON(), postgresql_using='qualifiers::jsonb',
+    )
+    op.alter_column(
+        'domain_events', 'payload',
+        type_=postgresql.JSONB(), existing_type=sa.JSON(), existing_nullable=False, postgresql_using='payload::jsonb',
+    )
+    # jsonb_path_ops: smaller and faster than the default opclass, and containment (@>) is all we query
+    op.create_index(
+        'ix_match_projection_qualifiers', 'match_projection', ['qualifiers'],
+        postgresql_using='gin', postgresql_ops={'qualifiers': 'jsonb_path_ops'},
+    )
+    op.create_index('ix_domain_events_feed_event_id', 'domain_events', [sa.text("(payload ->> 'feed_event_id')")])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_domain_events_feed_event_id', table_name='domain_events')
+    op.drop_index('ix_match_projection_qualifiers', table_name='match_projection')
+    op.alter_column(
+        'domain_events', 'payload',
+        type_=sa.JSON(), existing_type=postgresql.JSONB(), existing_nullable=False, postgresql_using='payload::json',
+    )
+    op.alter_column(
+        'match_projection', 'qualifiers',
+        type_=sa.JSON(), existing_type=postgresql.JSONB(), postgresql_using='qualifiers::json',
+    )
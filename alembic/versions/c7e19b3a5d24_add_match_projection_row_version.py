@@ -0,0 +1,36 @@
+"""add version to match_projection
+
+Revision ID: c7e19b3a5d24
+Revises: 8a4d6c1e2f90
+Create Date: 2025-03-13 16:02:44.930512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e19b3a5d24'
+down_revision: Union[str, None] = '8a4d6c1e2f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # existing rows start at version 0, i.e. before any cursor handed out by the API
+    op.add_column(
+        'match_projection',
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.create_index(
+        'ix_match_projection_match_version_event',
+        'match_projection',
+        ['match_id', 'version', 'event_id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_match_projection_match_version_event', table_name='match_projection')
+    op.drop_column('match_projection', 'version')
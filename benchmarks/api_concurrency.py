@@ -0,0 +1,164 @@
+"""
+Concurrent request throughput of the API, blocking handlers vs async / offloaded ones.
+
+Starts the API in-process on a throwaway sqlite database (aiosqlite for the async session) and
+adds the pre-async versions of the handlers under /bench/blocking, i.e. `async def` handlers that
+call sync code directly on the event loop. Two workloads, each run before / after:
+    db    GET get_events_since: sync SQLAlchemy session vs AsyncSession dependency
+    sync  `--work-ms` of blocking work per request (stands in for the scraper / process_fixtures /
+          file I/O): called inline vs offloaded to the bounded sync pool
+While the load runs, a probe hits /health every 50 ms: its latency is how long any other request
+waits for the event loop.
+
+    python benchmarks/api_concurrency.py --concurrency 50 --duration 5
+    DATABASE_URL=postgresql://... python benchmarks/api_concurrency.py   # same, on Postgres
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+import aiohttp
+
+from codec_sizes import make_match_state
+
+MATCH_ID = 'bench_match'
+
+
+def add_blocking_routes(app, work_ms: float):
+    from fastapi import APIRouter
+    from backend_streaming.config.executor import sync_executor
+    from backend_streaming.providers.whoscored.infra.api_routes.all_routes import match_events_cache
+
+    router = APIRouter()
+
+    @router.get("/blocking/get_events_since")
+    async def blocking_events_since(game_id: str, limit: int = 500):
+        # the handler as it was: sync session on the event loop
+        return {"events": match_events_cache.repo.get_events_since(game_id, limit=limit)}
+
+    @router.get("/blocking/sync_work")
+    async def blocking_sync_work():
+        time.sleep(work_ms / 1000)
+        return {}
+
+    @router.get("/offloaded/sync_work")
+    async def offloaded_sync_work():
+        await sync_executor.run(time.sleep, work_ms / 1000)
+        return {}
+
+    app.include_router(router, prefix="/bench")
+
+
+def seed(n_events: int):
+    from backend_streaming.providers.opta.infra.db import get_session, init_db
+    from backend_streaming.providers.opta.infra.models import MatchProjectionModel
+
+    init_db()
+    columns = set(MatchProjectionModel.__table__.columns.keys())
+    session = get_session()
+    try:
+        session.query(MatchProjectionModel).filter_by(match_id=MATCH_ID).delete()
+        for row in make_match_state(n_events):
+            values = {key: value for key, value in row.items() if key in columns}
+            session.add(MatchProjectionModel(**{**values, 'match_id': MATCH_ID, 'version': 1}))
+        session.commit()
+    finally:
+        session.close()
+
+
+async def load(session: aiohttp.ClientSession, url: str, concurrency: int, duration: float, health_url: str):
+    latencies, probes, errors = [], [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    async def probe():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            async with session.get(health_url) as response:
+                await response.read()
+            probes.append(time.perf_counter() - start)
+            await asyncio.sleep(0.05)
+
+    await asyncio.gather(probe(), *(client() for _ in range(concurrency)))
+    return latencies, probes, errors
+
+
+def percentile(values, q: float) -> float:
+    """Nearest rank percentile in ms (the health probe may only get a handful of samples)."""
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))] * 1000
+
+
+async def run(args):
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/api_concurrency.db"
+    os.environ.setdefault('SYNC_WORKERS', str(args.workers))
+    import uvicorn
+    from backend_streaming.main import app
+
+    seed(args.events)
+    add_blocking_routes(app, args.work_ms)
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=args.port, log_level='warning', timeout_graceful_shutdown=1))
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    cases = [
+        ('db', 'blocking', f"{base_url}/bench/blocking/get_events_since?game_id={MATCH_ID}&limit={args.limit}"),
+        ('db', 'async', f"{base_url}/streaming/get_events_since?game_id={MATCH_ID}&limit={args.limit}"),
+        ('sync', 'blocking', f"{base_url}/bench/blocking/sync_work"),
+        ('sync', 'offloaded', f"{base_url}/bench/offloaded/sync_work"),
+    ]
+    print(f"concurrency={args.concurrency} duration={args.duration}s events={args.events} limit={args.limit} "
+          f"work={args.work_ms}ms sync workers={os.environ['SYNC_WORKERS']}")
+    print(f"{'workload':8s} {'handler':10s} {'req/s':>8s} {'p50 ms':>8s} {'p99 ms':>8s} "
+          f"{'health p50':>11s} {'health p99':>11s} {'errors':>7s}")
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for workload, handler, url in cases:
+            # warm up (connections, caches, pool)
+            await load(session, url, args.concurrency, 0.5, f"{base_url}/health")
+            latencies, probes, errors = await load(session, url, args.concurrency, args.duration, f"{base_url}/health")
+            print(
+                f"{workload:8s} {handler:10s} {len(latencies) / args.duration:8.0f} "
+                f"{percentile(latencies, 50):8.1f} {percentile(latencies, 99):8.1f} "
+                f"{percentile(probes, 50):11.1f} {percentile(probes, 99):11.1f} {errors:7d}"
+            )
+
+    server.should_exit = True
+    await serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--events', type=int, default=2000, help='events in the seeded match')
+    parser.add_argument('--limit', type=int, default=500, help='page size of get_events_since')
+    parser.add_argument('--work-ms', type=float, default=20, help='blocking work per request (sync workload)')
+    parser.add_argument('--workers', type=int, default=8, help='SYNC_WORKERS, unless already set')
+    parser.add_argument('--port', type=int, default=8012)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
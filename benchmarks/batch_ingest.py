@@ -0,0 +1,117 @@
+"""
+Backfill time of a matchday of WhoScored page sources, against a migrated database (DATABASE_URL).
+
+    one-by-one  what /fetch_game_manually does per request: parse, scraper, fetch_payload
+                (players and projections upserted per game)
+    batch       batch_ingest.ingest_page_sources: pages parsed in the process pool, one upsert
+                of the players and one of the projections for the whole matchday
+
+Every mode writes its own games (fresh match / player ids), the pages are synthetic.
+
+    DATABASE_URL=postgresql://... python benchmarks/batch_ingest.py --games 10
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+
+from backend_streaming.config.executor import process_executor, sync_executor
+from backend_streaming.providers.opta.infra.db import get_session
+from backend_streaming.providers.whoscored.app.services.batch_ingest import ingest_page_sources
+from backend_streaming.providers.whoscored.app.services.mapping_service import get_mapping_service, uuid_id
+from backend_streaming.providers.whoscored.app.services.run_scraper import fetch_payload, parse_game_txt
+from backend_streaming.providers.whoscored.app.services.scraper import SingleGameScraper
+from backend_streaming.providers.whoscored.infra.repos.scraper_repo import ScraperRepository
+
+
+def make_team(rng: random.Random, team_id: int, players: dict) -> dict:
+    player_ids = [int(player_id) for player_id in players]
+    return {
+        "teamId": team_id,
+        "formations": [{
+            "formationId": 8, "formationName": "4231", "captainPlayerId": player_ids[0],
+            "playerIds": player_ids, "jerseyNumbers": list(range(1, len(player_ids) + 1)),
+            "formationSlots": [i + 1 if i < 11 else 0 for i in range(len(player_ids))],
+            "formationPositions": [{"vertical": rng.uniform(0, 10), "horizontal": rng.uniform(0, 10)} for _ in range(11)],
+        }],
+    }
+
+
+def make_page(match_id: int, n_events: int, seed: int) -> str:
+    rng = random.Random(seed)
+    home_players = {str(match_id * 100 + i): f"Home Player {i}" for i in range(18)}
+    away_players = {str(match_id * 100 + 50 + i): f"Away Player {i}" for i in range(18)}
+    players = {**home_players, **away_players}
+    teams = {match_id * 10: home_players, match_id * 10 + 1: away_players}
+    events = []
+    for i in range(n_events):
+        team_id = rng.choice(list(teams))
+        events.append({
+            "id": match_id * 10**5 + i, "eventId": i, "minute": i * 95 // n_events, "second": rng.randrange(60),
+            "teamId": team_id, "playerId": int(rng.choice(list(teams[team_id]))),
+            "x": round(rng.uniform(0, 100), 1), "y": round(rng.uniform(0, 100), 1),
+            "period": {"value": 1 + i * 2 // n_events}, "type": {"value": 1}, "outcomeType": {"value": 1},
+            "qualifiers": [{"type": {"value": q}, "value": f"{rng.uniform(0, 50):.1f}"} for q in rng.sample(range(1, 300), 6)],
+        })
+    data = {
+        "score": "1 : 0", "elapsed": "FT", "playerIdNameDictionary": players, "events": events,
+        "home": make_team(rng, match_id * 10, home_players), "away": make_team(rng, match_id * 10 + 1, away_players),
+    }
+    filler = "<div class=\"x\">{ lorem }</div>\n" * 10000
+    return f"<html>{filler}<script>var args = {{ matchId:{match_id}, matchCentreData: {json.dumps(data)}, " \
+           f"matchCentreEventTypeJson: {{}} }};</script>{filler}</html>"
+
+
+def prepare(match_ids: list):
+    """The match / team mappings and the teams, as the fixtures import would have done."""
+    mappings = get_mapping_service()
+    mappings.ensure('match', match_ids, uuid_id(26))
+    team_ids = [str(int(match_id) * 10 + side) for match_id in match_ids for side in (0, 1)]
+    teams, _ = mappings.ensure('team', team_ids, uuid_id(26))
+    ScraperRepository(logging.getLogger(__name__)).upsert_teams(
+        get_session(), [{'team_id': opta_id, 'name': f"Team {ws_id}"} for ws_id, opta_id in teams.items()]
+    )
+
+
+def one_by_one(pages: list):
+    for page in pages:
+        match_id, data = parse_game_txt(page)
+        scraper = SingleGameScraper(match_id)
+        try:
+            fetch_payload(scraper, data)
+        finally:
+            scraper.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--events', type=int, default=1800)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    base = random.randrange(10**4, 10**5) * 100
+    modes = {'one-by-one': base, 'batch': base + 50}
+    pages = {
+        mode: [make_page(first + i, args.events, seed=i) for i in range(args.games)]
+        for mode, first in modes.items()
+    }
+    prepare([str(first + i) for first in modes.values() for i in range(args.games)])
+    print(f"{args.games} games, {args.events} events, {len(pages['batch'][0]) / 2**20:.1f} MiB per page")
+
+    start = time.perf_counter()
+    one_by_one(pages['one-by-one'])
+    print(f"{'one-by-one':<12} {time.perf_counter() - start:8.2f} s")
+
+    start = time.perf_counter()
+    response = asyncio.run(ingest_page_sources(pages['batch']))
+    assert all(game['status'] == 'ok' for game in response['games']), response['games']
+    print(f"{'batch':<12} {time.perf_counter() - start:8.2f} s  {response['timings_ms']}")
+    process_executor.shutdown()
+    sync_executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
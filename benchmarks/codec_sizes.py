@@ -0,0 +1,77 @@
+"""
+Message size and encode time of a full match state for every streamer codec.
+
+    python benchmarks/codec_sizes.py --events 2000
+"""
+import time
+import random
+import argparse
+
+from backend_streaming.streamer.codecs import CODECS, COMPRESSORS, PayloadEncoder, decode_payload
+
+
+def make_match_state(n_events: int, seed: int = 0) -> list:
+    """Synthetic match state shaped like MatchProjectionModel.to_dict() rows."""
+    rng = random.Random(seed)
+    players = [f"{rng.getrandbits(64):x}"[:24] for _ in range(30)]
+    teams = ["4dsgumo7d4zupm2ugsvm4zm4d", "1pse9ta7a45pi2w2grjim70ge"]
+    state = []
+    for i in range(n_events):
+        state.append({
+            'match_id': 'cgrtk6bfvu2ctp1rjs34g2r6c',
+            'event_id': 2700000000 + i,
+            'local_event_id': i,
+            'type_id': rng.choice([1, 1, 1, 3, 4, 5, 7, 8, 12, 13, 15, 16, 44, 49, 61]),
+            'period_id': 1 if i < n_events // 2 else 2,
+            'time_min': i * 95 // n_events,
+            'time_sec': rng.randint(0, 59),
+            'player_id': rng.choice(players),
+            'contestant_id': rng.choice(teams),
+            'player_name': None,
+            'outcome': rng.randint(0, 1),
+            'x': round(rng.uniform(0, 100), 1),
+            'y': round(rng.uniform(0, 100), 1),
+            'qualifiers': [
+                {'qualifierId': rng.randint(1, 400), 'value': rng.choice(['', '23.4', 'Left', '1'])}
+                for _ in range(rng.randint(2, 8))
+            ],
+            'time_stamp': '2025-01-25T15:02:15.123Z',
+            'last_modified': '2025-01-25T15:02:17Z',
+        })
+    return state
+
+
+def measure(encoder: PayloadEncoder, payload: list, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = encoder.encode(payload)
+        timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    decode_payload(encoded.body, encoded.content_type, encoded.content_encoding)
+    decode_time = time.perf_counter() - start
+    return len(encoded.body), min(timings), decode_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    payload = make_match_state(args.events)
+    print(f"{'codec':<10} {'compression':<12} {'bytes':>10} {'encode ms':>10} {'decode ms':>10}")
+    for codec_name, codec_cls in CODECS.items():
+        for compression in ['none', *COMPRESSORS]:
+            try:
+                codec = codec_cls()
+                compressor = COMPRESSORS[compression]() if compression != 'none' else None
+            except ImportError as e:
+                print(f"{codec_name:<10} {compression:<12} skipped ({e})")
+                continue
+            size, encode_time, decode_time = measure(PayloadEncoder(codec, compressor, threshold=0), payload, args.repeat)
+            print(f"{codec_name:<10} {compression:<12} {size:>10} {encode_time * 1000:>10.2f} {decode_time * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
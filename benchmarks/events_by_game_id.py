@@ -0,0 +1,77 @@
+"""
+get_events_by_game_id: ORM objects + to_dict + one JSON document (old)
+vs. column-only Core query streamed as JSON chunks (new). Runs on a local sqlite file.
+
+    python benchmarks/events_by_game_id.py --events 2000
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import orjson
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend_streaming.providers.opta.infra.models import Base, MatchProjectionModel
+from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
+from codec_sizes import make_match_state
+
+MATCH_ID = 'cgrtk6bfvu2ctp1rjs34g2r6c'
+
+
+def old_response(repo: MatchProjectionRepository) -> int:
+    events = repo.get_match_state(MATCH_ID)
+    return len(json.dumps([event.to_dict() for event in events]).encode())
+
+
+def new_response(repo: MatchProjectionRepository, chunk_rows: int = 200) -> int:
+    size, chunk = 1, []
+    for i, row in enumerate(repo.iter_match_state(MATCH_ID), 1):
+        chunk.append(orjson.dumps(row))
+        if i % chunk_rows == 0:
+            # the chunk would be written to the socket here
+            size += len(b','.join(chunk)) + 1
+            chunk = []
+    return size + len(b','.join(chunk)) + 1
+
+
+def measure(func, repo, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(repo)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(repo)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        session = session_factory()
+        session.add_all(MatchProjectionModel(**row) for row in make_match_state(args.events))
+        session.commit()
+        session.close()
+
+        repo = MatchProjectionRepository(session_factory)
+        print(f"{args.events} events")
+        for name, func in [('ORM + to_dict', old_response), ('Core + streamed orjson', new_response)]:
+            elapsed, peak = measure(func, repo, args.repeat)
+            print(f"{name:<24} {elapsed * 1000:8.1f} ms  peak {peak / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Import (cold start) time of the API worker and the CLIs, from `python -X importtime`.
+
+Every module is imported `--repeat` times in a fresh interpreter and the fastest run is kept
+(the others only add disk / scheduler noise). The interpreter startup (site, .pth files) is not
+counted: only the cumulative time of the module itself and of what it imports.
+Per module, the time is split by top level package (self time of its modules), to see what to defer.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --record                 # append the results to import_time.jsonl
+    python benchmarks/import_time.py --max-ms 150 backend_streaming.providers.opta.infra.migrate
+
+With --max-ms the exit status is 1 when a module takes longer (e.g. in CI).
+"""
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+MODULES = [
+    'backend_streaming.main',  # API worker (uvicorn backend_streaming.main:app)
+    'backend_streaming.providers.whoscored.infra.executables.fetch_games_manually',
+    'backend_streaming.providers.opta.infra.migrate',
+]
+HISTORY_PATH = Path(__file__).with_name('import_time.jsonl')
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def import_times(module: str):
+    """[(self us, cumulative us, depth, name)] of one cold import of `module`."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            rows.append((int(own), int(cumulative), len(indent) // 2, name))
+    return rows
+
+
+def measure(module: str, repeat: int):
+    """(total ms, {top level package: ms}) of the fastest of `repeat` imports."""
+    best = None
+    for _ in range(repeat):
+        rows = import_times(module)
+        # the rows of the target end with it at depth 0; the ones before are interpreter startup
+        end = max(i for i, row in enumerate(rows) if row[2] == 0 and row[3] == module)
+        start = max((i + 1 for i, row in enumerate(rows[:end]) if row[2] == 0), default=0)
+        rows = rows[start:end + 1]
+        total = rows[-1][1]
+        if best is None or total < best[0]:
+            best = (total, rows)
+    total, rows = best
+    packages = Counter()
+    for own, _, _, name in rows:
+        packages[name.split('.')[0]] += own
+    return total / 1000, {package: us / 1000 for package, us in packages.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help='packages listed per module')
+    parser.add_argument('--record', action='store_true', help=f'append the results to {HISTORY_PATH.name}')
+    parser.add_argument('--max-ms', type=float, help='fail when a module takes longer to import')
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        total, packages = measure(module, args.repeat)
+        results[module] = round(total, 1)
+        print(f"{module}: {total:.1f} ms")
+        for package, ms in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {package:<24} {ms:8.1f} ms")
+
+    if args.record:
+        commit = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True).stdout.strip()
+        entry = {
+            'at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': commit or None,
+            'python': sys.version.split()[0],
+            'ms': results,
+        }
+        with open(HISTORY_PATH, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    if args.max_ms is not None:
+        slow = {module: ms for module, ms in results.items() if ms > args.max_ms}
+        if slow:
+            print(f"over {args.max_ms} ms: {slow}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
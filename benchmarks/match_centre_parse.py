@@ -0,0 +1,97 @@
+"""
+Parsing time of a WhoScored page source: the matchCentreData object found and decoded.
+
+    regex   the previous parse_game_txt + _format_pagesource: lazy DOTALL regex to the next
+            `}, matchCentreEventTypeJson`, brace counts over the object, json.loads
+    str     match_centre.parse_page_source on the page as text
+    bytes   the same on the raw page bytes (orjson decodes a memoryview of the span)
+
+The page is synthetic, shaped like a real one: `--events` events with qualifiers in the object,
+`--html-kb` of markup / scripts around it.
+
+    python benchmarks/match_centre_parse.py
+"""
+import re
+import json
+import time
+import random
+import argparse
+import statistics
+
+from backend_streaming.providers.whoscored.app.services.match_centre import parse_page_source
+
+
+def make_page(n_events: int, html_kb: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    players = {str(rng.randrange(10**5, 10**6)): f"Player {i} \"{{nick}}\"" for i in range(30)}
+    events = []
+    for i in range(n_events):
+        events.append({
+            "id": 2700000000 + i, "eventId": i, "minute": i * 95 // n_events, "second": rng.randrange(60),
+            "teamId": rng.choice([13, 26]), "playerId": int(rng.choice(list(players))),
+            "x": round(rng.uniform(0, 100), 1), "y": round(rng.uniform(0, 100), 1),
+            "period": {"value": 1, "displayName": "FirstHalf"},
+            "type": {"value": 1, "displayName": "Pass"},
+            "outcomeType": {"value": 1, "displayName": "Successful"},
+            "qualifiers": [
+                {"type": {"value": q, "displayName": f"Q{q}"}, "value": f"{rng.uniform(0, 50):.1f}"}
+                for q in rng.sample(range(1, 300), 6)
+            ],
+            "satisfiedEventsTypes": rng.sample(range(200), 8),
+            "isTouch": True,
+        })
+    data = {
+        "playerIdNameDictionary": players,
+        "events": events,
+        "home": {"teamId": 13, "name": "Arsenal", "formations": []},
+        "away": {"teamId": 26, "name": "Liverpool", "formations": []},
+    }
+    filler = "<div class=\"x\">{ lorem }</div>\n" * (html_kb * 1024 // 30)
+    return (
+        f"<html>{filler[:len(filler) // 2]}<script>require.config.params['args'] = {{\n"
+        f"    matchId:1821372,\n    matchCentreData: {json.dumps(data)},\n"
+        f"    matchCentreEventTypeJson: {{\"shotSixYardBox\": 0}},\n    formationIdNameMappings: {{}}\n"
+        f"}};</script>{filler[len(filler) // 2:]}</html>"
+    )
+
+
+def regex_parse(page: str):
+    match_id = re.search(r'matchId:(\d+)', page).group(1)
+    raw = re.search(r'matchCentreData: (\{.*?}),\s*matchCentreEventTypeJson', page, re.DOTALL).group(1)
+    if raw.rstrip().endswith(','):
+        raw = raw.rstrip().rstrip(',')
+    if raw.count('{') > raw.count('}'):
+        raw = raw + '}'
+    return match_id, json.loads(raw)
+
+
+def timed(func, page, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(page)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--html-kb', type=int, default=1024)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    page = make_page(args.events, args.html_kb)
+    page_bytes = page.encode()
+    assert regex_parse(page) == parse_page_source(page) == parse_page_source(page_bytes)
+    print(f"page: {len(page_bytes) / 2**20:.1f} MiB, {args.events} events")
+    for name, func, source in (
+        ('regex', regex_parse, page),
+        ('str', parse_page_source, page),
+        ('bytes', parse_page_source, page_bytes),
+    ):
+        print(f"{name:<8} {timed(func, source, args.repeat):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Table layout benchmark for domain_events / match_projection on a synthetic multi-season dataset.
+
+    flat         the layout before alembic revision 5b8e0f3c7a19: single tables, uuid4 domain event ids,
+                 match_projection keyed on event_id with a separate match_id index
+    partitioned  the current models: hash partitioned by match id, (match id, ...) primary keys,
+                 covering indexes, time ordered (UUIDv7) domain event ids
+
+Both layouts get the same rows (`--seasons` x `--matches` x `--events`, plus `--edit-ratio` edits in
+domain_events), then the per-match queries of the repositories are timed on random matches, and
+`--insert-rows` new domain events are appended the way the streamer does (batches of 500).
+Needs Postgres: two throwaway databases are created next to the one of DATABASE_URL.
+
+    DATABASE_URL=postgresql://user@localhost/streaming python benchmarks/partitioning.py
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import statistics
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+FLAT_DDL = """
+CREATE TABLE domain_events (
+    domain_event_id VARCHAR PRIMARY KEY,
+    aggregate_id VARCHAR NOT NULL,
+    event_type VARCHAR NOT NULL,
+    occurred_on TIMESTAMP NOT NULL,
+    payload JSON NOT NULL
+);
+CREATE INDEX ix_domain_events_aggregate_id ON domain_events (aggregate_id);
+CREATE TABLE match_projection (
+    match_id VARCHAR NOT NULL,
+    event_id BIGINT PRIMARY KEY,
+    local_event_id INTEGER, type_id INTEGER, period_id INTEGER, time_min INTEGER, time_sec INTEGER,
+    player_id VARCHAR, contestant_id VARCHAR, player_name VARCHAR, outcome INTEGER,
+    x FLOAT, y FLOAT, qualifiers JSON, time_stamp VARCHAR, last_modified VARCHAR,
+    version BIGINT NOT NULL DEFAULT 0
+);
+CREATE INDEX ix_match_projection_match_id ON match_projection (match_id);
+CREATE INDEX ix_match_projection_match_version_event ON match_projection (match_id, version, event_id);
+"""
+
+# Rows arrive the way the live pipeline writes them: `concurrent` matches are played at the same time,
+# so the rows of a matchday are interleaved (ordered by match time), season after season.
+PROJECTION_ROWS = """
+INSERT INTO match_projection
+    (match_id, event_id, local_event_id, type_id, period_id, time_min, time_sec, outcome, x, y, qualifiers, version)
+SELECT
+    's' || :season || 'm' || m, (:season * 10000 + m)::bigint * 100000 + e, e, (e * 7) % 70 + 1,
+    CASE WHEN e < :events / 2 THEN 1 ELSE 2 END, e * 95 / :events, (e * 37) % 60, e % 2,
+    random() * 100, random() * 100, '[{"qualifierId": 140, "value": "50.1"}]', 1
+FROM generate_series(1, :matches) m, generate_series(0, :events - 1) e
+ORDER BY (m - 1) / :concurrent, e
+"""
+
+# domain event ids: uuid4 (random) for the flat layout, UUIDv7 (ms timestamp prefix) for the partitioned one
+RANDOM_ID = "md5(random()::text)::uuid::text"
+TIME_ORDERED_ID = (
+    "(lpad(to_hex((extract(epoch FROM ts) * 1000)::bigint), 12, '0') || '7' "
+    "|| substr(md5(random()::text), 1, 3) || '8' || substr(md5(random()::text), 1, 15))::uuid::text"
+)
+DOMAIN_EVENT_ROWS = """
+INSERT INTO domain_events (domain_event_id, aggregate_id, event_type, occurred_on, payload)
+SELECT {id}, 's' || :season || 'm' || m, event_type, ts,
+       json_build_object('feed_event_id', (:season * 10000 + m)::bigint * 100000 + e)
+FROM (
+    SELECT m, e, event_type,
+           timestamp '2022-08-01' + :season * interval '365 days' + (m - 1) / :concurrent * interval '1 day'
+           + e * interval '3 seconds' + offs AS ts
+    FROM generate_series(1, :matches) m, generate_series(0, :events - 1) e,
+         LATERAL (SELECT 'GlobalEventAdded' AS event_type, interval '0' AS offs
+                  UNION ALL
+                  SELECT 'EventEdited', interval '1 second' WHERE random() < :edit_ratio) kind
+) rows
+ORDER BY ts
+"""
+
+QUERIES = {
+    # EventStore.load_events
+    'load_events': (
+        "SELECT * FROM domain_events WHERE aggregate_id = :match_id ORDER BY occurred_on, domain_event_id"
+    ),
+    # MatchProjectionRepository.iter_match_state
+    'match_state': "SELECT * FROM match_projection WHERE match_id = :match_id ORDER BY event_id",
+    # MatchProjectionRepository.get_events_between (a 15 minute window)
+    'timeline': (
+        "SELECT * FROM match_projection WHERE match_id = :match_id AND period_id = 2 "
+        "AND time_min >= 60 AND time_min <= 75 ORDER BY time_min, time_sec, event_id"
+    ),
+    # MatchProjectionRepository.get_events_by_ids (100 ids of one match)
+    'events_by_ids': "SELECT * FROM match_projection WHERE event_id = ANY(:event_ids)",
+}
+
+
+def create_database(url, name: str):
+    # maintenance database, DATABASE_URL's own database may not exist yet
+    admin = create_engine(url.set(database='postgres'), isolation_level='AUTOCOMMIT')
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    admin.dispose()
+    return create_engine(url.set(database=name))
+
+
+def load(engine, args, domain_event_id: str):
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for season in range(1, args.seasons + 1):
+            params = {'season': season, 'matches': args.matches, 'events': args.events, 'concurrent': args.concurrent}
+            conn.execute(text(PROJECTION_ROWS), params)
+            conn.execute(text(DOMAIN_EVENT_ROWS.format(id=domain_event_id)), {**params, 'edit_ratio': args.edit_ratio})
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('VACUUM ANALYZE domain_events'))
+        conn.execute(text('VACUUM ANALYZE match_projection'))
+    return time.perf_counter() - start
+
+
+def total_size(engine, table: str) -> int:
+    """Table + indexes, partitions included."""
+    with engine.connect() as conn:
+        return conn.execute(text(
+            # pg_partition_tree is empty for a plain table
+            "SELECT coalesce((SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree(:table)), "
+            "pg_total_relation_size(:table))"
+        ), {'table': table}).scalar()
+
+
+def time_queries(engine, args, rng: random.Random) -> dict:
+    match_ids = [
+        (season, match)
+        for season, match in ((rng.randint(1, args.seasons), rng.randint(1, args.matches)) for _ in range(args.repeat))
+    ]
+    timings = {name: [] for name in QUERIES}
+    with engine.connect() as conn:
+        for season, match in match_ids:
+            base = (season * 10000 + match) * 100000
+            params = {
+                'match_id': f"s{season}m{match}",
+                'event_ids': [base + e for e in rng.sample(range(args.events), min(100, args.events))],
+            }
+            for name, sql in QUERIES.items():
+                start = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings[name].append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def time_inserts(engine, args, new_id) -> float:
+    """Append domain events of live matches in batches of 500, like PostgresEventStore.save_events."""
+    now = datetime.utcnow()
+    rows = [
+        {
+            'domain_event_id': new_id(),
+            'aggregate_id': f"live{i % 10}",
+            'event_type': 'GlobalEventAdded',
+            'occurred_on': now + timedelta(milliseconds=i),
+            'payload': '{}',
+        }
+        for i in range(args.insert_rows)
+    ]
+    stmt = text(
+        "INSERT INTO domain_events (domain_event_id, aggregate_id, event_type, occurred_on, payload) "
+        "VALUES (:domain_event_id, :aggregate_id, :event_type, :occurred_on, :payload)"
+    )
+    start = time.perf_counter()
+    for i in range(0, len(rows), 500):
+        with engine.begin() as conn:
+            conn.execute(stmt, rows[i:i + 500])
+    return time.perf_counter() - start
+
+
+def explain(engine, name: str) -> str:
+    with engine.connect() as conn:
+        plan = conn.execute(text(f"EXPLAIN {QUERIES[name]}"), {'match_id': 's1m1', 'event_ids': [100001]}).scalars().all()
+    return plan[0].strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seasons', type=int, default=3)
+    parser.add_argument('--matches', type=int, default=380, help='matches per season')
+    parser.add_argument('--events', type=int, default=1600, help='events per match')
+    parser.add_argument('--concurrent', type=int, default=10, help='matches played at the same time')
+    parser.add_argument('--edit-ratio', type=float, default=0.2, help='share of events edited once')
+    parser.add_argument('--repeat', type=int, default=200, help='random matches queried')
+    parser.add_argument('--insert-rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    url = make_url(os.environ.get('DATABASE_URL', ''))
+    if url.get_backend_name() != 'postgresql':
+        sys.exit("DATABASE_URL must point to Postgres (partitioning is postgres only)")
+
+    from backend_streaming.providers.opta.domain.events import new_domain_event_id
+    from backend_streaming.providers.opta.infra.models import Base
+
+    base_name = url.database or 'postgres'
+    flat = create_database(url, f"{base_name}_bench_flat")
+    with flat.begin() as conn:
+        for statement in filter(str.strip, FLAT_DDL.split(';')):
+            conn.execute(text(statement))
+    partitioned = create_database(url, f"{base_name}_bench_partitioned")
+    Base.metadata.create_all(partitioned)
+
+    layouts = {'flat': (flat, RANDOM_ID, lambda: str(uuid.uuid4())), 'partitioned': (partitioned, TIME_ORDERED_ID, new_domain_event_id)}
+    print(f"{args.seasons} seasons x {args.matches} matches x {args.events} events, {args.edit_ratio:.0%} edited, "
+          f"{args.concurrent} concurrent matches")
+    results = {}
+    for name, (engine, sql_id, new_id) in layouts.items():
+        load_time = load(engine, args, sql_id)
+        timings = time_queries(engine, args, random.Random(42))
+        insert_time = time_inserts(engine, args, new_id)
+        results[name] = (load_time, timings, insert_time)
+        print(f"\n[{name}] loaded in {load_time:.1f}s, "
+              f"domain_events {total_size(engine, 'domain_events') / 2**20:.0f} MB, "
+              f"match_projection {total_size(engine, 'match_projection') / 2**20:.0f} MB")
+        print(f"  {'query':14s} {'mean ms':>8s} {'p95 ms':>8s}  plan")
+        for query, values in timings.items():
+            p95 = statistics.quantiles(values, n=20)[-1]
+            print(f"  {query:14s} {statistics.mean(values):8.2f} {p95:8.2f}  {explain(engine, query)}")
+        print(f"  append {args.insert_rows} domain events: {insert_time:.2f}s ({args.insert_rows / insert_time:.0f} rows/s)")
+
+    for engine, _, _ in layouts.values():
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Load test of the live push endpoint (/streaming/live/{game_id}/sse).
+
+Self contained by default: starts the API in-process on the in-memory broker (sqlite read model),
+connects `--clients` SSE clients spread over `--matches` matches and publishes `--rate` updates
+per second per match through SingleGameStreamer, like the live pipeline does.
+
+    python benchmarks/sse_load.py --clients 2000 --matches 10 --duration 20
+
+Against a running instance (updates come from the real pipeline):
+    python benchmarks/sse_load.py --url http://localhost:8001 --game-ids <id1>,<id2> --clients 500
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+import aiohttp
+
+from codec_sizes import make_match_state
+
+
+class Counters:
+    def __init__(self):
+        self.connected = 0
+        self.snapshots = 0
+        self.deltas = 0
+        self.dropped = 0
+        self.errors = 0
+
+
+async def sse_client(session: aiohttp.ClientSession, url: str, counters: Counters, stop: asyncio.Event):
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=None, sock_read=None)) as response:
+            counters.connected += 1
+            response.raise_for_status()
+            buffer = b''
+            # NOTE: snapshot / delta lines can be much longer than aiohttp's readline limit
+            async for data in response.content.iter_any():
+                if stop.is_set():
+                    break
+                buffer += data
+                *frames, buffer = buffer.split(b'\n\n')
+                for frame in frames:
+                    if frame.startswith(b'event: snapshot'):
+                        counters.snapshots += 1
+                    elif frame.startswith(b'event: delta'):
+                        counters.deltas += 1
+                    elif frame.startswith(b'event: dropped'):
+                        counters.dropped += 1
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        counters.errors += 1
+    finally:
+        counters.connected -= 1
+
+
+async def publish_updates(game_ids, rate: float, events: int, stop: asyncio.Event):
+    """Every tick, edit a few events and add new ones, then publish the full state (like OptaStreamer)."""
+    from backend_streaming.streamer.streamer import SingleGameStreamer
+
+    states = {game_id: make_match_state(events, seed=i) for i, game_id in enumerate(game_ids)}
+    streamers = {game_id: SingleGameStreamer(game_id) for game_id in game_ids}
+    tick = 0
+    while not stop.is_set():
+        for game_id, state in states.items():
+            for row in state[tick % len(state):tick % len(state) + 3]:
+                row['last_modified'] = f"2025-01-25T15:{tick // 60 % 60:02d}:{tick % 60:02d}Z"
+            await streamers[game_id].send_message('update', state)
+        tick += 1
+        await asyncio.sleep(1 / rate)
+
+
+async def run(args):
+    stop = asyncio.Event()
+    server = None
+    tasks = []
+
+    if args.url:
+        base_url = args.url.rstrip('/')
+        game_ids = args.game_ids.split(',')
+    else:
+        # in-process API: memory broker + throwaway sqlite read model
+        tmp = tempfile.mkdtemp()
+        os.environ.setdefault('DATABASE_URL', f"sqlite:///{tmp}/sse_load.db")
+        os.environ['STREAMER_BROKER'] = 'memory'
+        import uvicorn
+        from backend_streaming.main import app
+
+        server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=args.port, log_level='warning', timeout_graceful_shutdown=1))
+        tasks.append(asyncio.create_task(server.serve()))
+        while not server.started:
+            await asyncio.sleep(0.05)
+        base_url = f"http://127.0.0.1:{args.port}"
+        game_ids = [f"load_match_{i}" for i in range(args.matches)]
+
+    counters = Counters()
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        clients = [
+            asyncio.create_task(sse_client(
+                session, f"{base_url}/streaming/live/{game_ids[i % len(game_ids)]}/sse", counters, stop
+            ))
+            for i in range(args.clients)
+        ]
+        # wait for the connections before publishing
+        deadline = time.perf_counter() + 30
+        while counters.snapshots < args.clients and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        print(f"{counters.snapshots}/{args.clients} clients connected to {len(game_ids)} matches")
+
+        if server is not None:
+            tasks.append(asyncio.create_task(publish_updates(game_ids, args.rate, args.events, stop)))
+
+        start, last_deltas = time.perf_counter(), 0
+        while time.perf_counter() - start < args.duration:
+            await asyncio.sleep(1)
+            print(
+                f"t={time.perf_counter() - start:5.1f}s connected={counters.connected:6d} "
+                f"deltas/s={counters.deltas - last_deltas:8d} dropped={counters.dropped} errors={counters.errors}"
+            )
+            last_deltas = counters.deltas
+        elapsed = time.perf_counter() - start
+        print(f"delivered {counters.deltas} deltas in {elapsed:.1f}s ({counters.deltas / elapsed:.0f} msg/s)")
+
+        stop.set()
+        for task in clients:
+            task.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+
+    for task in tasks[1:]:
+        task.cancel()
+    if server is not None:
+        server.should_exit = True
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='running API instance, e.g. http://localhost:8001')
+    parser.add_argument('--game-ids', default='', help='comma separated game ids (with --url)')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--matches', type=int, default=10)
+    parser.add_argument('--rate', type=float, default=1.0, help='updates per second per match')
+    parser.add_argument('--events', type=int, default=500, help='events per match state')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8011)
+    args = parser.parse_args()
+    if args.url and not args.game_ids:
+        sys.exit("--game-ids is required with --url")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+End-to-end streamer throughput on the in-memory broker (no RabbitMQ needed):
+many matches publish updates through SingleGameStreamer while a consumer drains the legacy queue.
+
+    python benchmarks/streamer_throughput.py --matches 50 --updates 40 --latency 0.002
+"""
+import time
+import asyncio
+import argparse
+
+from backend_streaming.streamer.codecs import decode_payload
+from backend_streaming.streamer.memory_broker import InMemoryBroker
+from backend_streaming.streamer.streamer import SingleGameStreamer
+from codec_sizes import make_match_state
+
+
+async def run(n_matches: int, n_updates: int, n_events: int, latency: float, max_queue_size: int) -> dict:
+    broker = InMemoryBroker(latency=latency, max_queue_size=max_queue_size)
+    payload = make_match_state(n_events)
+    await SingleGameStreamer.declare_topology(broker)
+
+    async def consume(message):
+        decode_payload(message.body, message.content_type, message.content_encoding)
+
+    await broker.subscribe(SingleGameStreamer.QUEUE_NAME, consume)
+
+    async def one_match(i: int):
+        streamer = SingleGameStreamer(f"match{i}", publisher=broker)
+        for _ in range(n_updates):
+            await streamer.send_message(streamer.PROGRESS_MESSAGE_TYPE, payload)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_match(i) for i in range(n_matches)))
+    published = time.perf_counter() - start
+    await broker.join(SingleGameStreamer.QUEUE_NAME)
+    consumed = time.perf_counter() - start
+    await broker.close()
+    return {'published': published, 'consumed': consumed, 'blocked': broker.stats.blocked}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--matches', type=int, default=50)
+    parser.add_argument('--updates', type=int, default=40, help='updates per match')
+    parser.add_argument('--events', type=int, default=200, help='events per update payload')
+    parser.add_argument('--latency', type=float, default=0.002, help='simulated confirm round trip (s)')
+    parser.add_argument('--max-queue-size', type=int, default=0, help='0 = unbounded')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.matches, args.updates, args.events, args.latency, args.max_queue_size))
+    n_messages = args.matches * args.updates
+    print(f"{n_messages} messages, {args.matches} concurrent matches, {args.events} events each")
+    print(f"all published in {result['published']:.2f}s ({n_messages / result['published']:.0f} msg/s)")
+    print(f"all consumed in  {result['consumed']:.2f}s ({n_messages / result['consumed']:.0f} msg/s)")
+    print(f"publishes blocked by a full queue: {result['blocked']}")
+
+
+if __name__ == "__main__":
+    main()
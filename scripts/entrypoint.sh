@@ -6,5 +6,10 @@ echo "Setting PYTHONPATH"
 export PYTHONPATH=/app:${PYTHONPATH}
 export PYTHONPATH=/app/src:${PYTHONPATH}
 
+# Bring the database schema up to date (set RUN_MIGRATIONS=false to skip, e.g. for one-off commands)
+if [ "${RUN_MIGRATIONS:-true}" = "true" ]; then
+    python -m backend_streaming.providers.opta.infra.migrate || exit 1
+fi
+
 # Run whatever command was passed to docker run
 exec "$@" 
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Bounded thread pool for the sync-only work of async code (scraper, file I/O, sync SQLAlchemy).
+Every API process shares one pool of SYNC_WORKERS threads, so a burst of requests queues up
+instead of starting a thread per call, and the event loop stays free for the other requests.
+
+CPU bound work that would hold the GIL (e.g. parsing a batch of page sources) goes to the
+PARSE_WORKERS processes of process_executor instead. Its functions and arguments must be picklable,
+and the workers are spawned (not forked from a process running threads): they import the module of
+the function on their first call, keep those functions in light modules.
+"""
+import os
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+SYNC_WORKERS = int(os.getenv("SYNC_WORKERS", 8))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+class SyncExecutor:
+    def __init__(self, max_workers: int = SYNC_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        # created lazily, so a shut down executor can be used again (e.g. app restarted in tests)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sync-worker")
+        return self._pool
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run `func(*args, **kwargs)` in the pool and wait for it without blocking the event loop."""
+        # same as asyncio.to_thread: the context (e.g. logging context vars) follows the call
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, call)
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._pool = None
+
+
+class ProcessExecutor(SyncExecutor):
+    def __init__(self, max_workers: int = PARSE_WORKERS):
+        super().__init__(max_workers)
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run `func(*args, **kwargs)` in a worker process (no context vars, they stay in this process)."""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, functools.partial(func, *args, **kwargs))
+
+
+sync_executor = SyncExecutor()
+process_executor = ProcessExecutor()
@@ -1,6 +1,15 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
 import colorlog
 
 # Create logs directory if it doesn't exist
@@ -45,9 +54,192 @@ def setup_logging():
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
     
-    # Remove any existing handlers
-    root_logger.handlers = []
-    
-    # Add handlers
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler) 
\ No newline at end of file
+    # Remove any existing handlers and route both handlers through the queue listener
+    # so that logging never blocks the event loop on file / console I/O
+    _attach(root_logger, route='root', handlers=[file_handler, console_handler])
+
+
+###########################################
+# Non-blocking, per-match structured logs #
+###########################################
+# All handlers that do I/O live behind a single QueueListener thread. Loggers on the
+# hot path only get a QueueHandler, so logging a record is a queue put on the event loop.
+
+# Attributes every LogRecord has. Anything else was passed via `extra=` and goes into the JSON record.
+_RESERVED_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'route', 'close_route'}
+
+# Default rate limit for a single message template (see RateLimitFilter)
+RATE_LIMIT_MESSAGES = 20
+RATE_LIMIT_SECONDS = 10.0
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Allow at most `rate` records per `per` seconds for each message template.
+    NOTE: the template is the un-formatted `record.msg`, so log with %-style args
+    (logger.info("New event %s", event_id)) for per-event messages to be grouped.
+    The number of dropped records is attached to the next record that gets through.
+    """
+    def __init__(self, rate: int = RATE_LIMIT_MESSAGES, per: float = RATE_LIMIT_SECONDS):
+        super().__init__()
+        self.rate = rate
+        self.per = per
+        self._lock = threading.Lock()
+        # template -> [window start, records in window, suppressed since last emitted record]
+        self._windows: Dict[Tuple[str, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.per:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.rate:
+                window[1] += 1
+                suppressed, window[2] = window[2], 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _RoutedQueueHandler(QueueHandler):
+    """QueueHandler that tags records with the route whose handlers should write them."""
+    def __init__(self, log_queue: queue.SimpleQueue, route: str):
+        super().__init__(log_queue)
+        self.route = route
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same as QueueHandler.prepare but keeps the traceback separate from the message
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.route = self.route
+        return record
+
+
+class _RoutingHandler(logging.Handler):
+    """Runs on the listener thread and hands every record to the handlers of its route."""
+    def __init__(self):
+        super().__init__()
+        self._routes: Dict[str, List[logging.Handler]] = {}
+        self._routes_lock = threading.Lock()
+
+    def add_route(self, route: str, handlers: List[logging.Handler]) -> None:
+        with self._routes_lock:
+            self._routes[route] = handlers
+
+    def remove_route(self, route: str) -> List[logging.Handler]:
+        with self._routes_lock:
+            return self._routes.pop(route, [])
+
+    def emit(self, record: logging.LogRecord) -> None:
+        route = getattr(record, 'route', None)
+        if getattr(record, 'close_route', False):
+            # queued by close_match_logger after the route's last record
+            for handler in self.remove_route(route):
+                handler.close()
+            return
+        with self._routes_lock:
+            handlers = self._routes.get(route, [])
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_router = _RoutingHandler()
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener() -> None:
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = QueueListener(_log_queue, _router)
+            _listener.start()
+            atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush every queued record and stop the listener thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _attach(logger: logging.Logger, route: str, handlers: List[logging.Handler]) -> None:
+    """Replace the logger's handlers with a queue handler feeding `handlers` on the listener thread."""
+    _ensure_listener()
+    for handler in _router.remove_route(route):
+        handler.close()
+    _router.add_route(route, handlers)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(_RoutedQueueHandler(_log_queue, route))
+
+
+def setup_match_logger(
+    name: str,
+    log_file: Union[str, Path],
+    level: int = logging.INFO,
+    mode: str = 'a',
+    propagate: bool = True,
+) -> logging.Logger:
+    """
+    Get a dedicated logger for one match (e.g. 'game.<game_id>') writing JSON lines to `log_file`.
+    File I/O happens on the listener thread and chatty message templates are rate limited.
+    Calling this again for the same name reopens the file instead of stacking handlers.
+    """
+    file_handler = logging.FileHandler(str(log_file), mode=mode)
+    file_handler.setFormatter(JsonFormatter())
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = propagate
+    logger.filters = [f for f in logger.filters if not isinstance(f, RateLimitFilter)]
+    logger.addFilter(RateLimitFilter())
+    _attach(logger, route=name, handlers=[file_handler])
+    return logger
+
+
+def close_match_logger(name: str) -> None:
+    """
+    Detach the handlers of a match logger once the match is done.
+    The files are closed on the listener thread after every record already queued was written.
+    """
+    logger = logging.getLogger(name)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    marker = logging.makeLogRecord({'route': name, 'close_route': True})
+    _log_queue.put_nowait(marker)
@@ -1,12 +1,33 @@
-import uvicorn
-
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 # from backend_streaming.providers.whoscored.infra.api_routes import event_query_route
 # from backend_streaming.providers.whoscored.infra.api_routes import get_lineup_route
 # from backend_streaming.providers.whoscored.infra.api_routes import admin_route
 from backend_streaming.providers.whoscored.infra.api_routes import all_routes
-app = FastAPI()
+from backend_streaming.providers.whoscored.infra.api_routes import live_routes
+from backend_streaming.streamer.publisher import close_publishers
+from backend_streaming.providers.opta.infra.async_db import dispose_async_engine
+from backend_streaming.providers.opta.infra.db import dispose_engine
+from backend_streaming.config.executor import process_executor, sync_executor
+from backend_streaming.providers.whoscored.infra.config.config import get_paths
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the engines, the broker connection and the sync pool are all created on first use;
+    # nothing is done at import, the data / log directories are created here
+    get_paths()
+    yield
+    await live_routes.live_hub.stop()
+    await close_publishers()
+    await dispose_async_engine()
+    dispose_engine()
+    sync_executor.shutdown(wait=False)
+    process_executor.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware if needed
 app.add_middleware(
@@ -18,6 +39,7 @@ app.add_middleware(
 )
 # Include your router
 app.include_router(all_routes.router, prefix="/streaming")
+app.include_router(live_routes.router, prefix="/streaming")
 # app.include_router(event_query_route.router, prefix="/provider")
 # app.include_router(get_lineup_route.router, prefix="/provider")
 # app.include_router(admin_route.router, prefix="/provider")
@@ -28,6 +50,8 @@ async def health_check():
     return {"status": "healthy"}
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
         "backend_streaming.main:app",
         host="0.0.0.0",
@@ -1,11 +1,11 @@
 from typing import Dict, Any, Union
-from uuid import uuid4
 from datetime import datetime
 
 from backend_streaming.providers.opta.domain.events import (
     DomainEvent,
     GlobalEventAdded,
-    EventEdited
+    EventEdited,
+    new_domain_event_id
 )
 from backend_streaming.providers.opta.domain.entities.sport_events import EventInMatch, Qualifier
 
@@ -90,7 +90,7 @@ class MatchAggregate:
         We create a `GlobalEventAdded` domain event, record it.
         """
         domain_evt = GlobalEventAdded(
-            domain_event_id=str(uuid4()),
+            domain_event_id=new_domain_event_id(),
             aggregate_id=self.match_id,
             occurred_on=datetime.utcnow(),
 
@@ -124,7 +124,7 @@ class MatchAggregate:
         `old_fields` is optional if we want to track the old values for analytics.
         """
         domain_evt = EventEdited(
-            domain_event_id=str(uuid4()),
+            domain_event_id=new_domain_event_id(),
             aggregate_id=self.match_id,
             occurred_on=datetime.utcnow(),
             feed_event_id=feed_event_id,
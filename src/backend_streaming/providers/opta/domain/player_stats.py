@@ -0,0 +1,112 @@
+"""
+Per-player match statistics, derived from the projected events (match_projection rows).
+
+Every event adds a fixed set of counts to the player who made it (`event_stats`), so the stats of
+a match are a sum over its rows, and an upsert changes them by (new contribution - old contribution)
+of the rows it rewrites (`stats_delta`). That is how player_match_stats is kept up to date by
+MatchProjectionRepository.save_match_state, edits changing type_id, outcome or player_id included.
+NOTE: the backfill of alembic revision 2e6a9c4f1b83 repeats these rules in SQL.
+"""
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from backend_streaming.providers.opta.domain.value_objects.sport_event_enums import EventType, QualifierType
+
+STAT_COLUMNS = (
+    'events',  # every event of the player, whatever the type (> 0: the player featured in the match)
+    'passes',
+    'passes_completed',
+    'shots',
+    'shots_on_target',
+    'goals',
+    'own_goals',
+    'tackles',
+    'tackles_won',
+    'interceptions',
+    'aerials',
+    'aerials_won',
+    'take_ons',
+    'take_ons_won',
+    'duels',
+    'duels_won',
+)
+
+SHOT_TYPES = {EventType.MISS, EventType.POST, EventType.ATTEMPT_SAVED, EventType.GOAL}
+# one-on-one contests, won with outcome 1 (a challenge is the defender being dribbled past: always lost)
+DUEL_TYPES = {
+    EventType.TACKLE: 'tackles',
+    EventType.AERIAL: 'aerials',
+    EventType.TAKE_ON: 'take_ons',
+    EventType.CHALLENGE: None,
+}
+
+
+def _has_qualifier(row: Mapping, qualifier_id: int) -> bool:
+    for qualifier in row.get('qualifiers') or []:
+        try:
+            if int(qualifier.get('qualifierId')) == qualifier_id:
+                return True
+        except (TypeError, ValueError):
+            continue
+    return False
+
+
+def event_stats(row: Mapping) -> Optional[Tuple[str, Counter]]:
+    """(player_id, counts) an event adds to the stats of its player, None if it adds nothing."""
+    player_id = row.get('player_id')
+    type_id = row.get('type_id')
+    if player_id is None or type_id == EventType.DELETED_EVENT:
+        return None
+    won = row.get('outcome') == 1
+    stats = Counter(events=1)
+
+    if type_id == EventType.PASS_:
+        stats['passes'] += 1
+        stats['passes_completed'] += won
+    elif type_id in SHOT_TYPES:
+        if type_id == EventType.GOAL and _has_qualifier(row, QualifierType.OWN_GOAL):
+            stats['own_goals'] += 1
+        else:
+            stats['shots'] += 1
+            if type_id == EventType.GOAL:
+                stats['goals'] += 1
+                stats['shots_on_target'] += 1
+            elif type_id == EventType.ATTEMPT_SAVED and not _has_qualifier(row, QualifierType.BLOCKED):
+                stats['shots_on_target'] += 1
+    elif type_id == EventType.INTERCEPTION:
+        stats['interceptions'] += 1
+    elif type_id in DUEL_TYPES:
+        stats['duels'] += 1
+        stat = DUEL_TYPES[type_id]
+        if stat is not None:
+            stats[stat] += 1
+            stats[f'{stat}_won'] += won
+            stats['duels_won'] += won
+    # unary + drops the zero counts (e.g. a lost duel has no '*_won')
+    return player_id, +stats
+
+
+def stats_delta(old_rows: Mapping[int, Mapping], new_rows: Iterable[Mapping]) -> Dict[str, Dict[str, int]]:
+    """
+    Change of the per-player stats when `new_rows` replace the stored rows `old_rows` (by event id,
+    missing for new events). Only players with a non-zero change are returned, with non-zero counts.
+    """
+    delta = defaultdict(Counter)
+    for row in new_rows:
+        for sign, source in ((-1, old_rows.get(row['event_id'])), (1, row)):
+            contribution = event_stats(source) if source is not None else None
+            if contribution is None:
+                continue
+            player_id, stats = contribution
+            for stat, count in stats.items():
+                delta[player_id][stat] += sign * count
+    return {
+        player_id: {stat: count for stat, count in counts.items() if count}
+        for player_id, counts in delta.items()
+        if any(counts.values())
+    }
+
+
+def match_stats(rows: Iterable[Mapping]) -> Dict[str, Dict[str, int]]:
+    """Stats of every player over the rows of a match (computed from scratch)."""
+    return stats_delta({}, rows)
@@ -0,0 +1,139 @@
+# Directory: src/backend_streaming/providers/opta/infra/async_db.py
+"""
+Async engine / sessions for the API routes, so DB reads don't block the event loop.
+The engine is created on first use and disposed by the app lifespan (see backend_streaming.main).
+
+ASYNC_DATABASE_URL selects the database; by default it is DATABASE_URL with the matching async
+driver (postgresql -> postgresql+asyncpg, sqlite -> sqlite+aiosqlite). Read-only sessions
+(get_async_read_session) go to the replicas of DATABASE_REPLICA_URLS, same driver mapping,
+with the staleness rules of replicas.py.
+
+Pool settings are those of db.py (DB_POOL_*), except the pool size: ASYNC_DB_POOL_SIZE /
+ASYNC_DB_MAX_OVERFLOW. ASYNC_DB_STATEMENT_CACHE_SIZE sets the asyncpg prepared statement cache
+per connection (asyncpg default 100; 0 behind pgbouncer in transaction pooling mode).
+"""
+import os
+
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from backend_streaming.providers.opta.infra.db import engine_options
+from backend_streaming.providers.opta.infra.replicas import (
+    REPLICA_STATE_SQL, ReplicaState, get_replica_tracker, get_replica_urls, replica_state
+)
+
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 10))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 10))
+ASYNC_DB_STATEMENT_CACHE_SIZE = os.getenv("ASYNC_DB_STATEMENT_CACHE_SIZE")
+
+# sync dialect -> async driver
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker] = None
+_replica_engines: Optional[List[AsyncEngine]] = None
+_replica_session_factories: Optional[List[async_sessionmaker]] = None
+
+
+def to_async_url(url: str) -> str:
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver known for {url.drivername}, set ASYNC_DATABASE_URL")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def get_async_database_url() -> str:
+    url = os.getenv("ASYNC_DATABASE_URL")
+    if url:
+        return url
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("Neither ASYNC_DATABASE_URL nor DATABASE_URL is set")
+    return to_async_url(url)
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    options = engine_options(url)
+    if "pool_size" in options:
+        options.update(pool_size=ASYNC_DB_POOL_SIZE, max_overflow=ASYNC_DB_MAX_OVERFLOW)
+    url = make_url(url)
+    if ASYNC_DB_STATEMENT_CACHE_SIZE is not None and url.get_driver_name() == "asyncpg":
+        url = url.update_query_dict({"prepared_statement_cache_size": ASYNC_DB_STATEMENT_CACHE_SIZE})
+    return create_async_engine(url, **options)
+
+
+def get_async_engine() -> AsyncEngine:
+    global _engine
+    if _engine is None:
+        _engine = _create_engine(get_async_database_url())
+    return _engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    global _session_factory
+    if _session_factory is None:
+        # NOTE: rows are returned as plain dicts, nothing to refresh after a commit
+        _session_factory = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _session_factory
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """
+    FastAPI dependency: one AsyncSession per request, closed once the handler returned.
+    NOTE: the session is closed before a StreamingResponse body is sent, so streaming handlers
+    open their own session with get_async_session_factory() inside the generator.
+    """
+    async with get_async_session_factory()() as session:
+        yield session
+
+
+def _get_replica_session_factories() -> List[async_sessionmaker]:
+    global _replica_engines, _replica_session_factories
+    if _replica_session_factories is None:
+        _replica_engines = [_create_engine(to_async_url(url)) for url in get_replica_urls()]
+        _replica_session_factories = [
+            async_sessionmaker(engine, expire_on_commit=False) for engine in _replica_engines
+        ]
+    return _replica_session_factories
+
+
+async def _probe_replica(index: int) -> ReplicaState:
+    engine = _replica_engines[index]
+    if engine.dialect.name != "postgresql":
+        return ReplicaState(lag=0.0)
+    async with engine.connect() as conn:
+        return replica_state(*(await conn.execute(REPLICA_STATE_SQL)).one())
+
+
+async def get_async_read_session_factory(read_your_writes: bool = False) -> async_sessionmaker:
+    """Session factory of a replica within the staleness bound, else of the primary (see replicas.py)."""
+    replicas = _get_replica_session_factories()
+    if replicas:
+        index = await get_replica_tracker().achoose(_probe_replica, read_your_writes)
+        if index is not None:
+            return replicas[index]
+    return get_async_session_factory()
+
+
+async def get_async_read_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency like get_async_session, for read-only handlers (may use a replica)."""
+    async with (await get_async_read_session_factory())() as session:
+        yield session
+
+
+async def dispose_async_engine():
+    """Close the pooled connections (app shutdown). The next use creates new engines."""
+    global _engine, _session_factory, _replica_engines, _replica_session_factories
+    for engine in [_engine, *(_replica_engines or [])]:
+        if engine is not None:
+            await engine.dispose()
+    _engine = None
+    _session_factory = None
+    _replica_engines = None
+    _replica_session_factories = None
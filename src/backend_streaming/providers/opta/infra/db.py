@@ -1,31 +1,137 @@
 # Directory: src/backend_streaming/providers/opta/infra/db.py
+"""
+Sync engine / sessions of the primary database (DATABASE_URL), created on first use, so importing
+this module needs neither DATABASE_URL nor a running database.
+
+The schema is managed by alembic: `python -m backend_streaming.providers.opta.infra.migrate` (run by
+scripts/entrypoint.sh) upgrades it before the app starts. init_db() only creates the tables of a
+throwaway database (tests, benchmarks).
+
+Pool settings (env), shared by the replica engines:
+    DB_POOL_SIZE            connections kept open per process (default 10)
+    DB_MAX_OVERFLOW         extra connections under load, closed when returned (default 20)
+    DB_POOL_TIMEOUT         seconds to wait for a connection before failing (default 30)
+    DB_POOL_RECYCLE         seconds before a connection is replaced (default 1800, -1: never)
+    DB_POOL_PRE_PING        test connections on checkout (default true)
+    DB_QUERY_CACHE_SIZE     compiled statements cached per engine (default 500)
+"""
+import os
+import threading
+
+from typing import Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy_utils import database_exists, create_database
-from backend_streaming.providers.opta.infra.models import Base
+from backend_streaming.providers.opta.infra.replicas import RoutingSessionFactory, get_replica_tracker, get_replica_urls
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", 500))
+
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_sessions: Optional[RoutingSessionFactory] = None
+# sessions are opened from many threads (sync_executor), the first calls must not create two engines
+_init_lock = threading.RLock()
+
+
+def get_database_url() -> str:
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set")
+    return url
+
+
+def engine_options(url: str) -> dict:
+    """create_engine / create_async_engine keyword arguments for `url` (pool settings from env)."""
+    options = {
+        "echo": False,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "query_cache_size": DB_QUERY_CACHE_SIZE,
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        # NOTE: sqlite uses a single connection / file based pool, without these settings
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
 
-import os
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-# ↑ Adjust this connection string to your actual Postgres details.
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _init_lock:
+            if _engine is None:
+                url = get_database_url()
+                _engine = create_engine(url, **engine_options(url))
+    return _engine
 
-# 1. Create Engine
-engine = create_engine(DATABASE_URL, echo=False)  
-# echo=True just logs SQL statements for debugging; you can set it to False in production.
 
-# 2. Check if the database exists
-if not database_exists(engine.url):
-    create_database(engine.url)  # Creates the actual 'opta_test' if it doesn't exist
-    
-# 3. Create a configured "Session" class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_session_factory() -> sessionmaker:
+    """Sessions of the primary (for writes)."""
+    global _session_factory
+    if _session_factory is None:
+        with _init_lock:
+            if _session_factory is None:
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_factory
+
+
+def get_routing_sessions() -> RoutingSessionFactory:
+    """Primary sessions for writes, replica sessions for reads (see replicas.py)."""
+    global _sessions
+    if _sessions is None:
+        with _init_lock:
+            if _sessions is None:
+                _sessions = RoutingSessionFactory(
+                    get_session_factory(),
+                    [create_engine(url, **engine_options(url)) for url in get_replica_urls()],
+                    tracker=get_replica_tracker(),
+                )
+    return _sessions
+
+
+def get_session():
+    return get_session_factory()()
+
+
+def get_read_session(read_your_writes: bool = False):
+    """Session for read-only work: a replica within the staleness bound, else the primary (see replicas.py)."""
+    return get_routing_sessions().reader(read_your_writes)
+
+
+def get_read_session_factory(read_your_writes: bool = False):
+    # NOTE: resolved on every call, so the factory can be created at import time
+    return lambda: get_read_session(read_your_writes)
+
 
-# 4. Create all tables (if they don't exist)
 def init_db():
+    """Create the database and all tables (tests / benchmarks; deployed databases use the migrations)."""
+    from sqlalchemy_utils import database_exists, create_database
+    from backend_streaming.providers.opta.infra.models import Base
+
+    engine = get_engine()
+    if not database_exists(engine.url):
+        create_database(engine.url)
     Base.metadata.create_all(bind=engine)
 
-# Optional: a quick helper to get a session
-def get_session():
-    return SessionLocal()
 
-init_db()
\ No newline at end of file
+def dispose_engine():
+    """Close the pooled connections (app shutdown). The next use creates new engines."""
+    global _engine, _session_factory, _sessions
+    with _init_lock:
+        if _sessions is not None:
+            for engine in _sessions.replica_engines:
+                engine.dispose()
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+        _sessions = None
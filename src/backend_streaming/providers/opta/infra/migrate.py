@@ -0,0 +1,45 @@
+"""
+Explicit schema migration step, run once before the app starts (see scripts/entrypoint.sh):
+
+    python -m backend_streaming.providers.opta.infra.migrate      # from the repo root (alembic.ini)
+
+Upgrades the DATABASE_URL database to the latest alembic revision. A new, empty database gets
+the tables of the current models and is stamped at head (the first revision assumes the tables exist).
+"""
+import os
+import logging
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from backend_streaming.providers.opta.infra.db import get_engine, init_db
+
+ALEMBIC_CONFIG = os.getenv("ALEMBIC_CONFIG", "alembic.ini")
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(config_path: str = ALEMBIC_CONFIG):
+    from sqlalchemy_utils import database_exists
+
+    config = Config(config_path)
+    engine = get_engine()
+    tables = set(inspect(engine).get_table_names()) if database_exists(engine.url) else set()
+    if "alembic_version" in tables:
+        logger.info("Upgrading the database schema to head")
+        command.upgrade(config, "head")
+    elif not tables:
+        logger.info("New database: creating the tables and stamping head")
+        init_db()
+        command.stamp(config, "head")
+    else:
+        # tables created outside alembic: which revision they match can't be told from here
+        raise RuntimeError(
+            "Database has tables but no alembic_version, run `alembic stamp <revision>` for its schema first"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
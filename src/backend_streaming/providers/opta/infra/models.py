@@ -1,10 +1,28 @@
 # Directory: src/backend_streaming/providers/opta/infra/models.py
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, JSON, Float, BigInteger, UniqueConstraint
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, JSON, Float, BigInteger, UniqueConstraint, LargeBinary, Index, PrimaryKeyConstraint, DDL, event, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, class_mapper
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, date
 Base = declarative_base()
 
+# domain_events and match_projection are hash partitioned by match id in postgres
+# (see alembic revision 5b8e0f3c7a19). Every query of a single match only touches one partition.
+HASH_PARTITIONS = 16
+
+# JSONB in postgres (indexable, with equality), plain JSON elsewhere (sqlite in the tests)
+JsonB = JSON().with_variant(JSONB(), 'postgresql')
+
+
+def _create_hash_partitions(table, partitions: int = HASH_PARTITIONS):
+    """Create the partitions right after the parent table (create_all / tests), postgres only."""
+    statements = "; ".join(
+        f"CREATE TABLE IF NOT EXISTS {table.name}_p{i} PARTITION OF {table.name} "
+        f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+        for i in range(partitions)
+    )
+    event.listen(table, 'after_create', DDL(statements).execute_if(dialect='postgresql'))
+
 class TeamModel(Base):
     __tablename__ = 'teams'
 
@@ -64,17 +82,61 @@ class DomainEventModel(Base):
     """
     __tablename__ = 'domain_events'
     
-    domain_event_id = Column(String, primary_key=True)   # e.g. a UUID string
-    aggregate_id    = Column(String, nullable=False, index=True)
+    domain_event_id = Column(String, nullable=False)     # time ordered UUIDv7 string (see domain.events.new_domain_event_id)
+    aggregate_id    = Column(String, nullable=False)     # match id, the partition key
     event_type      = Column(String, nullable=False)
     occurred_on     = Column(DateTime, nullable=False)
-    payload         = Column(JSON, nullable=False)
+    payload         = Column(JsonB, nullable=False)
+
+    __table_args__ = (
+        # the partition key has to be part of the primary key
+        PrimaryKeyConstraint('aggregate_id', 'domain_event_id'),
+        # load_events: all events of a match in occurrence order
+        Index('ix_domain_events_aggregate_occurred', 'aggregate_id', 'occurred_on'),
+        # history of a feed event (load_event_history). NOTE: queries must use the exact same expression
+        Index('ix_domain_events_feed_event_id', text("(payload ->> 'feed_event_id')")).ddl_if(dialect='postgresql'),
+        {'postgresql_partition_by': 'HASH (aggregate_id)'},
+    )
 
     def __repr__(self):
         return (f"<DomainEventModel(domain_event_id='{self.domain_event_id}', "
                 f"event_type='{self.event_type}', aggregate_id='{self.aggregate_id}')>")
 
 
+class OutboxMessageModel(Base):
+    """
+    Transactional outbox: messages to publish, written in the same transaction as the
+    domain events they describe. The outbox relay drains unpublished rows to the broker.
+    """
+    __tablename__ = 'outbox'
+
+    # NOTE: sqlite only autoincrements INTEGER primary keys (used by the tests)
+    id               = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    aggregate_id     = Column(String, nullable=False)
+    exchange         = Column(String, nullable=False, default='')
+    routing_key      = Column(String, nullable=False)
+    # already encoded message (see streamer.codecs), so the relay never re-serializes
+    body             = Column(LargeBinary, nullable=False)
+    content_type     = Column(String, nullable=True)
+    content_encoding = Column(String, nullable=True)
+    headers          = Column(JSON, nullable=True)
+    freshness        = Column(JSON, nullable=True)
+    created_on       = Column(DateTime, nullable=False)
+    published_on     = Column(DateTime, nullable=True)
+    attempts         = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # the relay only ever scans unpublished rows in id order
+        Index('ix_outbox_unpublished', 'id', postgresql_where=published_on.is_(None)),
+        # the relay purges published rows past their retention (see OutboxRelay.purge_once)
+        Index('ix_outbox_published_on', 'published_on', postgresql_where=published_on.isnot(None)),
+    )
+
+    def __repr__(self):
+        return (f"<OutboxMessageModel(id={self.id}, aggregate_id='{self.aggregate_id}', "
+                f"routing_key='{self.routing_key}', published_on={self.published_on})>")
+
+
 class MatchProjectionModel(Base):
     """
     Stores the 'current state' of a match's events (for quick queries).
@@ -82,12 +144,9 @@ class MatchProjectionModel(Base):
     """
     __tablename__ = 'match_projection'
     
-    match_id = Column(String, nullable=False, index=True)
-    event_id = Column(
-        BigInteger, 
-        nullable=False,
-        primary_key=True,  # This automatically adds unique constraint
-    )
+    # NOTE: primary key is (match_id, event_id), match_id being the partition key
+    match_id = Column(String, nullable=False)
+    event_id = Column(BigInteger, nullable=False)
     local_event_id = Column(Integer, nullable=True)
     type_id = Column(Integer, nullable=True)
     period_id = Column(Integer, nullable=True)
@@ -107,11 +166,33 @@ class MatchProjectionModel(Base):
     outcome = Column(Integer, nullable=True)
     x = Column(Float, nullable=True)
     y = Column(Float, nullable=True)
-    qualifiers = Column(JSON, nullable=True)
+    qualifiers = Column(JsonB, nullable=True)
     
     time_stamp = Column(String, nullable=True)
     last_modified = Column(String, nullable=True)
 
+    # match_projection_version.version of the upsert that last changed this row (see get_events_since)
+    version = Column(BigInteger, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        PrimaryKeyConstraint('match_id', 'event_id'),
+        # stable ordering for incremental reads: (version, event_id) within a match
+        Index('ix_match_projection_match_version_event', 'match_id', 'version', 'event_id'),
+        # match timeline (get_events_between), answered from the index for the common filters
+        Index(
+            'ix_match_projection_match_timeline', 'match_id', 'period_id', 'time_min', 'time_sec',
+            postgresql_include=['type_id', 'player_id'],
+        ),
+        # lookups by event id alone (get_events_by_ids) probe this index in every partition
+        Index('ix_match_projection_event_id', 'event_id'),
+        # qualifier containment (get_events_with_qualifier): qualifiers @> '[{"qualifierId": 28}]'
+        Index(
+            'ix_match_projection_qualifiers', 'qualifiers',
+            postgresql_using='gin', postgresql_ops={'qualifiers': 'jsonb_path_ops'},
+        ).ddl_if(dialect='postgresql'),
+        {'postgresql_partition_by': 'HASH (match_id)'},
+    )
+
     def deserialize(self, row: dict) -> 'MatchProjectionModel':
         """Deserialize a row into a MatchProjectionModel instance."""
         return MatchProjectionModel(**row)
@@ -132,4 +213,125 @@ class MatchProjectionModel(Base):
                 f"match_id='{self.match_id}', "
                 f"event_id='{self.event_id}', "
                 f"player_id='{self.player_id}', "
-                f"contestant_id='{self.contestant_id}')>")
\ No newline at end of file
+                f"contestant_id='{self.contestant_id}')>")
+
+
+_create_hash_partitions(DomainEventModel.__table__)
+_create_hash_partitions(MatchProjectionModel.__table__)
+
+
+class MatchProjectionVersionModel(Base):
+    """
+    Per-match version of the read model. Bumped in the same transaction as every
+    match_projection upsert that changes a row, so (match_id, version) identifies a match state (used for caching / ETags).
+    """
+    __tablename__ = 'match_projection_version'
+
+    match_id   = Column(String, primary_key=True)
+    version    = Column(BigInteger, nullable=False, default=1)
+    updated_on = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<MatchProjectionVersionModel(match_id='{self.match_id}', version={self.version})>"
+
+
+class MatchTournamentModel(Base):
+    """Tournament (season) of a match, from the fixtures. Season stats only include linked matches."""
+    __tablename__ = 'match_tournaments'
+
+    match_id       = Column(String, primary_key=True)
+    tournament_id  = Column(String, nullable=False, index=True)
+    competition_id = Column(String, nullable=True)
+
+    def __repr__(self):
+        return f"<MatchTournamentModel(match_id='{self.match_id}', tournament_id='{self.tournament_id}')>"
+
+
+def _stat_column():
+    return Column(Integer, nullable=False, default=0, server_default='0')
+
+
+class PlayerStatsColumns:
+    """The counts of domain.player_stats.STAT_COLUMNS, shared by the match and season tables."""
+    events           = _stat_column()
+    passes           = _stat_column()
+    passes_completed = _stat_column()
+    shots            = _stat_column()
+    shots_on_target  = _stat_column()
+    goals            = _stat_column()
+    own_goals        = _stat_column()
+    tackles          = _stat_column()
+    tackles_won      = _stat_column()
+    interceptions    = _stat_column()
+    aerials          = _stat_column()
+    aerials_won      = _stat_column()
+    take_ons         = _stat_column()
+    take_ons_won     = _stat_column()
+    duels            = _stat_column()
+    duels_won        = _stat_column()
+
+
+class PlayerMatchStatsModel(PlayerStatsColumns, Base):
+    """
+    Per-player stats of a match, updated incrementally in the transaction of every match_projection
+    upsert (see PlayerStatsRepository.apply_projection_changes).
+    """
+    __tablename__ = 'player_match_stats'
+
+    match_id      = Column(String, nullable=False)
+    player_id     = Column(String, nullable=False)
+    contestant_id = Column(String, nullable=True)
+    updated_on    = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('match_id', 'player_id'),
+        # all matches of a player
+        Index('ix_player_match_stats_player_match', 'player_id', 'match_id'),
+    )
+
+    def __repr__(self):
+        return f"<PlayerMatchStatsModel(match_id='{self.match_id}', player_id='{self.player_id}')>"
+
+
+class PlayerSeasonStatsModel(PlayerStatsColumns, Base):
+    """
+    Per-player totals of a tournament (season): the sum of player_match_stats over the matches linked to
+    it in match_tournaments, updated with the same deltas. `matches` counts the matches the player featured in.
+    """
+    __tablename__ = 'player_season_stats'
+
+    tournament_id = Column(String, nullable=False)
+    player_id     = Column(String, nullable=False)
+    matches       = _stat_column()
+    updated_on    = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # leaderboards of a season are a range scan of the primary key
+        PrimaryKeyConstraint('tournament_id', 'player_id'),
+    )
+
+    def __repr__(self):
+        return f"<PlayerSeasonStatsModel(tournament_id='{self.tournament_id}', player_id='{self.player_id}')>"
+
+
+class IdMappingModel(Base):
+    """
+    Provider id -> our (Opta-like) id, one row per entity and kind ('player', 'team', 'match',
+    'competition', 'tournament'). Rows are only inserted (if absent), never updated: the first id
+    written for an entity is its id (see whoscored MappingService).
+    """
+    __tablename__ = 'id_mappings'
+
+    kind       = Column(String, nullable=False)
+    source_id  = Column(String, nullable=False)
+    target_id  = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('kind', 'source_id'),
+        # reverse lookups, and no id is given to two entities
+        UniqueConstraint('kind', 'target_id', name='uq_id_mappings_kind_target'),
+    )
+
+    def __repr__(self):
+        return f"<IdMappingModel(kind='{self.kind}', source_id='{self.source_id}', target_id='{self.target_id}')>"
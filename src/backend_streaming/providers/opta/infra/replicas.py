@@ -0,0 +1,227 @@
+"""
+Read/write split: writes go to the primary (DATABASE_URL), read-only work to the streaming replicas
+of DATABASE_REPLICA_URLS (comma separated) that are within the staleness bound.
+
+    sessions = RoutingSessionFactory(SessionLocal, replica_engines)
+    sessions()                                # primary session, for writes (same as SessionLocal())
+    sessions.reader()                         # a replica lagging at most REPLICA_MAX_LAG_SECONDS, else the primary
+    sessions.reader(read_your_writes=True)    # ... that has also replayed the last commit of this process
+
+The lag and replayed WAL position of each replica are checked at most every REPLICA_CHECK_INTERVAL
+seconds (and right away when read_your_writes needs a newer position than the one known).
+An unreachable replica is skipped until its next check. Without replicas every reader is a primary session.
+"""
+import os
+import time
+import logging
+import itertools
+import threading
+
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", 1))
+
+# NOTE: the lag is 0 while the replica has replayed all the WAL it received: on an idle primary
+# "now - last replayed commit" keeps growing without the replica being behind
+REPLICA_STATE_SQL = text(
+    "SELECT pg_is_in_recovery(), pg_last_wal_replay_lsn()::text, "
+    "CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+WRITE_POSITION_SQL = text("SELECT pg_current_wal_lsn()::text")
+
+logger = logging.getLogger(__name__)
+
+
+def get_replica_urls() -> List[str]:
+    return [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+def parse_lsn(lsn: Optional[str]) -> Optional[int]:
+    """'16/B374D848' -> 0x16B374D848 (comparable positions in the WAL)."""
+    if not lsn:
+        return None
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+@dataclass
+class ReplicaState:
+    lag: float = float("inf")           # seconds, inf: unknown / unreachable / not a replica
+    replay_lsn: Optional[int] = None    # WAL position replayed so far (None outside postgres)
+    checked_at: float = float("-inf")   # time.monotonic() of the check
+
+    def usable(self, max_lag: float, min_lsn: Optional[int] = None) -> bool:
+        if self.lag > max_lag:
+            return False
+        return min_lsn is None or self.replay_lsn is None or self.replay_lsn >= min_lsn
+
+
+def replica_state(in_recovery: bool, replay_lsn: Optional[str], lag: float) -> ReplicaState:
+    """State from the row of REPLICA_STATE_SQL."""
+    if not in_recovery:
+        # promoted (or never a replica): its data no longer follows the primary
+        logger.warning("Replica is not in recovery, not routing reads to it")
+        return ReplicaState()
+    return ReplicaState(lag=float(lag), replay_lsn=parse_lsn(replay_lsn))
+
+
+def probe_replica(engine: Engine) -> ReplicaState:
+    if engine.dialect.name != "postgresql":
+        # no replication to check (e.g. sqlite in the tests)
+        return ReplicaState(lag=0.0)
+    with engine.connect() as conn:
+        return replica_state(*conn.execute(REPLICA_STATE_SQL).one())
+
+
+def current_write_position(engine: Engine) -> Optional[int]:
+    """WAL position of the primary, reached by every transaction committed so far."""
+    if engine.dialect.name != "postgresql":
+        return None
+    with engine.connect() as conn:
+        return parse_lsn(conn.execute(WRITE_POSITION_SQL).scalar_one())
+
+
+class ReplicaTracker:
+    """
+    Known state of the replicas and the last write position of this process, shared by the sync
+    (RoutingSessionFactory) and async (async_db) readers. Replicas are tried round robin.
+    """
+
+    def __init__(
+        self,
+        replicas: int,
+        max_lag: float = REPLICA_MAX_LAG_SECONDS,
+        check_interval: float = REPLICA_CHECK_INTERVAL,
+    ):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.states = [ReplicaState() for _ in range(replicas)]
+        self.last_write_lsn: Optional[int] = None
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+
+    def record_write(self, lsn: Optional[int]):
+        if lsn is None:
+            return
+        with self._lock:
+            if self.last_write_lsn is None or lsn > self.last_write_lsn:
+                self.last_write_lsn = lsn
+
+    def _order(self) -> List[int]:
+        if not self.states:
+            return []
+        start = next(self._next) % len(self.states)
+        return [(start + i) % len(self.states) for i in range(len(self.states))]
+
+    def _needs_check(self, state: ReplicaState, min_lsn: Optional[int]) -> bool:
+        if time.monotonic() - state.checked_at >= self.check_interval:
+            return True
+        # within the lag bound but behind our last write: it may have caught up since
+        return state.lag <= self.max_lag and not state.usable(self.max_lag, min_lsn)
+
+    def _checked(self, index: int, state: ReplicaState) -> ReplicaState:
+        state.checked_at = time.monotonic()
+        self.states[index] = state
+        return state
+
+    def _failed(self, index: int, error: Exception) -> ReplicaState:
+        logger.warning("Replica %d check failed, skipping it: %s", index, error)
+        return self._checked(index, ReplicaState())
+
+    def choose(self, probe: Callable[[int], ReplicaState], read_your_writes: bool = False) -> Optional[int]:
+        """Index of a replica to read from, None for the primary."""
+        min_lsn = self.last_write_lsn if read_your_writes else None
+        for index in self._order():
+            state = self.states[index]
+            if self._needs_check(state, min_lsn):
+                try:
+                    state = self._checked(index, probe(index))
+                except Exception as e:
+                    state = self._failed(index, e)
+            if state.usable(self.max_lag, min_lsn):
+                return index
+        return None
+
+    async def achoose(
+        self,
+        probe: Callable[[int], Awaitable[ReplicaState]],
+        read_your_writes: bool = False,
+    ) -> Optional[int]:
+        """Same as choose, with an async probe."""
+        min_lsn = self.last_write_lsn if read_your_writes else None
+        for index in self._order():
+            state = self.states[index]
+            if self._needs_check(state, min_lsn):
+                try:
+                    state = self._checked(index, await probe(index))
+                except Exception as e:
+                    state = self._failed(index, e)
+            if state.usable(self.max_lag, min_lsn):
+                return index
+        return None
+
+
+_tracker: Optional[ReplicaTracker] = None
+
+
+def get_replica_tracker() -> ReplicaTracker:
+    """Process wide tracker of the DATABASE_REPLICA_URLS replicas."""
+    global _tracker
+    if _tracker is None:
+        _tracker = ReplicaTracker(len(get_replica_urls()))
+    return _tracker
+
+
+class RoutingSessionFactory:
+    """
+    Callable like a sessionmaker (primary sessions), so it can be passed as `session_factory` to the
+    repositories; `reader()` / `reader_factory()` give the read-only sessions.
+    """
+
+    def __init__(
+        self,
+        primary: sessionmaker,
+        replicas: Sequence[Engine] = (),
+        tracker: Optional[ReplicaTracker] = None,
+        probe: Callable[[Engine], ReplicaState] = probe_replica,
+        write_position: Callable[[Engine], Optional[int]] = current_write_position,
+    ):
+        self.primary = primary
+        self.replica_engines = list(replicas)
+        self.replicas = [
+            sessionmaker(class_=primary.class_, **{**primary.kw, "bind": engine}) for engine in self.replica_engines
+        ]
+        self.tracker = tracker or ReplicaTracker(len(self.replicas))
+        self._probe = probe
+        self._write_position = write_position
+        if self.replicas:
+            # only needed for read_your_writes (one extra query per commit)
+            event.listen(primary, "after_commit", self._record_write)
+
+    def __call__(self) -> Session:
+        return self.primary()
+
+    def _record_write(self, session: Session):
+        try:
+            self.tracker.record_write(self._write_position(self.primary.kw["bind"]))
+        except Exception as e:
+            # readers keep using the previous position: at worst a read_your_writes read misses this commit
+            logger.warning("Could not read the primary write position: %s", e)
+
+    def reader(self, read_your_writes: bool = False) -> Session:
+        """Session for read-only work, on a replica when one is fresh enough (the primary otherwise)."""
+        index = self.tracker.choose(lambda i: self._probe(self.replica_engines[i]), read_your_writes)
+        if index is None:
+            return self.primary()
+        return self.replicas[index]()
+
+    def reader_factory(self, read_your_writes: bool = False) -> Callable[[], Session]:
+        """`reader` as a session factory, for the read-only repositories."""
+        return lambda: self.reader(read_your_writes)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from backend_streaming.providers.opta.domain.events import DomainEvent
 
 class EventStore:
@@ -6,7 +6,15 @@ class EventStore:
     def load_events(self, aggregate_id: str) -> List[DomainEvent]:
         raise NotImplementedError
     
-    def save_events(self, aggregate_id: str, new_events: List[DomainEvent]) -> None:
+    def load_event_history(self, aggregate_id: str, feed_event_id: int) -> List[DomainEvent]:
+        """The domain events (added, then every edit) of a single feed event, in chronological order."""
+        raise NotImplementedError
+
+    def save_events(self, aggregate_id: str, new_events: List[DomainEvent], outbox_rows: Optional[list] = None) -> None:
+        """
+        Persist new domain events. 
+        `outbox_rows` (OutboxMessageModel) must be written atomically with the events if given.
+        """
         raise NotImplementedError
     
     def delete_events(self, aggregate_id: str) -> None:
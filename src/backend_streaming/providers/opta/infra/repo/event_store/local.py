@@ -1,6 +1,6 @@
 import os
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -54,10 +54,16 @@ class LocalFileEventStore(EventStore):
             events.append(evt)
         return events
 
-    def save_events(self, aggregate_id: str, new_events: List[DomainEvent]) -> None:
+    def load_event_history(self, aggregate_id: str, feed_event_id: int) -> List[DomainEvent]:
+        return [evt for evt in self.load_events(aggregate_id) if evt.feed_event_id == feed_event_id]
+
+    def save_events(self, aggregate_id: str, new_events: List[DomainEvent], outbox_rows: Optional[list] = None) -> None:
         """
         Append new events in memory + persist entire dictionary to the JSON file.
+        NOTE: there is no outbox table for the local store, so outbox rows can't be written atomically.
         """
+        if outbox_rows:
+            raise NotImplementedError("LocalFileEventStore does not support the outbox. Use PostgresEventStore.")
         if not new_events:
             return
 
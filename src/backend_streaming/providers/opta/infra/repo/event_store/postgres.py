@@ -1,5 +1,6 @@
-from typing import List
+from typing import List, Optional
 from datetime import datetime
+from sqlalchemy import literal_column
 from sqlalchemy.orm import Session
 
 from backend_streaming.providers.opta.domain.events import (
@@ -7,9 +8,13 @@ from backend_streaming.providers.opta.domain.events import (
     GlobalEventAdded,
     EventEdited
 )
-from backend_streaming.providers.opta.infra.models import DomainEventModel
+from backend_streaming.providers.opta.infra.models import DomainEventModel, OutboxMessageModel
 from backend_streaming.providers.opta.infra.repo.event_store.base import EventStore
 
+# same expression as the ix_domain_events_feed_event_id index, literal key so the planner always matches it
+FEED_EVENT_ID = DomainEventModel.payload.op('->>')(literal_column("'feed_event_id'"))
+
+
 class PostgresEventStore(EventStore):
     def __init__(self, session_factory: callable):
         """
@@ -29,15 +34,42 @@ class PostgresEventStore(EventStore):
             rows = (
                 session.query(DomainEventModel)
                 .filter_by(aggregate_id=aggregate_id)
-                .order_by(DomainEventModel.occurred_on.asc())
+                # ix_domain_events_aggregate_occurred, (time ordered) ids break ties in creation order
+                .order_by(DomainEventModel.occurred_on.asc(), DomainEventModel.domain_event_id.asc())
+                .all()
+            )
+            return self._bulk_deserialize_events(rows)
+        finally:
+            session.close()
+
+    def load_event_history(self, aggregate_id: str, feed_event_id: int) -> List[DomainEvent]:
+        """
+        The GlobalEventAdded and every EventEdited of one feed event, in chronological order.
+        NOTE: looked up with ix_domain_events_feed_event_id, in the match's partition only.
+        """
+        session: Session = self.session_factory()
+        try:
+            rows = (
+                session.query(DomainEventModel)
+                .filter(DomainEventModel.aggregate_id == aggregate_id)
+                .filter(FEED_EVENT_ID == str(feed_event_id))
+                .order_by(DomainEventModel.occurred_on.asc(), DomainEventModel.domain_event_id.asc())
                 .all()
             )
             return self._bulk_deserialize_events(rows)
         finally:
             session.close()
 
-    def save_events(self, aggregate_id: str, new_events: List[DomainEvent]) -> None:
-        if not new_events:
+    def save_events(
+        self,
+        aggregate_id: str,
+        new_events: List[DomainEvent],
+        outbox_rows: Optional[List[OutboxMessageModel]] = None
+    ) -> None:
+        """
+        Save the new domain events, plus the outbox rows describing them, in a single transaction.
+        """
+        if not new_events and not outbox_rows:
             return
 
         session: Session = self.session_factory()
@@ -53,7 +85,12 @@ class PostgresEventStore(EventStore):
                     payload=self._serialize_event(evt)
                 )
                 session.add(row)
+            if outbox_rows:
+                session.add_all(outbox_rows)
             session.commit()
+        except Exception:
+            session.rollback()
+            raise
         finally:
             session.close()
 
@@ -1,7 +1,7 @@
 # Directory: src/backend_streaming/providers/opta/infra/repo/match_repo.py
 
 from backend_streaming.providers.opta.domain.aggregates.match_aggregate import MatchAggregate
-from typing import List
+from typing import List, Optional
 from backend_streaming.providers.opta.domain.events import DomainEvent
 
 class MatchRepository:
@@ -15,11 +15,17 @@ class MatchRepository:
             agg.apply(evt)
         return agg
 
-    def save(self, agg: MatchAggregate):
+    def save(self, agg: MatchAggregate, outbox_rows: Optional[list] = None):
+        """
+        Persist uncommitted domain events. Outbox rows (if any) are saved in the same transaction.
+        """
         new_events = agg.get_uncommitted_events()
-        if not new_events:
+        if not new_events and not outbox_rows:
             return
-        self.event_store.save_events(agg.match_id, new_events)
+        if outbox_rows:
+            self.event_store.save_events(agg.match_id, new_events, outbox_rows=outbox_rows)
+        else:
+            self.event_store.save_events(agg.match_id, new_events)
         
         # agg.clear_uncommitted_events()
         
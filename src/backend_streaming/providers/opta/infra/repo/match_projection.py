@@ -1,20 +1,35 @@
 import os
-from typing import List, Optional
-from backend_streaming.providers.opta.infra.models import MatchProjectionModel
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Set, Union
+from backend_streaming.providers.opta.infra.models import MatchProjectionModel, MatchProjectionVersionModel
+from backend_streaming.providers.opta.infra.repo.player_stats import PlayerStatsRepository
+from sqlalchemy import or_, select, tuple_, type_coerce, update
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 import logging
 
+# max number of ids in a single IN (...) lookup
+EVENT_ID_CHUNK_SIZE = int(os.getenv('EVENT_ID_CHUNK_SIZE', 1000))
+
 
 class MatchProjectionRepository:
     """
     Responsible for persisting and retrieving the read model in a table.
     """
+    # called with the set of match ids after every committed upsert (e.g. to invalidate caches)
+    _upsert_listeners: List[Callable[[Set[str]], None]] = []
+
     def __init__(self, session_factory, logger: Optional[logging.Logger] = None):
         self.session_factory = session_factory
         self.logger = logger or logging.getLogger(__name__)
 
+    @classmethod
+    def add_upsert_listener(cls, listener: Callable[[Set[str]], None]):
+        cls._upsert_listeners.append(listener)
+
     # NOTE: currently deprecated!
     def _convert_to_orm_model(
         self, 
@@ -44,29 +59,56 @@ class MatchProjectionRepository:
             last_modified=event_entry["last_modified"]
         )
 
-    def save_match_state(self, projections: List[dict]):    
+    def save_match_state(self, projections: List[Union[dict, MatchProjectionModel]]):    
+        """
+        Upsert the projections and bump the version of every match they changed (same transaction).
+        Only rows whose content changed are rewritten, and they are stamped with the new version,
+        so get_events_since can return just the changed rows. A match none of whose rows changed keeps
+        its version (and its cached states). The player stats of the matches are updated in the same
+        transaction (see PlayerStatsRepository.apply_projection_changes).
+        """
         session = self.session_factory()
         try: 
-            # Track seen event IDs and build list of unique models
+            # Track seen (match, event) IDs and build list of unique models
             seen_events = {}
             unique_models = []
             
             for projection in projections:
-                if projection['event_id'] in seen_events:
-                    self.logger.warning(f"Duplicate event for event id: {projection['event_id']}")
+                if isinstance(projection, MatchProjectionModel):
+                    projection = projection.to_dict()
+                key = (projection['match_id'], projection['event_id'])
+                if key in seen_events:
+                    self.logger.warning("Duplicate event for event id: %s", projection['event_id'])
                     continue
                 
-                seen_events[projection['event_id']] = projection
+                seen_events[key] = projection
                 unique_models.append(projection)
             
+            if not unique_models:
+                return
+            # the version the changed rows are stamped with, only stored if some row of the match changes.
+            # the version rows are locked in match order, so batches of overlapping matches can't deadlock
+            versions = {
+                match_id: self._lock_version(session, match_id) + 1
+                for match_id in sorted({projection['match_id'] for projection in unique_models})
+            }
+            unique_models = [
+                {**projection, 'version': versions[projection['match_id']]} for projection in unique_models
+            ]
+            for match_id in versions:
+                PlayerStatsRepository.apply_projection_changes(
+                    session, match_id, [projection for projection in unique_models if projection['match_id'] == match_id]
+                )
+
             # TODO: this is being triggered but why don't I see the inserts?
             self.logger.info(f"upserting {len(unique_models)} projections")
-            stmt = insert(MatchProjectionModel).values(unique_models)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=['event_id'],  # Use primary key instead of named constraint
-                set_=stmt.excluded
-            )
-            session.execute(stmt)
+            # NOTE: executemany of one cached statement (sent in pages of rows, see insertmanyvalues):
+            # compiling .values(rows) costs more than the upsert itself for a whole match / matchday
+            written = session.execute(self._upsert_stmt(), unique_models)
+            # unchanged rows are skipped by the ON CONFLICT condition, so they are not returned
+            changed = {row.match_id for row in written}
+            for match_id in sorted(changed):
+                self._set_version(session, match_id, versions[match_id])
             session.commit()
             
         except Exception as e:
@@ -75,6 +117,177 @@ class MatchProjectionRepository:
         finally:
             session.close()
 
+        if not changed:
+            return
+        for listener in self._upsert_listeners:
+            try:
+                listener(changed)
+            except Exception:
+                self.logger.warning("Upsert listener %s failed", listener, exc_info=True)
+
+    @classmethod
+    def _upsert_stmt(cls):
+        stmt = insert(MatchProjectionModel.__table__)
+        return stmt.on_conflict_do_update(
+            index_elements=['match_id', 'event_id'],  # primary key (match_id is the partition key)
+            set_=stmt.excluded,
+            where=cls._changed(stmt)
+        ).returning(MatchProjectionModel.__table__.c.match_id)
+
+    @staticmethod
+    def _changed(stmt):
+        """ON CONFLICT condition: any column (except the version) differs from the stored row."""
+        table = MatchProjectionModel.__table__
+        conditions = []
+        for column in table.columns:
+            if column.name in ('match_id', 'event_id', 'version'):
+                continue
+            # NOTE: json columns are jsonb in postgres, compared by value (key order / whitespace don't matter)
+            conditions.append(column.is_distinct_from(stmt.excluded[column.name]))
+        return or_(*conditions)
+
+    @staticmethod
+    def _lock_version(session: Session, match_id: str) -> int:
+        """Current version of the match (0 for a new match), the row is locked until commit."""
+        session.execute(
+            insert(MatchProjectionVersionModel)
+            .values(match_id=match_id, version=0, updated_on=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=['match_id'])
+        )
+        return session.execute(
+            select(MatchProjectionVersionModel.version)
+            .where(MatchProjectionVersionModel.match_id == match_id)
+            .with_for_update()
+        ).scalar_one()
+
+    @staticmethod
+    def _set_version(session: Session, match_id: str, version: int) -> None:
+        session.execute(
+            update(MatchProjectionVersionModel)
+            .where(MatchProjectionVersionModel.match_id == match_id)
+            .values(version=version, updated_on=datetime.utcnow())
+        )
+
+    def get_version(self, match_id: str) -> Optional[int]:
+        """Current version of the match state, None if the match was never upserted."""
+        session = self.session_factory()
+        try:
+            return session.execute(self._version_stmt(match_id)).scalar_one_or_none()
+        finally:
+            session.close()
+
+    @staticmethod
+    def _version_stmt(match_id: str):
+        return (
+            select(MatchProjectionVersionModel.version)
+            .where(MatchProjectionVersionModel.match_id == match_id)
+        )
+
+    @staticmethod
+    def _events_since_stmt(match_id: str, after_version: int, after_event_id: int, limit: int):
+        table = MatchProjectionModel.__table__
+        return (
+            select(*table.columns)
+            .where(table.c.match_id == match_id)
+            .where(tuple_(table.c.version, table.c.event_id) > tuple_(after_version, after_event_id))
+            .order_by(table.c.version, table.c.event_id)
+            .limit(limit)
+        )
+
+    @staticmethod
+    def _match_state_stmt(match_id: str, with_match_version: bool = False):
+        table = MatchProjectionModel.__table__
+        if not with_match_version:
+            return select(*table.columns).where(table.c.match_id == match_id).order_by(table.c.event_id)
+        versions = MatchProjectionVersionModel.__table__
+        return (
+            select(*table.columns, versions.c.version.label('match_version'))
+            .select_from(table.outerjoin(versions, versions.c.match_id == table.c.match_id))
+            .where(table.c.match_id == match_id)
+            .order_by(table.c.event_id)
+        )
+
+    def get_events_since(
+        self,
+        match_id: str,
+        after_version: int = -1,
+        after_event_id: int = -1,
+        limit: int = 500,
+    ) -> List[dict]:
+        """
+        Events of the match changed after the (version, event_id) position, in (version, event_id) order.
+        NOTE: served by ix_match_projection_match_version_event. Versions of a match are assigned under
+        the match_projection_version row lock, so a committed version never appears behind a cursor.
+        """
+        session = self.session_factory()
+        try:
+            result = session.execute(self._events_since_stmt(match_id, after_version, after_event_id, limit))
+            keys = list(result.keys())
+            return [dict(zip(keys, row)) for row in result]
+        finally:
+            session.close()
+
+    def get_events_between(
+        self,
+        match_id: str,
+        period_id: int,
+        from_min: int = 0,
+        to_min: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Events of a match period from minute `from_min` up to `to_min` (inclusive), in match time order.
+        NOTE: a range scan of ix_match_projection_match_timeline in the match's partition.
+        """
+        table = MatchProjectionModel.__table__
+        stmt = (
+            select(*table.columns)
+            .where(table.c.match_id == match_id)
+            .where(table.c.period_id == period_id)
+            .where(table.c.time_min >= from_min)
+            .order_by(table.c.time_min, table.c.time_sec, table.c.event_id)
+        )
+        if to_min is not None:
+            stmt = stmt.where(table.c.time_min <= to_min)
+        session = self.session_factory()
+        try:
+            result = session.execute(stmt)
+            keys = list(result.keys())
+            return [dict(zip(keys, row)) for row in result]
+        finally:
+            session.close()
+
+    def get_events_with_qualifier(
+        self,
+        qualifier_id: int,
+        value: Optional[str] = None,
+        match_id: Optional[str] = None,
+        limit: int = 1000,
+    ) -> List[dict]:
+        """
+        Events carrying qualifier `qualifier_id` (with that `value` if given), optionally of a single match.
+        NOTE: postgres only. A jsonb containment test, answered by the ix_match_projection_qualifiers GIN index
+        (and restricted to the match's partition with `match_id`).
+        """
+        table = MatchProjectionModel.__table__
+        wanted = {'qualifierId': qualifier_id}
+        if value is not None:
+            wanted['value'] = value
+        stmt = (
+            select(*table.columns)
+            .where(type_coerce(table.c.qualifiers, JSONB).contains([wanted]))
+            .order_by(table.c.match_id, table.c.event_id)
+            .limit(limit)
+        )
+        if match_id is not None:
+            stmt = stmt.where(table.c.match_id == match_id)
+        session = self.session_factory()
+        try:
+            result = session.execute(stmt)
+            keys = list(result.keys())
+            return [dict(zip(keys, row)) for row in result]
+        finally:
+            session.close()
+
     def get_match_state(self, match_id: str) -> List[MatchProjectionModel]:
         """
         Return all projected events for this match as a list of MatchProjectionModel objects.
@@ -87,22 +300,89 @@ class MatchProjectionRepository:
         finally:
             session.close()
 
-    @classmethod
-    async def load_events_by_ids(cls, session: Session, event_ids: List[int]) -> List[MatchProjectionModel]:
+    def iter_match_state(self, match_id: str, batch_size: int = 500, with_match_version: bool = False) -> Iterator[dict]:
         """
-        Load events by their IDs from the database.
+        Yield the projected events of a match as plain dicts (same keys as MatchProjectionModel.to_dict).
+        NOTE: column-only Core query, so no ORM objects, no joined player / team relationships and 
+        no per-row class_mapper reflection. Rows are fetched in batches of `batch_size` and the 
+        session stays open until the iterator is exhausted or closed.
+        With `with_match_version`, every row also gets the 'match_version' of the match, read in the
+        same statement (same snapshot, even on a replica), i.e. the version the rows are consistent with.
         """
+        stmt = self._match_state_stmt(match_id, with_match_version).execution_options(yield_per=batch_size)
+        session = self.session_factory()
         try:
-            rows = (
-                session.query(MatchProjectionModel)
-                .filter(MatchProjectionModel.event_id.in_(event_ids))
-                .all()
-            )
-            # TODO: deserialize rows into MatchProjectionModel objects
-            return rows
+            result = session.execute(stmt)
+            keys = list(result.keys())
+            for partition in result.partitions():
+                for row in partition:
+                    yield dict(zip(keys, row))
+        finally:
+            session.close()
+
+    def get_events_by_ids(
+        self,
+        event_ids: List[int],
+        chunk_size: int = EVENT_ID_CHUNK_SIZE,
+        with_match_version: bool = False,
+    ) -> List[dict]:
+        """
+        Look up events by id, `chunk_size` ids per query (keeps the IN lists and query plans small).
+        With `with_match_version`, every row also gets the 'match_version' of its match, read in the
+        same statement, i.e. the version the row is consistent with (used by the event row cache).
+        """
+        table = MatchProjectionModel.__table__
+        columns = list(table.columns)
+        if with_match_version:
+            versions = MatchProjectionVersionModel.__table__
+            columns.append(versions.c.version.label('match_version'))
+            source = table.outerjoin(versions, versions.c.match_id == table.c.match_id)
+        else:
+            source = table
 
+        rows = []
+        session = self.session_factory()
+        try:
+            for start in range(0, len(event_ids), chunk_size):
+                chunk = event_ids[start:start + chunk_size]
+                result = session.execute(select(*columns).select_from(source).where(table.c.event_id.in_(chunk)))
+                keys = list(result.keys())
+                rows.extend(dict(zip(keys, row)) for row in result)
+            return rows
         finally:
             session.close()
 
-    
+    # Async variants of the read queries, for the API (see infra/async_db.py).
+    # Same statements as the sync methods above; the caller owns the AsyncSession.
+
+    @classmethod
+    async def get_version_async(cls, session: AsyncSession, match_id: str) -> Optional[int]:
+        return (await session.execute(cls._version_stmt(match_id))).scalar_one_or_none()
+
+    @classmethod
+    async def get_events_since_async(
+        cls,
+        session: AsyncSession,
+        match_id: str,
+        after_version: int = -1,
+        after_event_id: int = -1,
+        limit: int = 500,
+    ) -> List[dict]:
+        """Same as get_events_since, on an AsyncSession."""
+        result = await session.execute(cls._events_since_stmt(match_id, after_version, after_event_id, limit))
+        keys = list(result.keys())
+        return [dict(zip(keys, row)) for row in result]
 
+    @classmethod
+    async def stream_match_state(
+        cls,
+        session: AsyncSession,
+        match_id: str,
+        batch_size: int = 500,
+    ) -> AsyncIterator[dict]:
+        """Same as iter_match_state, on an AsyncSession (server side cursor, `batch_size` rows per fetch)."""
+        result = await session.stream(cls._match_state_stmt(match_id).execution_options(yield_per=batch_size))
+        keys = list(result.keys())
+        async for partition in result.partitions():
+            for row in partition:
+                yield dict(zip(keys, row))
@@ -0,0 +1,121 @@
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend_streaming.providers.opta.infra.models import OutboxMessageModel
+from backend_streaming.streamer.freshness import FreshnessTags
+from backend_streaming.streamer.publisher import OutgoingMessage
+
+
+class OutboxRepository:
+    """
+    Stores messages to be published in the 'outbox' table.
+    Rows are written in the same transaction as the domain events (see PostgresEventStore.save_events)
+    and drained by the OutboxRelay, which gives at-least-once delivery to the broker.
+    """
+    def __init__(self, session_factory, logger: Optional[logging.Logger] = None):
+        self.session_factory = session_factory
+        self.logger = logger or logging.getLogger(__name__)
+
+    @staticmethod
+    def to_model(
+        aggregate_id: str,
+        message: OutgoingMessage,
+        freshness: Optional[FreshnessTags] = None,
+    ) -> OutboxMessageModel:
+        """Convert a message into an outbox row (not yet added to any session)."""
+        return OutboxMessageModel(
+            aggregate_id=aggregate_id,
+            exchange=message.exchange,
+            routing_key=message.routing_key,
+            body=message.body,
+            content_type=message.content_type,
+            content_encoding=message.content_encoding,
+            headers=message.headers,
+            freshness=freshness.to_dict() if freshness else None,
+            created_on=datetime.utcnow(),
+            attempts=0,
+        )
+
+    @staticmethod
+    def to_message(row: OutboxMessageModel) -> Tuple[OutgoingMessage, Optional[FreshnessTags]]:
+        """Convert an outbox row back into a publishable message and its freshness tags."""
+        message = OutgoingMessage(
+            exchange=row.exchange,
+            routing_key=row.routing_key,
+            body=row.body,
+            headers=dict(row.headers or {}),
+            content_type=row.content_type,
+            content_encoding=row.content_encoding,
+        )
+        freshness = FreshnessTags.from_dict(row.freshness) if row.freshness else None
+        return message, freshness
+
+    def enqueue(self, rows: List[OutboxMessageModel]) -> None:
+        """Write outbox rows in their own transaction (for messages without domain events, e.g. 'stop')."""
+        if not rows:
+            return
+        session: Session = self.session_factory()
+        try:
+            session.add_all(rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def claim_batch(self, session: Session, limit: int) -> List[OutboxMessageModel]:
+        """
+        Lock the oldest unpublished rows in id order.
+        NOTE: SKIP LOCKED lets several relays drain the same table without publishing a row twice
+        (ignored on sqlite). The caller commits or rolls back the session.
+        """
+        return (
+            session.query(OutboxMessageModel)
+            .filter(OutboxMessageModel.published_on.is_(None))
+            .order_by(OutboxMessageModel.id.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def increment_attempts(self, session: Session, ids: List[int]) -> None:
+        """Count a failed publish for the given rows. The caller commits the session."""
+        if not ids:
+            return
+        (
+            session.query(OutboxMessageModel)
+            .filter(OutboxMessageModel.id.in_(ids))
+            .update({OutboxMessageModel.attempts: OutboxMessageModel.attempts + 1}, synchronize_session=False)
+        )
+
+    def count_pending(self) -> int:
+        session: Session = self.session_factory()
+        try:
+            return (
+                session.query(OutboxMessageModel)
+                .filter(OutboxMessageModel.published_on.is_(None))
+                .count()
+            )
+        finally:
+            session.close()
+
+    def delete_published(self, before: datetime) -> int:
+        """Remove rows that were published before `before`. Returns the number of deleted rows."""
+        session: Session = self.session_factory()
+        try:
+            deleted = (
+                session.query(OutboxMessageModel)
+                .filter(OutboxMessageModel.published_on < before)
+                .delete(synchronize_session=False)
+            )
+            session.commit()
+            return deleted
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
@@ -0,0 +1,248 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import logging
+
+from backend_streaming.providers.opta.domain.player_stats import STAT_COLUMNS, stats_delta
+from backend_streaming.providers.opta.infra.models import (
+    MatchProjectionModel,
+    MatchTournamentModel,
+    PlayerMatchStatsModel,
+    PlayerModel,
+    PlayerSeasonStatsModel,
+)
+from sqlalchemy import case, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+# columns of a match_projection row the stats depend on
+STATS_SOURCE_COLUMNS = ('event_id', 'player_id', 'contestant_id', 'type_id', 'outcome', 'qualifiers')
+
+
+class PlayerStatsRepository:
+    """
+    Per-player match stats (player_match_stats) and their season rollups (player_season_stats).
+    Both are maintained incrementally from the match_projection upserts, see apply_projection_changes.
+    """
+
+    def __init__(self, session_factory, logger: Optional[logging.Logger] = None):
+        self.session_factory = session_factory
+        self.logger = logger or logging.getLogger(__name__)
+
+    @classmethod
+    def apply_projection_changes(cls, session: Session, match_id: str, rows: List[dict], chunk_size: int = 1000):
+        """
+        Update the stats of a match for the projection `rows` about to be upserted (same transaction,
+        before the upsert, so the stored rows are the old state).
+        NOTE: the caller holds the match_projection_version row lock, so the updates of a match are serialized.
+        """
+        table = MatchProjectionModel.__table__
+        columns = [table.c[name] for name in STATS_SOURCE_COLUMNS]
+        old_rows = {}
+        event_ids = [row['event_id'] for row in rows]
+        for start in range(0, len(event_ids), chunk_size):
+            result = session.execute(
+                select(*columns)
+                .where(table.c.match_id == match_id)
+                .where(table.c.event_id.in_(event_ids[start:start + chunk_size]))
+            )
+            old_rows.update((row.event_id, row._asdict()) for row in result)
+
+        delta = stats_delta(old_rows, rows)
+        if not delta:
+            return
+        contestants = {row['player_id']: row.get('contestant_id') for row in rows if row.get('player_id')}
+        # stored rows are updated in player order, so concurrent matches lock season rows in the same order
+        players = sorted(delta)
+        now = datetime.utcnow()
+
+        stats = PlayerMatchStatsModel.__table__
+        stmt = insert(stats).values([
+            {
+                'match_id': match_id,
+                'player_id': player_id,
+                'contestant_id': contestants.get(player_id),
+                'updated_on': now,
+                **{stat: delta[player_id].get(stat, 0) for stat in STAT_COLUMNS},
+            }
+            for player_id in players
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['match_id', 'player_id'],
+            set_={
+                **{stat: stats.c[stat] + stmt.excluded[stat] for stat in STAT_COLUMNS},
+                'contestant_id': func.coalesce(stmt.excluded.contestant_id, stats.c.contestant_id),
+                'updated_on': stmt.excluded.updated_on,
+            },
+        ).returning(stats.c.player_id, stats.c.events)
+        events = dict(session.execute(stmt).all())
+
+        tournament_id = session.execute(
+            select(MatchTournamentModel.tournament_id).where(MatchTournamentModel.match_id == match_id)
+        ).scalar_one_or_none()
+        if tournament_id is None:
+            return
+        season_delta = {}
+        for player_id in players:
+            counts = dict(delta[player_id])
+            # the match counts as played while the player has any event in it
+            was_featured = events[player_id] - counts.get('events', 0) > 0
+            counts['matches'] = int(events[player_id] > 0) - int(was_featured)
+            season_delta[player_id] = counts
+        cls._add_to_season(session, tournament_id, season_delta, now)
+
+    @staticmethod
+    def _add_to_season(session: Session, tournament_id: str, delta: Dict[str, Dict[str, int]], now: datetime):
+        season = PlayerSeasonStatsModel.__table__
+        columns = ('matches',) + STAT_COLUMNS
+        stmt = insert(season).values([
+            {
+                'tournament_id': tournament_id,
+                'player_id': player_id,
+                'updated_on': now,
+                **{column: counts.get(column, 0) for column in columns},
+            }
+            for player_id, counts in sorted(delta.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['tournament_id', 'player_id'],
+            set_={
+                **{column: season.c[column] + stmt.excluded[column] for column in columns},
+                'updated_on': stmt.excluded.updated_on,
+            },
+        )
+        session.execute(stmt)
+
+    @staticmethod
+    def _season_totals(match_ids):
+        """player_match_stats summed per player over the matches (`matches`: those the player featured in)."""
+        stats = PlayerMatchStatsModel.__table__
+        return (
+            select(
+                stats.c.player_id,
+                func.sum(case((stats.c.events > 0, 1), else_=0)).label('matches'),
+                *[func.sum(stats.c[stat]).label(stat) for stat in STAT_COLUMNS],
+            )
+            .where(stats.c.match_id.in_(match_ids))
+            .group_by(stats.c.player_id)
+        )
+
+    def link_matches(self, matches: List[dict]) -> int:
+        """
+        Record the tournament of each match ('match_id', 'tournament_id', 'competition_id' as in the formatted
+        fixtures) and add the stats of the newly linked matches to their season. Returns the number of new links.
+        NOTE: a match keeps its first tournament. Stats written while the match is being linked may miss the
+        season table; rebuild_season_stats recomputes it from player_match_stats.
+        """
+        links = {
+            match['match_id']: {
+                'match_id': match['match_id'],
+                'tournament_id': match['tournament_id'],
+                'competition_id': match.get('competition_id'),
+            }
+            for match in matches
+        }
+        if not links:
+            return 0
+        session = self.session_factory()
+        try:
+            stmt = (
+                insert(MatchTournamentModel)
+                .values(list(links.values()))
+                .on_conflict_do_nothing(index_elements=['match_id'])
+                .returning(MatchTournamentModel.match_id, MatchTournamentModel.tournament_id)
+            )
+            linked = session.execute(stmt).all()
+            now = datetime.utcnow()
+            for tournament_id in {tournament_id for _, tournament_id in linked}:
+                match_ids = [match_id for match_id, tournament in linked if tournament == tournament_id]
+                totals = session.execute(self._season_totals(match_ids)).mappings().all()
+                if totals:
+                    delta = {row['player_id']: {k: v for k, v in row.items() if k != 'player_id'} for row in totals}
+                    self._add_to_season(session, tournament_id, delta, now)
+            session.commit()
+            return len(linked)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def rebuild_season_stats(self, tournament_id: str):
+        """Recompute the season table of a tournament from player_match_stats (backfill / repair)."""
+        season = PlayerSeasonStatsModel.__table__
+        match_ids = select(MatchTournamentModel.match_id).where(MatchTournamentModel.tournament_id == tournament_id)
+        totals = self._season_totals(match_ids).subquery()
+        columns = ('matches',) + STAT_COLUMNS
+        session = self.session_factory()
+        try:
+            session.execute(delete(season).where(season.c.tournament_id == tournament_id))
+            session.execute(
+                season.insert().from_select(
+                    ['tournament_id', 'player_id', 'updated_on', *columns],
+                    select(
+                        literal(tournament_id).label('tournament_id'),
+                        totals.c.player_id,
+                        literal(datetime.utcnow()).label('updated_on'),
+                        *[totals.c[column] for column in columns],
+                    ),
+                )
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def get_match_stats(self, match_id: str) -> List[dict]:
+        """Stats of every player of a match (primary key range of the match)."""
+        stats = PlayerMatchStatsModel.__table__
+        session = self.session_factory()
+        try:
+            result = session.execute(select(stats).where(stats.c.match_id == match_id).order_by(stats.c.player_id))
+            return [dict(row) for row in result.mappings()]
+        finally:
+            session.close()
+
+    def get_player_match_stats(self, player_id: str, tournament_id: Optional[str] = None) -> List[dict]:
+        """Per-match stats of a player (ix_player_match_stats_player_match), optionally of one season."""
+        stats = PlayerMatchStatsModel.__table__
+        stmt = select(stats).where(stats.c.player_id == player_id).order_by(stats.c.match_id)
+        if tournament_id is not None:
+            stmt = stmt.join(MatchTournamentModel, MatchTournamentModel.match_id == stats.c.match_id).where(
+                MatchTournamentModel.tournament_id == tournament_id
+            )
+        session = self.session_factory()
+        try:
+            return [dict(row) for row in session.execute(stmt).mappings()]
+        finally:
+            session.close()
+
+    def get_season_leaderboard(
+        self,
+        tournament_id: str,
+        stat: str,
+        limit: int = 20,
+        min_matches: int = 1,
+    ) -> List[dict]:
+        """
+        Top `limit` players of a season by `stat` (one of STAT_COLUMNS or 'matches'), with their name and team.
+        NOTE: reads the season's rows of player_season_stats (primary key range), no match_projection scan.
+        """
+        season = PlayerSeasonStatsModel.__table__
+        if stat != 'matches' and stat not in STAT_COLUMNS:
+            raise ValueError(f"Unknown stat: {stat}")
+        stmt = (
+            select(season, PlayerModel.match_name, PlayerModel.team_id, PlayerModel.team_name)
+            .outerjoin(PlayerModel, PlayerModel.player_id == season.c.player_id)
+            .where(season.c.tournament_id == tournament_id)
+            .where(season.c.matches >= min_matches)
+            .order_by(season.c[stat].desc(), season.c.player_id)
+            .limit(limit)
+        )
+        session = self.session_factory()
+        try:
+            return [dict(row) for row in session.execute(stmt).mappings()]
+        finally:
+            session.close()
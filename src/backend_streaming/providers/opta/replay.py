@@ -6,13 +6,14 @@ import json
 import asyncio
 
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 
 
 from backend_streaming.config.time import time_config, TimeConfig
 from backend_streaming.providers.opta.services.queries.match_projector import MatchProjection
 from backend_streaming.providers.opta.infra.models import DomainEventModel
 from backend_streaming.providers.opta.services.opta_provider import SingleGameStreamer
+from backend_streaming.streamer.broker import Broker
 from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
 # src/backend_streaming/providers/opta/infra/models.py
 from backend_streaming.providers.opta.infra.repo.event_store.postgres import PostgresEventStore
@@ -69,15 +70,17 @@ def replay_events(
 async def stream_read_model(
     match_id: str,
     speed: float = 500,
-    push_interval: int = 30
+    push_interval: int = 30,
+    broker: Optional[Broker] = None,
 ):
     """
     Reconstructs the READ model from the event store and streams the read states.
     NOTE: This simulates the event stream which could go past the end of the match (opta makes updates after)
+    Pass an InMemoryBroker as `broker` to replay without RabbitMQ.
     """
     projector = MatchProjection()
     projector_repo = MatchProjectionRepository(session_factory=None)
-    streamer = SingleGameStreamer(game_id=match_id)
+    streamer = SingleGameStreamer(game_id=match_id, publisher=broker)
     events, time_config = set_config(match_id, speed)
 
     # streaming events based on the time passed
@@ -106,9 +109,12 @@ async def stream_read_model(
         ]
         try:
             message_type = "update" if remaining else "stop"
-            await streamer.send_message(message_type=message_type, events=match_state_read)
+            await streamer.send_message(
+                message_type=message_type,
+                payload=[model.to_dict() for model in match_state_read]
+            )
         except Exception as e:
-            raise(f"Error sending message: {e}")
+            raise RuntimeError(f"Error sending message: {e}") from e
 
     # close the streamer
     await streamer.close()
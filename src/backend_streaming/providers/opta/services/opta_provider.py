@@ -3,12 +3,12 @@ import json
 import time
 import asyncio
 import logging
-import boto3
 from typing import List, Dict, Optional, Callable
 from datetime import datetime
 from dataclasses import fields
 
 from backend_streaming.providers.base import BaseProvider
+from backend_streaming.config.logging import LOGS_DIR, setup_match_logger, close_match_logger
 from backend_streaming.providers.opta.infra.oath import get_auth_headers
 from backend_streaming.providers.opta.infra.api import get_match_events
 from backend_streaming.providers.opta.constants import EPL_TOURNAMENT_ID
@@ -24,11 +24,16 @@ from backend_streaming.providers.opta.infra.repo.event_store.local import EventS
 from backend_streaming.providers.opta.infra.repo.match import MatchRepository
 from backend_streaming.providers.opta.infra.repo.event_store.postgres import PostgresEventStore
 from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository  
+from backend_streaming.providers.opta.infra.repo.outbox import OutboxRepository
 from backend_streaming.providers.opta.infra.models import MatchProjectionModel
-from backend_streaming.providers.opta.domain.events import DomainEvent
+from backend_streaming.providers.opta.domain.events import DomainEvent, GlobalEventAdded, EventEdited
 
 # streamer
 from backend_streaming.streamer.streamer import SingleGameStreamer
+from backend_streaming.streamer.broker import Broker
+from backend_streaming.streamer.publisher import close_publishers
+from backend_streaming.streamer.outbox_relay import OutboxRelay
+from backend_streaming.streamer.freshness import FreshnessTags, utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -44,10 +49,21 @@ class OptaStreamer:
         match_projection: Optional[MatchProjection] = None,
         match_projection_repo: Optional[MatchProjectionRepository] = None,
         fetch_events_func: Optional[Callable] = None, # Depends on the provider (Mock, API, etc.)        
+        outbox_repo: Optional[OutboxRepository] = None,
+        use_outbox: bool = False,
+        broker: Optional[Broker] = None,
+        logger: Optional[logging.Logger] = None,
     ):
         """
         We'll pass in a match_id that we want to track.
         We'll keep a local file event store, so we can replay domain events across runs.
+        
+        With `use_outbox` (Postgres event store only) updates are written to the outbox in the same
+        transaction as the domain events, so the poll loop never waits on the broker. An OutboxRelay
+        must be running to publish them (see process_matches / opta_scheduler.run_scheduler),
+        without one updates are published directly.
+        `broker` defaults to the process wide one (see streamer.publisher.get_broker).
+        Without a `logger`, a per-match one writing to `log_file` is set up and closed with the stream.
         """
         self.access_token = get_auth_headers()
         self.headers = {
@@ -57,16 +73,22 @@ class OptaStreamer:
         self.tournament_id = tournament_id
         
         if log_file is None:
-            log_file = f"{match_id}.log"
+            log_file = f"{LOGS_DIR}/{match_id}.log"
         
         if event_store_filename is None:
             event_store_filename = f"{match_id}.json"
         
-        self.logger = logger
+        # per-match logger, written off the event loop (see config.logging)
+        self._owns_logger = logger is None
+        self.logger = logger or setup_match_logger(f"{__name__}.{match_id}", log_file)
         
         
         self.event_store = event_store or PostgresEventStore(session_factory=get_session)
         self.match_repo = MatchRepository(self.event_store)
+        if use_outbox and not isinstance(self.event_store, PostgresEventStore):
+            raise ValueError("use_outbox requires the Postgres event store (same transaction as the domain events)")
+        self.use_outbox = use_outbox
+        self.outbox_repo = outbox_repo or (OutboxRepository(session_factory=get_session) if use_outbox else None)
         
         self.match_projection_repo = match_projection_repo or MatchProjectionRepository(session_factory=get_session)
         self.match_projection = match_projection or MatchProjection()
@@ -81,7 +103,7 @@ class OptaStreamer:
 
         # We'll track if we detect the match ended
         self.finished = False
-        self.streamer = SingleGameStreamer(game_id=self.match_id)
+        self.streamer = SingleGameStreamer(game_id=self.match_id, publisher=broker)
 
 
     async def run_live_stream(self, interval: int = 30):
@@ -96,20 +118,31 @@ class OptaStreamer:
             try:
                 # Fetch raw data from Opta
                 raw_data = await self.fetch_events_func(self.match_id)
+                freshness = FreshnessTags(fetched_at=utc_now())
                 live_data = raw_data.get("liveData", {})
                 raw_events = live_data.get("event", [])
                 
                 # create appropriate event types and save to domain events
                 self._process_raw_events(raw_events)
-                self.match_repo.save(self.agg)
+                self._collect_feed_times(freshness)
+
+                if self.use_outbox:
+                    self._commit_with_outbox(freshness)
+                else:
+                    self.match_repo.save(self.agg)
 
-                # TODO: maybe have the consumer services maintain their own READ models?
-                # If there are multiple services requiring event data, this makes sense...
-                match_state_read = self._update_projections()
-                self.agg.clear_uncommitted_events()
+                    # TODO: maybe have the consumer services maintain their own READ models?
+                    # If there are multiple services requiring event data, this makes sense...
+                    match_state_read = self._update_projections()
+                    freshness.committed_at = utc_now()
+                    self.agg.clear_uncommitted_events()
 
-                # send message via streamer in bulk.
-                self.streamer.send_message(message_type="update", payload=match_state_read)
+                    # send message via streamer in bulk.
+                    await self.streamer.send_message(
+                        message_type="update",
+                        payload=[model.to_dict() for model in match_state_read],
+                        freshness=freshness
+                    )
 
             except Exception as e:
                 self.logger.error(f"Error fetching events for match {self.match_id}: {e}", exc_info=True)
@@ -120,8 +153,48 @@ class OptaStreamer:
             else:
                 break
 
-        self.streamer.send_message(message_type="stop")
+        try:
+            if self.use_outbox:
+                stop_message = self.streamer.build_message(message_type="stop", payload=[])
+                self.outbox_repo.enqueue([OutboxRepository.to_model(self.match_id, stop_message)])
+            else:
+                await self.streamer.send_message(message_type="stop", payload=[])
+        except Exception as e:
+            self.logger.error(f"Error sending stop message for match {self.match_id}: {e}", exc_info=True)
         self.logger.info(f"Match {self.match_id} is finished. Exiting stream.")
+        if self._owns_logger:
+            close_match_logger(self.logger.name)
+
+    def _commit_with_outbox(self, freshness: FreshnessTags):
+        """
+        Save the uncommitted domain events and the resulting 'update' message in one transaction,
+        then upsert the read model. The OutboxRelay publishes the message.
+        NOTE: projecting is idempotent, so a failed commit is safely re-projected on the next poll.
+        """
+        match_state_read = self._project_uncommitted()
+        # published_at is stamped by the relay
+        message = self.streamer.build_message(
+            message_type="update",
+            payload=[model.to_dict() for model in match_state_read],
+        )
+        freshness.committed_at = utc_now()
+        outbox_row = OutboxRepository.to_model(self.match_id, message, freshness)
+        self.match_repo.save(self.agg, outbox_rows=[outbox_row])
+        self.agg.clear_uncommitted_events()
+
+        self.logger.info(f"Upserting current match state into DB...")
+        self.match_projection_repo.save_match_state(match_state_read)
+
+    def _collect_feed_times(self, freshness: FreshnessTags):
+        """
+        Tag the update with the feed time of every uncommitted domain event.
+        New events use the feed's lastModified (falling back to timeStamp), edits use the new lastModified if it changed.
+        """
+        for domain_evt in self.agg.get_uncommitted_events():
+            if isinstance(domain_evt, GlobalEventAdded):
+                freshness.add_feed_time(domain_evt.last_modified or domain_evt.time_stamp)
+            elif isinstance(domain_evt, EventEdited):
+                freshness.add_feed_time(domain_evt.changed_fields.get("last_modified"))
 
     def _process_raw_events(self, raw_events: List[Dict]):
         """
@@ -129,6 +202,7 @@ class OptaStreamer:
         emit domain events via aggregator handle methods.
         Also detect if the match ended.
         """
+        new_count, edited_count = 0, 0
         for ev in raw_events:
             new: EventInMatch = EventInMatch.from_dict(ev)
             feed_event_id = new.feed_event_id
@@ -136,7 +210,9 @@ class OptaStreamer:
             # If aggregator doesn't have it yet, it's new
             if feed_event_id not in self.agg.events:
                 self.agg.handle_new_event(new)
-                self.logger.info(f"New event {feed_event_id} added to aggregator.")
+                new_count += 1
+                # NOTE: per-event logs are debug only. The summary below is logged once per poll.
+                self.logger.debug("New event %s added to aggregator.", feed_event_id)
             else:
                 # Possibly detect type change
                 existing = self.agg.events[feed_event_id]
@@ -149,31 +225,44 @@ class OptaStreamer:
                         changed_fields=changed_fields,
                         old_fields=old_fields
                         )
+                    edited_count += 1
             # Also see if this event is an 'END' with period=2 => match finished
             if new.type_id == EventType.END.value and new.period_id == 2:
                 self.finished = True
                 self.logger.info(f"Match {self.match_id} ended.")
 
+        self.logger.info(
+            "Processed %s raw events: %s new, %s edited.", len(raw_events), new_count, edited_count,
+            extra={'match_id': self.match_id}
+        )
+
     def _update_projections(self) -> List[MatchProjectionModel]:
         """
         Read uncommitted domain events from aggregator and apply them to in-memory projection.
         Then, persist the current match state to the database via MatchProjectionRepository (upsert).
         """
+        orm_models = self._project_uncommitted()
+
+        # save current match state to DB
+        self.logger.info(f"Upserting current match state into DB...")
+        self.match_projection_repo.save_match_state(orm_models)
+        return orm_models
+
+    def _project_uncommitted(self) -> List[MatchProjectionModel]:
+        """
+        Apply the uncommitted domain events to the in-memory projection and return the current match state.
+        NOTE: a single match state is collection of events from the BEGINNING until the current event.
+        """
         uncommitted = self.agg.get_uncommitted_events()
         for i, domain_evt in enumerate(uncommitted):
             # Update the in-memory read model first
             self.match_projection.project(domain_evt)
 
-        # save current match state to DB
-        # NOTE: a single match state is collection of events from the BEGINNING until the current event.
-        self.logger.info(f"Upserting current match state into DB...")
         match_state = self.match_projection.get_current_match_state(self.match_id)
-        orm_models = [
+        return [
             self.match_projection_repo._convert_to_orm_model(self.match_id, feed_event_id, event_entry)
             for feed_event_id, event_entry in match_state.get("events_by_id", {}).items()
         ]
-        self.match_projection_repo.save_match_state(orm_models)
-        return orm_models
         
     def _compare_event_fields(self, existing: EventInMatch, new_event: EventInMatch):
         """
@@ -201,8 +290,11 @@ class OptaStreamer:
                 if not Qualifier.qualifiers_are_equal(old_val, new_val):
                     changed_fields[field_name] = [q.to_dict() for q in new_val]
                     old_fields[field_name] = [q.to_dict() for q in old_val]
-                    print(f"qualifiers changed: {changed_fields[field_name]}")
-                    print(f"qualifiers old: {old_fields[field_name]}")
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        self.logger.debug(
+                            "Qualifiers changed for event %s: %s -> %s",
+                            existing.feed_event_id, old_fields[field_name], changed_fields[field_name]
+                        )
             else:
                 # Normal direct comparison for other fields
                 if old_val != new_val:
@@ -216,21 +308,35 @@ class OptaStreamer:
 ########################
 # simple helper function
 ########################
-async def process_matches(match_ids: List[str], max_concurrent: int = 8):
+async def process_matches(match_ids: List[str], max_concurrent: int = 8, broker: Optional[Broker] = None):
     """Process multiple matches concurrently with rate limiting"""
     sem = asyncio.Semaphore(max_concurrent)
     
     async def process_match(match_id: str):
         async with sem:  # Limit concurrent executions
             event_store = PostgresEventStore(session_factory=get_session)
-            provider = OptaStreamer(match_id=match_id, event_store=event_store)
+            # published by the relay below
+            provider = OptaStreamer(match_id=match_id, event_store=event_store, broker=broker, use_outbox=True)
             await provider.run_live_stream()
     
     # Create tasks for all matches
     tasks = [process_match(match_id) for match_id in match_ids]
     
+    # one relay publishes the outbox of every match
+    relay = OutboxRelay(OutboxRepository(session_factory=get_session), publisher=broker)
+    relay.start()
+
     # Run all tasks concurrently and wait for completion
-    await asyncio.gather(*tasks)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # flush what is left in the outbox (incl. the stop messages)
+        try:
+            await relay.stop(drain=True)
+        except Exception as e:
+            logger.error(f"Outbox relay failed to drain on shutdown: {e}", exc_info=True)
+        # all matches share a single broker connection
+        await close_publishers()
 
 
 if __name__ == "__main__":
@@ -6,6 +6,9 @@ from datetime import timezone, timedelta
 from backend_streaming.providers.opta.infra.api import get_tournament_schedule
 from backend_streaming.providers.opta.services.opta_provider import OptaStreamer
 from backend_streaming.providers.opta.constants import EPL_TOURNAMENT_ID
+from backend_streaming.providers.opta.infra.db import get_session
+from backend_streaming.providers.opta.infra.repo.outbox import OutboxRepository
+from backend_streaming.streamer.outbox_relay import OutboxRelay
 
 async def start_stream(match_id: str, interval: int = 30):
     """
@@ -17,7 +20,8 @@ async def start_stream(match_id: str, interval: int = 30):
         interval: Polling interval in seconds (default: 30)
     """
     print(f"[{datetime.datetime.now(timezone.utc)}] Starting live stream for match {match_id}.")
-    provider = OptaStreamer(match_id=match_id)
+    # published by the OutboxRelay of run_scheduler
+    provider = OptaStreamer(match_id=match_id, use_outbox=True)
     await provider.run_live_stream(interval=interval)
 
 async def schedule_task(delay_seconds: float, match_id: str, interval: int = 30):
@@ -109,6 +113,10 @@ async def run_scheduler(interval: int = 30):
     Args:
         interval: Polling interval in seconds for the live stream (default: 30)
     """
+    # publishes the outbox written by every scheduled stream
+    relay = OutboxRelay(OutboxRepository(session_factory=get_session))
+    relay.start()
+
     await schedule_matches_for_tournament(EPL_TOURNAMENT_ID, interval=interval)
     
     # Keep the loop running so scheduled tasks can execute
@@ -0,0 +1,97 @@
+import os
+import asyncio
+import logging
+import threading
+
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend_streaming.config.executor import sync_executor
+from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ROWS = int(os.getenv('EVENT_ROW_CACHE_SIZE', 50000))
+
+
+class EventRowCache:
+    """
+    LRU cache of match_projection rows by event id, in front of get_events_by_ids.
+    Every row is stored with the version of its match it was read at. A cached row is only used
+    while its match is still at that version, so any projection upsert invalidates it:
+    - immediately for upserts done in this process (MatchProjectionRepository upsert listener)
+    - within the version TTL of `get_version` for upserts done by other processes
+    DB lookups are chunked and run in the bounded sync pool, off the event loop.
+    """
+    def __init__(
+        self,
+        repo: MatchProjectionRepository,
+        get_version: Callable[[str], Awaitable[Optional[int]]],
+        max_rows: int = DEFAULT_MAX_ROWS,
+    ):
+        self.repo = repo
+        self.get_version = get_version
+        self.max_rows = max_rows
+        # event_id -> (match_id, match version, row)
+        self._rows: "OrderedDict[int, Tuple[str, Optional[int], dict]]" = OrderedDict()
+        self._by_match: Dict[str, Set[int]] = {}
+        # upsert listeners may be called from other threads
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0}
+
+    def _put(self, event_id: int, match_id: str, version: Optional[int], row: dict):
+        self._rows[event_id] = (match_id, version, row)
+        self._rows.move_to_end(event_id)
+        self._by_match.setdefault(match_id, set()).add(event_id)
+        while len(self._rows) > self.max_rows:
+            old_id, (old_match, _, _) = self._rows.popitem(last=False)
+            self._discard_index(old_match, old_id)
+
+    def _discard_index(self, match_id: str, event_id: int):
+        ids = self._by_match.get(match_id)
+        if ids is not None:
+            ids.discard(event_id)
+            if not ids:
+                del self._by_match[match_id]
+
+    def invalidate_matches(self, match_ids: Iterable[str]):
+        """Drop every cached row of the given matches."""
+        with self._lock:
+            for match_id in match_ids:
+                for event_id in self._by_match.pop(match_id, set()):
+                    self._rows.pop(event_id, None)
+
+    async def get_many(self, event_ids: List[int]) -> List[dict]:
+        """Rows for the requested ids, in request order. Unknown ids are skipped."""
+        event_ids = list(dict.fromkeys(event_ids))
+        with self._lock:
+            cached = {event_id: self._rows[event_id] for event_id in event_ids if event_id in self._rows}
+
+        # one (TTL cached, coalesced) version lookup per match, not per row
+        match_ids = {match_id for match_id, _, _ in cached.values()}
+        current = dict(zip(match_ids, await asyncio.gather(*(self.get_version(m) for m in match_ids))))
+
+        found: Dict[int, dict] = {}
+        with self._lock:
+            for event_id, (match_id, version, row) in cached.items():
+                if version is not None and version == current[match_id]:
+                    found[event_id] = row
+                    if event_id in self._rows:
+                        self._rows.move_to_end(event_id)
+                else:
+                    self.stats['stale'] += 1
+        self.stats['hits'] += len(found)
+
+        misses = [event_id for event_id in event_ids if event_id not in found]
+        if misses:
+            self.stats['misses'] += len(misses)
+            rows = await sync_executor.run(self.repo.get_events_by_ids, misses, with_match_version=True)
+            with self._lock:
+                for row in rows:
+                    version = row.pop('match_version')
+                    found[row['event_id']] = row
+                    # matches without a version can't be validated, so they are not cached
+                    if version is not None:
+                        self._put(row['event_id'], row['match_id'], version, row)
+
+        return [found[event_id] for event_id in event_ids if event_id in found]
@@ -0,0 +1,213 @@
+import os
+import gzip
+import time
+import asyncio
+import logging
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import orjson
+
+from backend_streaming.config.executor import sync_executor
+from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
+
+logger = logging.getLogger(__name__)
+
+# number of rows serialized into a single chunk of a streamed response
+STREAM_CHUNK_ROWS = 200
+FORMATS = ('json', 'ndjson')
+MEDIA_TYPES = {'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+
+DEFAULT_MAX_ENTRIES = int(os.getenv('MATCH_EVENTS_CACHE_SIZE', 64))
+# how long a looked up match version is trusted before asking the DB again
+DEFAULT_VERSION_TTL = float(os.getenv('MATCH_EVENTS_VERSION_TTL', 1.0))
+GZIP_LEVEL = 5
+
+
+def json_array_chunks(first: dict, rows: Iterable[dict]) -> Iterator[bytes]:
+    """Serialize rows as a single JSON array, `STREAM_CHUNK_ROWS` rows per chunk."""
+    chunk = [b'[', orjson.dumps(first)]
+    for i, row in enumerate(rows, 1):
+        chunk.append(b',')
+        chunk.append(orjson.dumps(row))
+        if i % STREAM_CHUNK_ROWS == 0:
+            yield b''.join(chunk)
+            chunk = []
+    chunk.append(b']')
+    yield b''.join(chunk)
+
+
+def ndjson_chunks(first: dict, rows: Iterable[dict]) -> Iterator[bytes]:
+    """Serialize rows as newline delimited JSON, `STREAM_CHUNK_ROWS` rows per chunk."""
+    chunk = [orjson.dumps(first), b'\n']
+    for i, row in enumerate(rows, 1):
+        chunk.append(orjson.dumps(row))
+        chunk.append(b'\n')
+        if i % STREAM_CHUNK_ROWS == 0:
+            yield b''.join(chunk)
+            chunk = []
+    if chunk:
+        yield b''.join(chunk)
+
+
+SERIALIZERS = {'json': json_array_chunks, 'ndjson': ndjson_chunks}
+
+
+async def stream_chunks(format: str, rows: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """
+    Same output as SERIALIZERS[format], from an async row iterator (e.g. stream_match_state).
+    Nothing is yielded when there are no rows.
+    """
+    batch, started = [], False
+    async for row in rows:
+        batch.append(row)
+        if len(batch) == STREAM_CHUNK_ROWS:
+            yield _serialize_batch(format, batch, started)
+            batch, started = [], True
+    if batch:
+        yield _serialize_batch(format, batch, started)
+        started = True
+    if started and format == 'json':
+        yield b']'
+
+
+def _serialize_batch(format: str, batch: list, started: bool) -> bytes:
+    if format == 'ndjson':
+        return b''.join(orjson.dumps(row) + b'\n' for row in batch)
+    return (b',' if started else b'[') + b','.join(orjson.dumps(row) for row in batch)
+
+
+def _without_version(row: dict) -> dict:
+    del row['match_version']
+    return row
+
+
+def make_etag(match_id: str, version: int, format: str) -> str:
+    # weak: the same state is served with and without gzip
+    return f'W/"{match_id}:{version}:{format}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as required for GET)."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(',')}
+    if '*' in candidates:
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    return any((tag[2:] if tag.startswith('W/') else tag) == opaque for tag in candidates)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    match_id: str
+    version: int
+    format: str
+    body: bytes
+    gzip_body: bytes
+
+    @property
+    def etag(self) -> str:
+        return make_etag(self.match_id, self.version, self.format)
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.format]
+
+
+class MatchEventsCache:
+    """
+    In-process cache of serialized (+ gzipped) get_events_by_game_id responses keyed by
+    (match_id, version, format). The version comes from match_projection_version, which every
+    projection upsert bumps, so entries never have to be invalidated: a new version is a new key.
+    - versions are looked up at most once per `version_ttl` per match
+    - concurrent misses for the same key share a single DB query (request coalescing)
+    - least recently used entries are evicted beyond `max_entries`
+    NOTE: all state is only touched from the event loop. DB reads and serialization run in the bounded sync pool.
+    """
+    def __init__(
+        self,
+        repo: MatchProjectionRepository,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        version_ttl: float = DEFAULT_VERSION_TTL,
+    ):
+        self.repo = repo
+        self.max_entries = max_entries
+        self.version_ttl = version_ttl
+        self._entries: "OrderedDict[Tuple[str, int, str], CachedResponse]" = OrderedDict()
+        self._versions: Dict[str, Tuple[Optional[int], float]] = {}
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'version_lookups': 0}
+
+    async def _coalesce(self, key: tuple, func: Callable[[], Awaitable]):
+        """
+        Run `func` once for all concurrent callers with the same key.
+        NOTE: it runs as its own task, so a cancelled (disconnected) caller doesn't fail the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    def forget_versions(self, match_ids):
+        """Drop the looked up versions, e.g. after an upsert in this process."""
+        for match_id in match_ids:
+            self._versions.pop(match_id, None)
+
+    async def get_version(self, match_id: str) -> Optional[int]:
+        cached = self._versions.get(match_id)
+        if cached and time.monotonic() - cached[1] < self.version_ttl:
+            return cached[0]
+
+        async def lookup():
+            self.stats['version_lookups'] += 1
+            return await sync_executor.run(self.repo.get_version, match_id)
+
+        version = await self._coalesce(('version', match_id), lookup)
+        self._versions[match_id] = (version, time.monotonic())
+        return version
+
+    def _build(self, match_id: str, format: str) -> Optional[CachedResponse]:
+        # NOTE: the version comes from the statement reading the rows, not from get_version:
+        # the two reads may be served by different replicas, at different points of the match
+        rows = self.repo.iter_match_state(match_id, with_match_version=True)
+        first = next(rows, None)
+        if first is None:
+            return None
+        version = first.pop('match_version')
+        body = b''.join(SERIALIZERS[format](first, (_without_version(row) for row in rows)))
+        return CachedResponse(match_id, version, format, body, gzip.compress(body, compresslevel=GZIP_LEVEL))
+
+    async def get(self, match_id: str, version: int, format: str = 'json') -> Optional[CachedResponse]:
+        """
+        The response for (match_id, version, format), None if the match has no events.
+        NOTE: on a miss the returned response is the state read from the database, whose version
+        (see `CachedResponse.version` / `etag`) may differ from `version` if the readers lag
+        differently. It is cached under its own version, so a key always holds the rows of its version.
+        """
+        key = (match_id, version, format)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.stats['hits'] += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        async def build():
+            self.stats['misses'] += 1
+            return await sync_executor.run(self._build, match_id, format)
+
+        entry = await self._coalesce(('response',) + key, build)
+        # rows without a version (not committed with one yet on that reader) can't be keyed
+        if entry is not None and entry.version is not None:
+            key = (match_id, entry.version, format)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
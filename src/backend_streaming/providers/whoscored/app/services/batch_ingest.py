@@ -0,0 +1,134 @@
+"""
+Ingestion of a batch of WhoScored page sources (e.g. the games of a matchday):
+
+    1. the pages are parsed concurrently in the process pool (config.executor.process_executor)
+    2. the payload of every game is built in the sync pool (mappings, players, projections)
+    3. the players of all the games, then their projections, are written with batched upserts
+
+A page that can't be parsed or built is reported in its result, the other games are still written.
+Nothing is streamed: this is a backfill, see process_game for live games.
+"""
+import time
+import asyncio
+import logging
+
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, List, Optional
+
+from backend_streaming.config.executor import process_executor, sync_executor
+from backend_streaming.providers.opta.infra.db import get_session
+from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
+from backend_streaming.providers.whoscored.app.services.match_centre import PageSource, timed_parse_page_source
+from backend_streaming.providers.whoscored.app.services.run_scraper import build_payload
+from backend_streaming.providers.whoscored.app.services.scraper import SingleGameScraper
+from backend_streaming.providers.whoscored.infra.repos.scraper_repo import ScraperRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GameResult:
+    index: int                                  # position of the page in the batch
+    match_id: Optional[str] = None
+    opta_game_id: Optional[str] = None
+    status: str = 'ok'                          # 'ok' or 'error'
+    error: Optional[str] = None
+    events: int = 0
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    payload: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        # NOTE: not dataclasses.asdict, it would deep copy the payload
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def fail(self, error: Exception):
+        self.status = 'error'
+        self.error = f"{type(error).__name__}: {error}"
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _build(scraper_factory: Callable[[str], SingleGameScraper], match_id: str, data: dict):
+    start = time.perf_counter()
+    scraper = scraper_factory(match_id)
+    try:
+        events, payload = build_payload(scraper, data)
+        return scraper.ws_to_opta_mapping[match_id], events, payload, time.perf_counter() - start
+    finally:
+        scraper.close()
+
+
+def write_payloads(payloads: List[dict]) -> None:
+    """The players then the projections of all the games, one upsert (transaction) each."""
+    ScraperRepository(logger).upsert_players(
+        get_session(), [player for payload in payloads for player in payload['player_data']]
+    )
+    MatchProjectionRepository(get_session, logger).save_match_state(
+        [projection for payload in payloads for projection in payload['projections']]
+    )
+
+
+async def ingest_page_sources(
+    pages: List[PageSource],
+    include_payloads: bool = False,
+    scraper_factory: Callable[[str], SingleGameScraper] = SingleGameScraper,
+    write: Callable[[List[dict]], None] = write_payloads,
+) -> dict:
+    """
+    Parse, build and write the games of `pages` (full page sources).
+    Returns {'games': [per page result], 'timings_ms': {'parse', 'build', 'write', 'total'}}.
+    NOTE: a failed write fails the whole batch (raised), the upserts are idempotent so it can be sent again.
+    """
+    start = time.perf_counter()
+    results = [GameResult(index=index) for index in range(len(pages))]
+
+    parsed = await asyncio.gather(
+        *(process_executor.run(timed_parse_page_source, page) for page in pages), return_exceptions=True
+    )
+    parse_done = time.perf_counter()
+    to_build = {}
+    for result, outcome in zip(results, parsed):
+        if isinstance(outcome, Exception):
+            result.fail(outcome)
+            continue
+        result.match_id, data, parse_seconds = outcome
+        result.timings_ms['parse'] = _ms(parse_seconds)
+        if result.match_id in to_build:
+            result.fail(ValueError(f"Duplicate of game {to_build[result.match_id][0].index}"))
+            continue
+        to_build[result.match_id] = (result, data)
+
+    built = await asyncio.gather(
+        *(sync_executor.run(_build, scraper_factory, match_id, data) for match_id, (_, data) in to_build.items()),
+        return_exceptions=True
+    )
+    build_done = time.perf_counter()
+    payloads = []
+    for (result, _), outcome in zip(to_build.values(), built):
+        if isinstance(outcome, Exception):
+            logger.error(f"Failed to build game {result.match_id}: {outcome}", exc_info=outcome)
+            result.fail(outcome)
+            continue
+        result.opta_game_id, events, payload, build_seconds = outcome
+        result.events = len(events)
+        result.timings_ms['build'] = _ms(build_seconds)
+        if include_payloads:
+            result.payload = payload
+        payloads.append(payload)
+
+    if payloads:
+        await sync_executor.run(write, payloads)
+    done = time.perf_counter()
+    logger.info(f"Ingested {len(payloads)}/{len(pages)} games in {_ms(done - start)} ms")
+    return {
+        'games': [result.to_dict() for result in results],
+        'timings_ms': {
+            'parse': _ms(parse_done - start),
+            'build': _ms(build_done - parse_done),
+            'write': _ms(done - build_done),
+            'total': _ms(done - start),
+        },
+    }
+
@@ -1,17 +1,18 @@
-import json
-
 from typing import Dict, Any
-from backend_streaming.providers.whoscored.infra.config.config import paths
+from backend_streaming.providers.whoscored.app.services.mapping_service import get_mapping_service
 from backend_streaming.providers.whoscored.infra.repos.lineup_repo import LineupRepository
 
 class GetLineupService:
     def __init__(self, game_id: str):
-        self.ws_to_opta_match_mapping = json.load(open(paths.ws_to_opta_match_mapping_path, 'r'))
-        self.opta_to_ws_match_mapping = {v: k for k, v in self.ws_to_opta_match_mapping.items()}
-        self.team_mapping = json.load(open(paths.team_mapping_path, 'r'))
-        self.player_mapping = json.load(open(paths.player_mapping_path, 'r'))
+        # NOTE: views of the process wide mapping cache, nothing is loaded per instance
+        mappings = get_mapping_service()
+        self.ws_to_opta_match_mapping = mappings.mapping('match')
+        self.team_mapping = mappings.mapping('team')
+        self.player_mapping = mappings.mapping('player')
 
-        self.ws_game_id = self.opta_to_ws_match_mapping[game_id]
+        self.ws_game_id = mappings.source_of('match', game_id)
+        if self.ws_game_id is None:
+            raise KeyError(game_id)
         self.opta_game_id = game_id
         self.lineup_repo = LineupRepository(self.ws_game_id)
 
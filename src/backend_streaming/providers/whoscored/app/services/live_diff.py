@@ -0,0 +1,97 @@
+"""
+Live polling of a WhoScored game: end of game detection from the matchCentreData, and the diff of a
+fetch against the previous one, so that only what changed is persisted and published.
+
+    diff = diff_payload(previous_payload, payload)  # previous None: everything is new
+    if not diff.empty:
+        publish(diff.payload())                      # only the changed fields
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend_streaming.providers.opta.domain.value_objects.sport_event_enums import EventType
+
+# `elapsed` of a finished game (full time, after extra time, after penalties)
+FINISHED_ELAPSED = frozenset({'FT', 'AET', 'PEN', 'FIN'})
+POST_GAME_PERIOD = 14
+
+# stamped at every fetch, so left out of the comparison
+VOLATILE_FIELDS = frozenset({'time_stamp', 'last_modified', 'last_updated'})
+
+
+def is_end_of_game(data: Dict[str, Any]) -> bool:
+    """Whether the matchCentreData is the one of a finished game."""
+    if str(data.get('elapsed') or '').strip().upper() in FINISHED_ELAPSED:
+        return True
+    # NOTE: the end of the second half isn't the end of the game (extra time), the post game period is
+    return any(
+        (event.get('period') or {}).get('value') == POST_GAME_PERIOD
+        for event in reversed(data.get('events') or [])
+    )
+
+
+def _same(a: Dict, b: Dict) -> bool:
+    if a.keys() != b.keys():
+        return False
+    return all(a[key] == b[key] for key in a if key not in VOLATILE_FIELDS)
+
+
+def _changed_rows(previous: Iterable[Dict], current: Iterable[Dict], key: str) -> List[Dict]:
+    before = {row[key]: row for row in previous}
+    return [row for row in current if row[key] not in before or not _same(before[row[key]], row)]
+
+
+@dataclass
+class PayloadDiff:
+    projections: List[Dict] = field(default_factory=list)   # new or changed events
+    removed_event_ids: List[int] = field(default_factory=list)
+    # the stored rows of the removed events, marked deleted (saved, not published)
+    deleted_projections: List[Dict] = field(default_factory=list)
+    player_data: List[Dict] = field(default_factory=list)   # new or changed players
+    score: Optional[Dict] = None
+    lineup_info: Optional[Dict] = None
+
+    @property
+    def empty(self) -> bool:
+        return not (self.projections or self.removed_event_ids or self.player_data or self.score or self.lineup_info)
+
+    def payload(self) -> Dict[str, Any]:
+        """Message payload with the changed fields only (same keys as a full payload)."""
+        payload = {}
+        if self.score is not None:
+            payload['score'] = self.score
+        if self.projections:
+            payload['projections'] = self.projections
+        if self.removed_event_ids:
+            payload['removed_event_ids'] = self.removed_event_ids
+        if self.player_data:
+            payload['player_data'] = self.player_data
+        if self.lineup_info is not None:
+            payload['lineup_info'] = self.lineup_info
+        return payload
+
+
+def diff_payload(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> PayloadDiff:
+    """What changed in `current` since `previous` (two payloads of fetch_payload)."""
+    if previous is None:
+        return PayloadDiff(
+            projections=current['projections'],
+            player_data=current['player_data'],
+            score=current['score'],
+            lineup_info=current['lineup_info'],
+        )
+    current_ids = {projection['event_id'] for projection in current['projections']}
+    # NOTE: WhoScored sometimes deletes events, they stay in match_projections as deleted events
+    removed = [projection for projection in previous['projections'] if projection['event_id'] not in current_ids]
+    now = datetime.now().isoformat()
+    return PayloadDiff(
+        projections=_changed_rows(previous['projections'], current['projections'], 'event_id'),
+        removed_event_ids=[projection['event_id'] for projection in removed],
+        deleted_projections=[
+            {**projection, 'type_id': EventType.DELETED_EVENT.value, 'last_modified': now} for projection in removed
+        ],
+        player_data=_changed_rows(previous['player_data'], current['player_data'], 'player_id'),
+        score=current['score'] if current['score'] != previous['score'] else None,
+        lineup_info=current['lineup_info'] if current['lineup_info'] != previous['lineup_info'] else None,
+    )
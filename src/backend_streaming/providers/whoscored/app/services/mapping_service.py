@@ -0,0 +1,185 @@
+"""
+WhoScored -> Opta id mappings (players, teams, matches, competitions, tournaments), stored in the
+id_mappings table and cached in memory for the whole process.
+
+    mappings = get_mapping_service()
+    mappings.get('player', ws_player_id)            # O(1) from the cache
+    mappings.source_of('match', opta_match_id)      # reverse lookup, O(1) from the cache
+    ids, created = mappings.ensure('player', ws_player_ids, new_id)
+
+Each kind is loaded with one query on first use. Mappings are never changed once stored, so the
+cache only grows: a miss (e.g. an entity added by another worker since) is looked up in the table,
+and the reverse index is updated with the new rows only. `mapping(kind)` is a shared view of the
+cache (no copy) with the same fallback, so setting up a scraper / lineup service is dict lookups.
+`ensure` writes all the missing ids of a batch in one insert-if-absent transaction: when two workers
+mint an id for the same entity, both end up with the one stored first.
+"""
+import uuid
+import random
+import string
+import logging
+import threading
+
+from collections.abc import Mapping as MappingABC
+from typing import Callable, Dict, Iterable, Iterator, Mapping, Optional, Set, Tuple
+
+from backend_streaming.providers.opta.infra.db import get_session
+from backend_streaming.providers.whoscored.infra.repos.mapping_repo import MappingRepository
+
+MAPPING_KINDS = ('player', 'team', 'match', 'competition', 'tournament')
+# a new id colliding with another entity's (unique target) is minted again, this many times at most
+MAX_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+def random_opta_id(source_id: Optional[str] = None) -> str:
+    """Random Opta-like id (players)."""
+    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=random.randint(20, 25)))
+
+
+def uuid_id(length: int) -> Callable[[str], str]:
+    """Factory of uuid4 based ids of `length` hex characters (teams, matches: 26, tournaments: 24)."""
+    return lambda source_id=None: uuid.uuid4().hex[:length]
+
+
+def prefixed_uuid_id(source_id: str) -> str:
+    """The source id followed by 20 uuid4 hex characters (competitions)."""
+    return source_id + uuid.uuid4().hex[:20]
+
+
+class MappingView(MappingABC):
+    """
+    Read-only view of the cached mappings of a kind.
+    view[id] looks a miss up in the table, get() / `in` only read the cache (no query per unknown id).
+    """
+
+    def __init__(self, service: 'MappingService', kind: str):
+        self._service = service
+        self._kind = kind
+        self._cache = service._cache(kind)
+
+    def __getitem__(self, source_id) -> str:
+        target = self._cache.get(source_id)
+        if target is None:
+            target = self._service.get(self._kind, source_id)
+            if target is None:
+                raise KeyError(source_id)
+        return target
+
+    def get(self, source_id, default=None) -> Optional[str]:
+        return self._cache.get(source_id, default)
+
+    def __contains__(self, source_id) -> bool:
+        return source_id in self._cache
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._cache)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class MappingService:
+    """Process wide, bidirectional cache of the id_mappings table (see module docstring)."""
+
+    def __init__(self, repository: MappingRepository):
+        self.repository = repository
+        self._forward: Dict[str, Dict[str, str]] = {}
+        self._reverse: Dict[str, Dict[str, str]] = {}
+        self._views: Dict[str, MappingView] = {}
+        # loads and inserts are serialized (sync_executor threads); reads only touch the dicts
+        self._lock = threading.RLock()
+
+    def _cache(self, kind: str) -> Dict[str, str]:
+        if kind not in MAPPING_KINDS:
+            raise ValueError(f"Unknown mapping kind: {kind}")
+        forward = self._forward.get(kind)
+        if forward is None:
+            with self._lock:
+                if kind not in self._forward:
+                    forward = self.repository.load(kind)
+                    self._reverse[kind] = {target: source for source, target in forward.items()}
+                    self._forward[kind] = forward
+                    logger.info(f"Loaded {len(forward)} {kind} mappings")
+                forward = self._forward[kind]
+        return forward
+
+    def _remember(self, kind: str, mappings: Dict[str, str]):
+        with self._lock:
+            self._forward[kind].update(mappings)
+            self._reverse[kind].update((target, source) for source, target in mappings.items())
+
+    def mapping(self, kind: str) -> Mapping[str, str]:
+        """Read-only view of the mappings of `kind` (source id -> target id), shared and kept up to date."""
+        view = self._views.get(kind)
+        if view is None:
+            view = self._views.setdefault(kind, MappingView(self, kind))
+        return view
+
+    def get(self, kind: str, source_id) -> Optional[str]:
+        if source_id is None:
+            return None
+        source_id = str(source_id)
+        target = self._cache(kind).get(source_id)
+        if target is None:
+            found = self.repository.find(kind, [source_id])
+            if found:
+                self._remember(kind, found)
+                target = found[source_id]
+        return target
+
+    def source_of(self, kind: str, target_id) -> Optional[str]:
+        if target_id is None:
+            return None
+        target_id = str(target_id)
+        self._cache(kind)
+        source = self._reverse[kind].get(target_id)
+        if source is None:
+            found = self.repository.find_sources(kind, [target_id])
+            if found:
+                self._remember(kind, {source: target for target, source in found.items()})
+                source = found[target_id]
+        return source
+
+    def ensure(
+        self,
+        kind: str,
+        source_ids: Iterable,
+        new_id: Callable[[str], str],
+    ) -> Tuple[Dict[str, str], Set[str]]:
+        """
+        Target id of every source id, minting `new_id(source_id)` for the ones without one.
+        Returns ({source id: target id}, source ids whose id was created by this call).
+        """
+        source_ids = list(dict.fromkeys(str(source_id) for source_id in source_ids))
+        cache = self._cache(kind)
+        missing = [source_id for source_id in source_ids if source_id not in cache]
+        created = set()
+        for _ in range(MAX_ATTEMPTS):
+            if not missing:
+                break
+            proposed = {source_id: new_id(source_id) for source_id in missing}
+            stored = self.repository.insert_if_absent(kind, proposed)
+            self._remember(kind, stored)
+            created.update(source_id for source_id, target in stored.items() if proposed[source_id] == target)
+            missing = [source_id for source_id in missing if source_id not in stored]
+        if missing:
+            raise RuntimeError(f"Could not store {kind} mappings of {missing}")
+        if created:
+            logger.info(f"Created {len(created)} {kind} mappings")
+        return {source_id: cache[source_id] for source_id in source_ids}, created
+
+
+_service: Optional[MappingService] = None
+_service_lock = threading.Lock()
+
+
+def get_mapping_service() -> MappingService:
+    """Process wide mapping service of the primary database."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = MappingService(MappingRepository(get_session))
+    return _service
@@ -0,0 +1,114 @@
+"""
+Extraction of `matchCentreData` (the match JSON) from WhoScored page sources.
+
+The object is found by its `matchCentreData:` key, then orjson's parser both finds where it ends and
+decodes it: parsing from the opening brace stops with "unexpected content after document" at the
+end of the object (a scan aware of strings and escapes, without building any Python objects),
+and exactly that span is decoded. For a `bytes` page both passes read a memoryview of the page
+(no copy of an ASCII page, a non-ASCII one is decoded up to the end of the object to turn orjson's
+character offset into a byte offset), for a `str` page the text after the key.
+
+    match_id, data = parse_page_source(page)     # full page: 'matchId:123 ... matchCentreData: {...},'
+    data = load_match_centre(text)               # the object alone, as saved in raw_page_sources
+"""
+import re
+import time
+
+from typing import Dict, Tuple, Union
+
+import orjson
+
+PageSource = Union[str, bytes]
+
+_PATTERNS = {
+    str: {
+        'match_centre': re.compile(r'matchCentreData\s*:\s*(?={)'),
+        'match_id': re.compile(r'matchId\s*:\s*(\d+)'),
+    },
+    bytes: {
+        'match_centre': re.compile(rb'matchCentreData\s*:\s*(?={)'),
+        'match_id': re.compile(rb'matchId\s*:\s*(\d+)'),
+    },
+}
+
+
+def _byte_offset(page: bytes, start: int, chars: int) -> int:
+    """Offset from `start` of the end of its first `chars` (UTF-8) characters."""
+    if page.isascii():
+        return chars
+    # a character is at most 4 bytes. NOTE: a character cut at the end of the span is dropped, it is
+    # after the first `chars` ones (which orjson parsed, so they are valid UTF-8)
+    span = str(memoryview(page)[start:start + 4 * chars], 'utf-8', 'ignore')
+    return len(span[:chars].encode())
+
+
+def _is_bytes(page: PageSource) -> bool:
+    return isinstance(page, (bytes, bytearray))
+
+
+def _patterns(page: PageSource) -> dict:
+    return _PATTERNS[bytes if _is_bytes(page) else str]
+
+
+def decode_object(page: PageSource, start: int) -> Tuple[Dict, int]:
+    """(decoded value, end offset) of the JSON value starting at `page[start]`, whatever follows it."""
+    rest = memoryview(page)[start:] if _is_bytes(page) else page[start:]
+    try:
+        return orjson.loads(rest), len(page)
+    except orjson.JSONDecodeError as e:
+        error = e
+    # NOTE: orjson reports the offset where the content after the value starts, in characters
+    # (for bytes too), so for a bytes page it is converted to a byte offset
+    if error.pos:
+        end = _byte_offset(page, start, error.pos) if _is_bytes(page) else error.pos
+        try:
+            return orjson.loads(rest[:end]), start + end
+        except orjson.JSONDecodeError:
+            pass
+    raise ValueError(f"Invalid JSON format: {error}")
+
+
+def find_match_centre(page: PageSource) -> int:
+    """Offset of the matchCentreData object (its opening brace) in a full page source."""
+    marker = _patterns(page)['match_centre'].search(page)
+    if not marker:
+        raise ValueError("Could not find matchCentreData in the provided text")
+    return marker.end()
+
+
+def find_match_id(page: PageSource) -> str:
+    match = _patterns(page)['match_id'].search(page)
+    if not match:
+        raise ValueError("Could not find matchId in the provided text")
+    match_id = match.group(1)
+    return match_id.decode() if isinstance(match_id, bytes) else match_id
+
+
+def parse_page_source(page: PageSource) -> Tuple[str, Dict]:
+    """(match id, matchCentreData) of a full page source."""
+    match_id = find_match_id(page)
+    data, _ = decode_object(page, find_match_centre(page))
+    return match_id, data
+
+
+def timed_parse_page_source(page: PageSource) -> Tuple[str, Dict, float]:
+    """parse_page_source and its duration in seconds (run in the process pool, see batch_ingest.py)."""
+    start = time.perf_counter()
+    match_id, data = parse_page_source(page)
+    return match_id, data, time.perf_counter() - start
+
+
+def load_match_centre(text: PageSource) -> Dict:
+    """
+    matchCentreData from either a full page or the object alone (the saved raw page sources,
+    possibly followed by a trailing comma or the rest of the script).
+    """
+    marker = _patterns(text)['match_centre'].search(text)
+    if marker:
+        start = marker.end()
+    else:
+        start = text.find(b'{' if _is_bytes(text) else '{')
+        if start < 0:
+            raise ValueError("No JSON object in the provided text")
+    data, _ = decode_object(text, start)
+    return data
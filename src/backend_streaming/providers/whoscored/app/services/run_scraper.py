@@ -1,122 +1,176 @@
+import os
 import sys
 import asyncio
 import logging
-import json
-import re
-from typing import List, Tuple, Optional
-from datetime import datetime
+import orjson
+from typing import Awaitable, Callable, List, Tuple, Optional, Union
+from datetime import datetime, timedelta
+from backend_streaming.config.executor import sync_executor
+from backend_streaming.config.logging import close_match_logger
 from backend_streaming.streamer.streamer import SingleGameStreamer
+from backend_streaming.streamer.broker import Broker
+from backend_streaming.streamer.freshness import FreshnessTags, utc_now
 from backend_streaming.providers.whoscored.app.services.scraper import SingleGameScraper
+from backend_streaming.providers.whoscored.app.services.match_centre import PageSource, parse_page_source
+from backend_streaming.providers.whoscored.app.services.live_diff import PayloadDiff, diff_payload, is_end_of_game
 from backend_streaming.providers.whoscored.infra.config.logger import setup_game_logger
-from backend_streaming.providers.whoscored.infra.config.config import paths
+from backend_streaming.providers.whoscored.infra.config.config import get_paths
 
-def parse_game_txt(game_txt: str) -> Tuple[str, str]:
+# live mode: seconds between two fetches of the page source, and when to give up on a game
+LIVE_POLL_INTERVAL = float(os.getenv('WHOSCORED_POLL_INTERVAL', 30))
+LIVE_MAX_DURATION = timedelta(minutes=float(os.getenv('WHOSCORED_MAX_GAME_MINUTES', 240)))
+
+def parse_game_txt(game_txt: PageSource) -> Tuple[str, dict]:
     """
-    Parse the game_txt and extract the game_id and matchCentreData.
+    Parse the game_txt (a full page source) and extract the game_id and the decoded matchCentreData.
+    NOTE: a single scan of the page, see match_centre.py
     """
-    # Extract matchId using regex
-    match_id_pattern = r'matchId:(\d+)'
-    match_id_match = re.search(match_id_pattern, game_txt)
-    if not match_id_match:
-        raise ValueError("Could not find matchId in the provided text")
-    
-    match_id = match_id_match.group(1)
-    
-    # Extract matchCentreData using regex
-    match_centre_pattern = r'matchCentreData: (\{.*?}),\s*matchCentreEventTypeJson'
-    match_centre_match = re.search(match_centre_pattern, game_txt, re.DOTALL)
-    if not match_centre_match: 
-        raise ValueError("Could not find matchCentreData in the provided text")
-    
-    match_centre_data = match_centre_match.group(1)
-    return match_id, match_centre_data
+    return parse_page_source(game_txt)
 
 
-def save_game_txt(match_id: str, match_centre_data: str) -> None:
-    file_path = paths.raw_pagesources_dir / f"{match_id}.txt"
+def save_game_txt(match_id: str, match_centre_data: Union[str, dict]) -> None:
+    file_path = get_paths().raw_pagesources_dir / f"{match_id}.txt"
+    if isinstance(match_centre_data, dict):
+        match_centre_data = orjson.dumps(match_centre_data).decode()
     with open(file_path, "w") as f:
         f.write(match_centre_data)
 
 
+def build_payload(
+    scraper: SingleGameScraper,
+    match_centre_data: Optional[Union[PageSource, dict]] = None,
+) -> Tuple[list, dict]:
+    """
+    Events and payload (score, projections, players, lineups) of the game, nothing is saved.
+    NOTE: new players / teams get their id mappings stored (see MappingService.ensure).
+    """
+    # this populates the json_data attribute in the scraper
+    # NOTE: the ORDER of operations for fetching and updating mappings is important.
+    events = scraper.fetch_events(match_centre_data)
+    score_dict = scraper.get_score()
+    player_data = scraper.build_player_data()
+    lineup_info = scraper.extract_lineup()
+    projections = scraper.build_projections(events)
+
+    payload = {
+        'score': score_dict,
+        'projections': projections,
+        'player_data': player_data,
+        'lineup_info': lineup_info
+    }
+    return events, payload
+
+
+def fetch_payload(
+    scraper: SingleGameScraper,
+    match_centre_data: Optional[Union[PageSource, dict]] = None,
+    previous: Optional[dict] = None,
+) -> Tuple[list, dict, FreshnessTags, PayloadDiff]:
+    """
+    One fetch of the game: events, score, players and lineups.
+    Only what changed since the `previous` payload (everything without one) is saved: the new / changed
+    players and projections, and the removed events marked as deleted. Returns the full payload (the `previous` of the next fetch) and the diff.
+    Blocking, see process_game.
+    """
+    # NOTE: WhoScored has no reliable feed time, so freshness starts at fetch time
+    freshness = FreshnessTags(fetched_at=utc_now())
+    events, payload = build_payload(scraper, match_centre_data)
+    diff = diff_payload(previous, payload)
+    scraper.upsert_players(diff.player_data)
+    # the removed events are kept as deleted events (like opta's), so the stats and cursors follow
+    scraper.save_projection_rows(diff.projections + diff.deleted_projections)
+    freshness.committed_at = utc_now()
+    return events, payload, freshness, diff
+
+
 async def process_game(
     game_id: str,
     scraper: SingleGameScraper,
-    match_centre_data: Optional[str] = None,
-    send_via_stream: bool = True
+    match_centre_data: Optional[Union[PageSource, dict]] = None,
+    send_via_stream: bool = True,
+    broker: Optional[Broker] = None,
+    live: bool = False,
+    poll_interval: float = LIVE_POLL_INTERVAL,
+    max_duration: timedelta = LIVE_MAX_DURATION,
+    fetch_page_func: Optional[Callable[[str], Awaitable[PageSource]]] = None,
 ) -> dict:
     """
-    Process a single game, continuously fetching events until game completion
-    or maximum duration reached.
-    NOTE: for manual fetches, 
+    Process a single game: one fetch, or with `live` a fetch every `poll_interval` seconds until
+    the matchCentreData says the game is over (see live_diff.is_end_of_game) or `max_duration`.
+    Every fetch saves and publishes (as an update) only what changed since the previous one, nothing
+    if nothing did. The last message is an empty stop message.
+    NOTE: `match_centre_data` is the first page, the next ones come from `fetch_page_func(game_id)`
+    (by default, the raw page source file the scraper loads, which the browser keeps up to date).
     # NOTE: scraper is only passed in when running manually
+    NOTE: `broker` defaults to the process wide one (see streamer.publisher.get_broker)
     """
-    assert send_via_stream != scraper._is_manual_scraper, \
-        "Manual scrapers should not send via stream. Too error prone..."
+    if not live:
+        assert send_via_stream != scraper._is_manual_scraper, \
+            "Manual scrapers should not send via stream. Too error prone..."
 
     # setup
     logger = setup_game_logger(game_id)
-    print(f"========== logger: {logger} ==========")
     start_time = datetime.now()
     fetch_stats = {
         'total_fetches': 0,
         'successful_fetches': 0,
+        'changed_fetches': 0,
         'total_events': 0,
         'last_fetch_time': None,
         'last_event_count': 0
     }
     try:
-        logger.info(f"Starting game processor at {start_time}")
+        logger.info(f"Starting game processor at {start_time} (live: {live})")
         opta_game_id = scraper.ws_to_opta_mapping[game_id]
-        streamer = SingleGameStreamer(opta_game_id)
+        streamer = SingleGameStreamer(opta_game_id, publisher=broker, provider='whoscored')
+        # NOTE: only the latest full payload is kept, the previous ones were diffed against it
         payloads = []
+        previous = None
+        page = match_centre_data
         is_eog = False
         while not is_eog:
-            # TODO: implement proper condition to check for eog...
-            # For now, just running once to prevent infinite loop.
-            is_eog = True
+            # a manual fetch runs once, a live one until the end of the game (or max_duration)
+            is_eog = not live or datetime.now() - start_time >= max_duration
             try:
-                # this populates the json_data attribute in the scraper
-                # NOTE: the ORDER of operations for fetching and updating mappings is important.
-                events = scraper.fetch_events(match_centre_data)
-                print(f"---------- events ---------")
-                score_dict = scraper.get_score()
-                player_data = scraper.update_player_data()
-                print("========== player_data ==========")
-                lineup_info = scraper.extract_lineup()
-                print("========== lineup_info ==========")
-                projections = scraper.save_projections(events)
-                print("========== projections ==========")
-
-                # construct payload and store in memory (this is in case we want to see previous data)
-                payload = {
-                    'score': score_dict,
-                    'projections': projections,
-                    'player_data': player_data,
-                    'lineup_info': lineup_info
-                }
-                payloads.append(payload)
+                if page is None and fetch_page_func is not None:
+                    page = await fetch_page_func(game_id)
+                # NOTE: the scraper is sync (HTTP, parsing, DB), so it runs in the bounded sync pool
+                events, payload, freshness, diff = await sync_executor.run(fetch_payload, scraper, page, previous)
+                payloads = [payload]
+                is_eog = is_eog or is_end_of_game(scraper.json_data)
 
                 # By default, we always send but for manual fetch we choose not to.
                 # Doesn't matter if we send tbh, but just in case things break
-                if send_via_stream:
+                if send_via_stream and not diff.empty:
                     await stream(
                         streamer=streamer,
-                        data=payload,
+                        data=diff.payload(),
                         logger=logger, 
-                        is_eog=is_eog
+                        freshness=freshness
                     )
+                # NOTE: after the publish, so changes that failed to publish are diffed (and sent) again
+                previous = payload
                 
                 # log useful stats
                 fetch_stats['total_events'] = len(events)
                 fetch_stats['total_fetches'] += 1
+                fetch_stats['changed_fetches'] += not diff.empty
                 fetch_stats['last_fetch_time'] = datetime.now()
                 fetch_stats['last_event_count'] = len(events)
                 fetch_stats['successful_fetches'] += 1
                 
             except Exception as fetch_error:
+                fetch_stats['total_fetches'] += 1
                 logger.error(f"Error during fetch: {fetch_error}", exc_info=True)
+            finally:
+                page = None
+
+            if not is_eog:
+                await asyncio.sleep(poll_interval)
         
         # final send through streamer to dictate end of game. 
+        if send_via_stream:
+            await stream(streamer=streamer, data={}, logger=logger, is_eog=True)
         logger.info(f"Game processor completed. Final stats: {fetch_stats}")
         # TODO: instead of saving locally, save to db.
         # scraper.file_repo.save(
@@ -132,6 +186,9 @@ async def process_game(
     except Exception as e:
         logger.error(f"Fatal error in game processor: {e}", exc_info=True)
         raise
+    finally:
+        # NOTE: same 'game.<game_id>' logger as the scraper's, so this closes it too
+        close_match_logger(logger.name)
 
 
 async def stream(
@@ -139,21 +196,20 @@ async def stream(
     data: List[dict],
     logger: logging.Logger,
     is_eog: bool = False,
+    freshness: Optional[FreshnessTags] = None,
 ):
     """
     Helper function to stream data into main server asynchronously.
     Each data fields to have it's own message type.
+    NOTE: the streamer publishes over the process wide connection, so nothing is opened or closed here.
     """
     try:
         message_type = streamer.STOP_MESSAGE_TYPE if is_eog else streamer.PROGRESS_MESSAGE_TYPE
-        await streamer.connect()
-        await streamer.send_message(message_type, data)
+        await streamer.send_message(message_type, data, freshness=freshness)
         logger.info(f"Streamed fields: {data.keys()}")
     except Exception as e:
         logger.error(f"Failed to stream events: {e}")
         raise
-    finally:
-        await streamer.close()
 
 
 if __name__ == "__main__":
@@ -1,17 +1,17 @@
 import os
-import json
-import string
-import random
 from typing import List, Dict, Tuple, Optional, Union
 from datetime import datetime
 
 from backend_streaming.providers.opta.infra.db import get_session
+from backend_streaming.config.logging import close_match_logger
 from backend_streaming.providers.whoscored.infra.config.logger import setup_game_logger
+from backend_streaming.providers.whoscored.app.services.match_centre import PageSource, load_match_centre
+from backend_streaming.providers.whoscored.app.services.mapping_service import get_mapping_service, random_opta_id
 from backend_streaming.providers.whoscored.infra.repos.file_repo import FileRepository
 from backend_streaming.providers.whoscored.infra.repos.scraper_repo import ScraperRepository
 # NOTE: using MatchProjectionRepository originally defined for Opta provider
 from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
-from backend_streaming.providers.whoscored.infra.config.config import paths, type_to_paths
+from backend_streaming.providers.whoscored.infra.config.config import get_paths, get_type_to_paths
 
 # TODO: The mapping functionality is unnecessarily complex...
 
@@ -46,8 +46,8 @@ class SingleGameScraper:
         self.proj_repo = MatchProjectionRepository(session_factory=get_session, logger=self.logger)
         self.scraper_repo = ScraperRepository(logger=self.logger)
         self.file_repo = FileRepository(
-            paths=paths,
-            type_to_paths=type_to_paths,
+            paths=get_paths(),
+            type_to_paths=get_type_to_paths(),
             logger=self.logger
         )
         # init paths
@@ -56,15 +56,22 @@ class SingleGameScraper:
         # NOTE: this will be populated after the first fetch
         self.json_data = None
 
+    def close(self):
+        """Close the game logger once the game is done (its file is closed after the queued records)."""
+        close_match_logger(self.logger.name)
+
     def _init_mappings(self):
         """
-        Initialize paths for the scraper.
+        Initialize the mappings for the scraper: read-only views of the process wide cache (id_mappings table).
         """
-        self.ws_to_opta_mapping = self.file_repo.load('match')
-        self.player_mappings = self.file_repo.load('player')
-        self.team_mappings = self.file_repo.load('team')
+        self.mappings = get_mapping_service()
+        self.ws_to_opta_mapping = self.mappings.mapping('match')
+        self.player_mappings = self.mappings.mapping('player')
+        self.team_mappings = self.mappings.mapping('team')
+        # the match may have been added by another worker (fixtures) since the cache was loaded
+        self.mappings.get('match', self.game_id)
 
-    def fetch_events(self, page_source: Optional[str] = None) -> dict:
+    def fetch_events(self, page_source: Optional[Union[PageSource, Dict]] = None) -> dict:
         """
         Process game from raw pagesource and save to JSON.
         Will also save as match projection rows to update db and send via streamer.
@@ -91,6 +98,9 @@ class SingleGameScraper:
             self.logger.warning(f"No events found in game {self.game_id}")
             return []
         
+        # same for the teams, before they are looked up for every event
+        for team_key in [self.HOME_KEYWORD, self.AWAY_KEYWORD]:
+            self.mappings.get('team', self.json_data[team_key][self.TEAM_ID_KEYWORD])
         self.logger.info(f"Extracted {len(self.json_data['events'])} events from game {self.game_id}")
         return self.json_data['events']
     
@@ -116,9 +126,9 @@ class SingleGameScraper:
             'away_score': away_score
         }
     
-    def save_projections(self, events: List[dict]) -> List[dict]:
+    def build_projections(self, events: List[dict]) -> List[dict]:
         """
-        Converting events to projections and saving them to match_projections table.
+        Converting events to projections (rows of the match_projections table).
         """
         projections = []
         for event in events:
@@ -128,16 +138,27 @@ class SingleGameScraper:
             except ValueError as e:
                 # Log the missing player mapping
                 # NOTE: this player info should immdiately get updated in the 
-                self.logger.warning(f"Undetected player {event.get('playerId')} for event {event['id']}")
+                self.logger.warning("Undetected player %s for event %s", event.get('playerId'), event['id'])
                 continue
-        
+        return projections
+
+    def save_projection_rows(self, projections: List[dict]) -> None:
+        """
+        Saving projections to match_projections table (e.g. only the changed ones of a live fetch).
+        """
         try:
             if projections:
                 self.proj_repo.save_match_state(projections)
         except Exception as e:
             self.logger.error(f"Failed to save projections: {e}")
             raise
-            
+
+    def save_projections(self, events: List[dict]) -> List[dict]:
+        """
+        Converting events to projections and saving them to match_projections table.
+        """
+        projections = self.build_projections(events)
+        self.save_projection_rows(projections)
         return projections
         
     def extract_lineup(self) -> dict:
@@ -161,25 +182,18 @@ class SingleGameScraper:
         # )
         return lineup_info
 
-    def update_player_data(self) -> List[Dict[str, Union[str, int]]]:
+    def build_player_data(self) -> List[Dict[str, Union[str, int]]]:
         """
-        Update player data for players that don't exist in the database.
-        NOTE: if a new player is found, the player_mappings dictionary is updated.
+        Player rows of the match (players table).
+        NOTE: new players get an opta id, stored in id_mappings (all of them in one insert).
         """
         all_player_data = []
         player_info = self._extract_player_info()
+        opta_ids, _ = self.mappings.ensure('player', player_info, random_opta_id)
         for player_id, (player_name, jersey_number, ws_team_id) in player_info.items():
             first_name, last_name = self._format_names(player_name)
-            if player_id in self.player_mappings:
-                opta_id = self.player_mappings[player_id]
-            else:
-                # new player found. create opta id and update mapping
-                opta_id = self._create_opta_id()
-                self.player_mappings[player_id] = opta_id
-
-            # updating player data each time to keep up to date.
             player_data = {
-                'player_id': opta_id,
+                'player_id': opta_ids[player_id],
                 'team_id': self.team_mappings[ws_team_id],
                 'first_name': first_name,
                 'last_name': last_name,
@@ -189,14 +203,23 @@ class SingleGameScraper:
                 'shirt_number': jersey_number
             }
             all_player_data.append(player_data)
-            self.scraper_repo.insert_player_data(
-                session=get_session(),
-                **player_data
-            )
+        return all_player_data
+
+    def upsert_players(self, player_data: List[Dict[str, Union[str, int]]]) -> None:
+        """
+        Insert or update the players, all of them in one statement / transaction.
+        """
+        if player_data:
+            self.scraper_repo.upsert_players(get_session(), player_data)
+        self.logger.info(f"Updated {len(player_data)} players")
 
-        self.logger.info(f"Updated {len(all_player_data)} players")
-        # TODO: instead of saving locally, save to db. Keeping this for now though since we need proper mappings
-        self.file_repo.save("player", data=self.player_mappings)
+    def update_player_data(self) -> List[Dict[str, Union[str, int]]]:
+        """
+        Update player data for players that don't exist in the database.
+        """
+        # updating player data each time to keep up to date.
+        all_player_data = self.build_player_data()
+        self.upsert_players(all_player_data)
         return all_player_data
 
 
@@ -275,12 +298,6 @@ class SingleGameScraper:
         }
         return projection    
     
-    def _create_opta_id(self) -> str:
-        """
-        Create a random Opta-like ID.
-        """
-        return ''.join(random.choices(string.ascii_lowercase + string.digits, k=random.randint(20, 25)))
-    
     def _format_names(self, name: str) -> Tuple[str, str]:
         """
         Format name into first and last name.
@@ -290,32 +307,18 @@ class SingleGameScraper:
         last_name = name_parts[1] if len(name_parts) > 1 else ""
         return first_name, last_name
     
-    def _format_pagesource(self, raw_content: str) -> Dict:
+    def _format_pagesource(self, raw_content: Union[PageSource, Dict]) -> Dict:
         """
-        Format raw pagesource content into proper JSON.
-        Very basic checks include:
-            - Remove trailing comma if it exists
-            - Add closing brace if missing
-            - Check for required fields
+        Decode the matchCentreData of a page source (full page or the saved object, see match_centre.py)
+        and check for the required fields. Already decoded data (parse_game_txt) is only checked.
         """
-        # Remove trailing comma if it exists
-        if raw_content.rstrip().endswith(','):
-            raw_content = raw_content.rstrip().rstrip(',')
-        
-        # Add closing brace if missing
-        if raw_content.count('{') > raw_content.count('}'):
-            raw_content = raw_content + '}'
-        try:
-            data = json.loads(raw_content)
-            # Validate required fields
-            required_fields = [self.PLAYER_NAME_DICTIONARY_KEYWORD, self.EVENTS_KEYWORD, self.HOME_KEYWORD, self.AWAY_KEYWORD]
-            missing_fields = [field for field in required_fields if field not in data]
-            if missing_fields:
-                raise ValueError(f"Missing required fields: {missing_fields}")
-            return data
-            
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON format: {e}")
+        data = raw_content if isinstance(raw_content, dict) else load_match_centre(raw_content)
+        # Validate required fields
+        required_fields = [self.PLAYER_NAME_DICTIONARY_KEYWORD, self.EVENTS_KEYWORD, self.HOME_KEYWORD, self.AWAY_KEYWORD]
+        missing_fields = [field for field in required_fields if field not in data]
+        if missing_fields:
+            raise ValueError(f"Missing required fields: {missing_fields}")
+        return data
     
     def _format_lineup_data(self) -> tuple[dict, dict]:
         """
@@ -1,9 +1,31 @@
-import uuid
 from datetime import datetime
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 
 from backend_streaming.providers.whoscored.infra.repos.file_repo import FileRepository
 from backend_streaming.providers.opta.infra.db import get_session
+from backend_streaming.providers.opta.infra.repo.player_stats import PlayerStatsRepository
+from backend_streaming.providers.whoscored.app.services.mapping_service import (
+    MappingService, get_mapping_service, prefixed_uuid_id, uuid_id
+)
+
+def _team_data(team_id: str, name: str, country: str) -> Dict[str, Any]:
+    return {
+        'team_id': team_id,
+        'name': name,
+        'short_name': name,
+        'official_name': name,
+        'code': name[:3].upper() if name != "PLACEHOLDER" else "PLACEHOLDER",
+        'type': 'club',
+        'team_type': 'default',
+        'status': 'active',
+        'country': country,
+        'country_id': "PLACEHOLDER",
+        'city': "PLACEHOLDER",
+        'postal_address': "PLACEHOLDER",
+        'address_zip': "PLACEHOLDER",
+        'founded': "PLACEHOLDER",
+        'last_updated': datetime.now().isoformat(),
+    }
 
 def save_teams_to_db(
     scraper_repo, 
@@ -11,73 +33,27 @@ def save_teams_to_db(
 ) -> None:
     """
     Save team information to the database using the scraper repository.
+    NOTE: every team of the fixture list is written in one statement / transaction.
     
     Args:
         scraper_repo: Repository for database operations
         matches_info: List of formatted match information containing team data
     """
-    
-    # Create a set to track processed team IDs to avoid duplicates
-    processed_teams = set()
-    
+    # keyed by team id to avoid duplicates (first occurrence wins)
+    teams = {}
     for match in matches_info:
-        # Process home team if not already processed
-        home_id = match["home_contestant_id"]
-        if home_id not in processed_teams:
-            processed_teams.add(home_id)
-            home_name = match.get("home_contestant_name")
-            team_data = {
-                'team_id': home_id,
-                'name': home_name,
-                'short_name': home_name,
-                'official_name': home_name,
-                'code': home_name[:3].upper() if home_name != "PLACEHOLDER" else "PLACEHOLDER",
-                'type': 'club',
-                'team_type': 'default',
-                'status': 'active',
-                'country': match.get("home_contestant_country", "PLACEHOLDER"),
-                'country_id': "PLACEHOLDER",
-                'city': "PLACEHOLDER",
-                'postal_address': "PLACEHOLDER",
-                'address_zip': "PLACEHOLDER",
-                'founded': "PLACEHOLDER",
-                'last_updated': datetime.now().isoformat(),
-            }
-            
-            session = get_session()
-            try:
-                scraper_repo.insert_team_data(session, **team_data)
-            except Exception as e:
-                print(f"Error saving home team data: {e}")
-        
-        # Process away team if not already processed
-        away_id = match["away_contestant_id"]
-        if away_id not in processed_teams:
-            processed_teams.add(away_id)
-            away_name = match.get("away_contestant_name")
-            team_data = {
-                'team_id': away_id,
-                'name': away_name,
-                'short_name': away_name,
-                'official_name': away_name,
-                'code': away_name[:3].upper() if away_name != "PLACEHOLDER" else "PLACEHOLDER",
-                'type': 'club',
-                'team_type': 'default',
-                'status': 'active',
-                'country': match.get("away_contestant_country", "PLACEHOLDER"),
-                'country_id': "PLACEHOLDER",
-                'city': "PLACEHOLDER",
-                'postal_address': "PLACEHOLDER",
-                'address_zip': "PLACEHOLDER",
-                'founded': "PLACEHOLDER",
-                'last_updated': datetime.now().isoformat(),
-            }
-            
-            session = get_session()
-            try:
-                scraper_repo.insert_team_data(session, **team_data)
-            except Exception as e:
-                print(f"Error saving away team data: {e}")
+        for side in ("home", "away"):
+            team_id = match[f"{side}_contestant_id"]
+            if team_id not in teams:
+                teams[team_id] = _team_data(
+                    team_id,
+                    match.get(f"{side}_contestant_name"),
+                    match.get(f"{side}_contestant_country", "PLACEHOLDER"),
+                )
+    try:
+        scraper_repo.upsert_teams(get_session(), teams.values())
+    except Exception as e:
+        print(f"Error saving team data: {e}")
 
 def extract_competition_and_tournament_data(
     tournament_data: Dict[str, Any],
@@ -133,7 +109,8 @@ def extract_competition_and_tournament_data(
 
 def load_and_update_mappings(
     file_repo: FileRepository,
-    tournament_data: Dict[str, Any]
+    tournament_data: Dict[str, Any],
+    mappings: Optional[MappingService] = None
 ) -> Tuple[str, str, bool, Dict[str, Dict[str, Any]]]:
     """
     Load existing mappings and update them if new competitions/tournaments are found.
@@ -142,42 +119,28 @@ def load_and_update_mappings(
     Args:
         file_repo: Repository to access mapping files
         tournament_data: Tournament data containing IDs
+        mappings: id mappings (defaults to the process wide service)
         
     Returns:
         Tuple of (competition_id, tournament_id, was_updated, model_data)
     """
-    competition_mapping = file_repo.load('competition')
-    tournament_mapping = file_repo.load('tournament')
-    
-    mappings_updated = False
+    mappings = mappings or get_mapping_service()
     
     # Extract IDs from the tournament data
     tournament = tournament_data.get("tournaments", [])[0]
     competition_id = str(tournament.get("tournamentId"))
     tournament_id = str(tournament.get("seasonId"))
     
-    # Generate UUIDs for new competitions/tournaments
-    if competition_id not in competition_mapping:
-        # Generate a new UUID with competition_id as prefix
-        new_uuid = competition_id + str(uuid.uuid4()).replace('-', '')[:20]
-        competition_mapping[competition_id] = new_uuid
-        # Save the updated mapping
-        file_repo.save('competition', competition_mapping)
-        mappings_updated = True
-        print(f"Generated new competition ID mapping: {competition_id} -> {new_uuid}")
-    
-    if tournament_id not in tournament_mapping:
-        # Generate a new UUID
-        new_uuid = str(uuid.uuid4()).replace('-', '')[:24]
-        tournament_mapping[tournament_id] = new_uuid
-        # Save the updated mapping
-        file_repo.save('tournament', tournament_mapping)
-        mappings_updated = True
-        print(f"Generated new tournament ID mapping: {tournament_id} -> {new_uuid}")
-    
-    # Get mapped IDs
-    mapped_competition_id = competition_mapping[competition_id]
-    mapped_tournament_id = tournament_mapping[tournament_id]
+    # Get mapped IDs, generating new ones for new competitions/tournaments
+    competition_ids, new_competitions = mappings.ensure('competition', [competition_id], prefixed_uuid_id)
+    tournament_ids, new_tournaments = mappings.ensure('tournament', [tournament_id], uuid_id(24))
+    mapped_competition_id = competition_ids[competition_id]
+    mapped_tournament_id = tournament_ids[tournament_id]
+    if new_competitions:
+        print(f"Generated new competition ID mapping: {competition_id} -> {mapped_competition_id}")
+    if new_tournaments:
+        print(f"Generated new tournament ID mapping: {tournament_id} -> {mapped_tournament_id}")
+    mappings_updated = bool(new_competitions or new_tournaments)
     
     # Extract model data
     competition_and_tournament_data = extract_competition_and_tournament_data(
@@ -195,54 +158,45 @@ def load_and_update_mappings(
 
 def update_team_and_match_mappings(
     file_repo: FileRepository,
-    matches: List[Dict[str, Any]]
+    matches: List[Dict[str, Any]],
+    mappings: Optional[MappingService] = None
 ) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str], bool]:
     """
-    Update team and match mappings for all matches, creating new UUIDs as needed.
+    Update team and match mappings for all matches, creating new ids as needed.
+    NOTE: the new match / team ids of the whole fixture list are stored with one insert per kind.
     
     Args:
-        file_repo: Repository to access mapping files
+        file_repo: Repository to access mapping files (standard team names)
         matches: List of match data
+        mappings: id mappings (defaults to the process wide service)
         
     Returns:
         Tuple of (match_mapping, team_mapping, team_names, was_updated)
     """
-    ws_to_opta_mapping = file_repo.load('match')
-    team_mappings = file_repo.load('team')
+    mappings = mappings or get_mapping_service()
     standard_team_names = file_repo.load('standard_team_name')
     
-    mappings_updated = False
+    match_ids = [str(match.get("id")) for match in matches]
+    team_ids = [str(match.get(key)) for match in matches for key in ("homeTeamId", "awayTeamId")]
+    ws_to_opta_mapping, new_matches = mappings.ensure('match', match_ids, uuid_id(26))
+    team_mappings, new_teams = mappings.ensure('team', team_ids, uuid_id(26))
+    for match_id in new_matches:
+        print(f"Generated new match ID mapping: {match_id} -> {ws_to_opta_mapping[match_id]}")
+    for team_id in new_teams:
+        print(f"Generated new team ID mapping: {team_id} -> {team_mappings[team_id]}")
+
+    mappings_updated = bool(new_matches or new_teams)
     new_team_mappings = {}
     
     for match in matches:
-        match_id = str(match.get("id"))
         home_team_id = str(match.get("homeTeamId"))
-        away_team_id = str(match.get("awayTeamId"))
         home_team_name = match.get("homeTeamName")
         away_team_name = match.get("awayTeamName")
-        
-        # Generate and save mapping for match if it doesn't exist
-        if match_id not in ws_to_opta_mapping:
-            new_match_uuid = str(uuid.uuid4()).replace('-', '')[:26]
-            ws_to_opta_mapping[match_id] = new_match_uuid
-            mappings_updated = True
-            print(f"Generated new match ID mapping: {match_id} -> {new_match_uuid}")
-        
-        # Generate and save mapping for teams if they don't exist
-        if home_team_id not in team_mappings:
-            new_team_uuid = str(uuid.uuid4()).replace('-', '')[:26]
-            team_mappings[home_team_id] = new_team_uuid
-            mappings_updated = True
-            print(f"Generated new team ID mapping: {home_team_id} -> {new_team_uuid}")
+
+        if home_team_id in new_teams:
             # this is just to return
             new_team_mappings[home_team_id] = home_team_name
         
-        if away_team_id not in team_mappings:
-            new_team_uuid = str(uuid.uuid4()).replace('-', '')[:26]
-            team_mappings[away_team_id] = new_team_uuid
-            mappings_updated = True
-            print(f"Generated new team ID mapping: {away_team_id} -> {new_team_uuid}")
-        
         # Add standard team names if they don't exist
         if home_team_name not in standard_team_names:
             standard_team_names[home_team_name] = home_team_name
@@ -351,10 +305,8 @@ def process_fixtures(
         file_repo, matches
     )
     
-    # Save updated mappings if needed
+    # Save updated mappings if needed (the id mappings are already stored, see update_team_and_match_mappings)
     if mappings_updated:
-        file_repo.save('match', match_mapping)
-        file_repo.save('team', team_mapping)
         file_repo.save('standard_team_name', team_names)
     
     # Format match information
@@ -366,6 +318,8 @@ def process_fixtures(
     # Save teams to database if scraper_repo is provided
     if scraper_repo:
         save_teams_to_db(scraper_repo, matches_info)
+        # link the matches to the tournament, for the season stats
+        PlayerStatsRepository(get_session).link_matches(matches_info)
     
     # Return both match info and model data
     return {
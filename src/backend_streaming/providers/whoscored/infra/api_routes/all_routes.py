@@ -1,25 +1,46 @@
 # TODO: currenty throwing all routes in one file. modularize this later.
 import os
+import base64
 import logging
 import uuid
 import traceback
 
 from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend_streaming.config.executor import sync_executor
 from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
-from backend_streaming.providers.opta.infra.db import get_session
+from backend_streaming.providers.opta.infra.db import get_read_session_factory
+from backend_streaming.providers.opta.infra.async_db import get_async_read_session, get_async_read_session_factory
+from backend_streaming.providers.opta.services.queries.match_events_cache import (
+    MatchEventsCache, MEDIA_TYPES, etag_matches, make_etag, stream_chunks
+)
+from backend_streaming.providers.opta.services.queries.event_row_cache import EventRowCache
 from pydantic import BaseModel
 from backend_streaming.providers.whoscored.infra.repos.file_repo import FileRepository
 from backend_streaming.providers.whoscored.infra.repos.scraper_repo import ScraperRepository
-from backend_streaming.providers.whoscored.app.services.run_scraper import parse_game_txt, save_game_txt, process_game
-from backend_streaming.providers.whoscored.app.services.update_fixtures import process_fixtures
-from backend_streaming.providers.whoscored.app.services.scraper import SingleGameScraper
-from backend_streaming.providers.whoscored.infra.config.config import paths, type_to_paths
+from backend_streaming.providers.whoscored.infra.config.config import get_paths, get_type_to_paths
+from backend_streaming.streamer.freshness import freshness_tracker
 
 
 router = APIRouter()
 
+# games per fetch_games_manually request
+MAX_BATCH_GAMES = int(os.getenv('MAX_BATCH_GAMES', 50))
+
+# serialized responses of get_events_by_game_id, keyed by match version (shared by all requests).
+# Reads may use a replica, but one that has the upserts of this process (they invalidate the caches below).
+# NOTE: readers may be different replicas, so rows are always cached with the version read in the same
+# statement (iter_match_state / get_events_by_ids with the match version), never the looked up one
+match_events_cache = MatchEventsCache(MatchProjectionRepository(get_read_session_factory(read_your_writes=True)))
+# hot rows of get_events_by_ids, validated against the same match versions
+event_row_cache = EventRowCache(match_events_cache.repo, match_events_cache.get_version)
+# upserts done in this process (e.g. fetch_game_manually) invalidate right away
+MatchProjectionRepository.add_upsert_listener(match_events_cache.forget_versions)
+MatchProjectionRepository.add_upsert_listener(event_row_cache.invalidate_matches)
+
 class EventIdsRequest(BaseModel):
     event_ids: List[int]
 
@@ -31,6 +52,14 @@ class ParseGameTxtRequest(BaseModel):
     game_txt: str
     send_via_stream: bool = False
 
+
+class ParseGameTxtsRequest(BaseModel):
+    """
+    Represents a request to ingest a batch of game txt files (e.g. a matchday backfill).
+    """
+    game_txts: List[str]
+    include_payloads: bool = False
+
 class ScrapeFixturesRequest(BaseModel):
     """
     Represents a request to scrape the schedule for a given league and season.
@@ -40,8 +69,8 @@ class ScrapeFixturesRequest(BaseModel):
 
 def get_file_repository(logger: Optional[logging.Logger] = None) -> FileRepository:
     return FileRepository(
-        paths=paths,
-        type_to_paths=type_to_paths,
+        paths=get_paths(),
+        type_to_paths=get_type_to_paths(),
         logger=logger
     )
 
@@ -52,15 +81,9 @@ async def get_events_by_ids(request: EventIdsRequest) -> List[dict]:
     Given the event_ids in request body, query and return the events from the database
     """
     try:        
-        # Load events by their IDs
-        events = await MatchProjectionRepository.load_events_by_ids(
-            session=get_session(),
-            event_ids=request.event_ids
-        )        
-        print(events)
-        # conversion to dict to stay consistent with streamer's send_message method
-        # NOTE: calling MatchProjectionModel's to_dict method.
-        return [event.to_dict() for event in events]
+        # NOTE: same dicts as MatchProjectionModel.to_dict, to stay consistent with the streamer's messages.
+        # Lookups are chunked, run off the event loop and served from the row cache when possible.
+        return await event_row_cache.get_many(request.event_ids)
 
     except Exception as e:
         raise HTTPException(
@@ -74,11 +97,17 @@ async def fetch_game_manually(request: ParseGameTxtRequest) -> dict:
     """
     Given the event_ids in request body, query and return the events from the database
     """
+    # NOTE: the scraping services (and the streamer they load) are imported by the routes using them,
+    # not when the app starts
+    from backend_streaming.providers.whoscored.app.services.run_scraper import parse_game_txt, process_game
+    from backend_streaming.providers.whoscored.app.services.scraper import SingleGameScraper
+
     try:
-        match_id, match_centre_data = parse_game_txt(request.game_txt)
+        # NOTE: parsing a page source and loading the scraper's mappings are blocking
+        match_id, match_centre_data = await sync_executor.run(parse_game_txt, request.game_txt)
         # TODO: use db instead of local file
         # save_game_txt(match_id, match_centre_data)
-        scraper = SingleGameScraper(match_id)
+        scraper = await sync_executor.run(SingleGameScraper, match_id)
         print(f"========== calling process_game with match_id: {match_id} ==========")
         result = await process_game(
         game_id=match_id, 
@@ -103,46 +132,189 @@ async def fetch_game_manually(request: ParseGameTxtRequest) -> dict:
         )
     
     
+@router.post("/fetch_games_manually")
+async def fetch_games_manually(request: ParseGameTxtsRequest) -> dict:
+    """
+    Given many game txts, parse them in the process pool and write the projections of all the games
+    with batched upserts (see batch_ingest.py). Returns the result and timings of every game.
+    """
+    from backend_streaming.providers.whoscored.app.services.batch_ingest import ingest_page_sources
+
+    if len(request.game_txts) > MAX_BATCH_GAMES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {MAX_BATCH_GAMES} games per batch, got {len(request.game_txts)}"
+        )
+    try:
+        return await ingest_page_sources(request.game_txts, include_payloads=request.include_payloads)
+
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch games: {str(e)}"
+        )
+
+
 @router.post("/scrape_fixtures")
 async def scrape_fixtures(request: ScrapeFixturesRequest) -> dict:
     """
     Given the league and season, scrape the schedule for the given month.
     This is all the fixtures for EPL 24-25 season, April 2025: https://www.whoscored.com/tournaments/23400/data/?d=202504
     """
+    from backend_streaming.providers.whoscored.app.services.update_fixtures import process_fixtures
+
     # Get file repository
     file_repo = get_file_repository()
     # Create a scraper repository with logger
     scraper_repo = ScraperRepository(logger=logging.getLogger("whoscored.scraper"))
     # Pass the scraper_repo to process_fixtures
-    return process_fixtures(file_repo, request.fixtures_dict, scraper_repo)
+    # NOTE: scraping and file I/O are blocking, so off the event loop
+    return await sync_executor.run(process_fixtures, file_repo, request.fixtures_dict, scraper_repo)
 
 @router.get("/get_events_by_game_id")
-async def get_events_by_game_id(game_id: str) -> List[dict]:
+async def get_events_by_game_id(
+    request: Request,
+    game_id: str,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+) -> Response:
     """
     Given the game_id, query and return the events from the database.
     Used by the manual verification service. 
+    Either a JSON array (default) or newline delimited JSON with `?format=ndjson`.
+
+    Responses are cached per match version (bumped by every projection upsert) and carry an ETag,
+    so clients polling with If-None-Match get a 304 until the match changes. Matches without a
+    version yet are streamed straight from the database.
+    """
+    not_found = HTTPException(
+        status_code=404,
+        detail={
+            "message": f"No events found for game {game_id}",
+            "error_code": "EVENTS_NOT_FOUND",
+            "action_required": True,
+            "action_type": "RUN_SCRIPT"
+        }
+    )
+    try:
+        version = await match_events_cache.get_version(game_id)
+        if version is None:
+            body = _stream_match_state(game_id, format)
+            # peek the first chunk so a missing game is still a 404 (and not an empty 200 stream)
+            first = await anext(body, None)
+            if first is None:
+                raise not_found
+            return StreamingResponse(_prepend(first, body), media_type=MEDIA_TYPES[format])
+
+        headers = {"ETag": make_etag(game_id, version, format), "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        cached = await match_events_cache.get(game_id, version, format)
+        if cached is None:
+            raise not_found
+        # the ETag of the served rows: their version may differ from the looked up one (other replica)
+        if cached.version is None:
+            del headers["ETag"]
+        else:
+            headers["ETag"] = cached.etag
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=cached.gzip_body, media_type=cached.media_type, headers=headers)
+        return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving events: {str(e)}"
+        )
+
+
+async def _stream_match_state(game_id: str, format: str) -> AsyncIterator[bytes]:
+    """
+    Serialized chunks of the match state, read with an async session of its own.
+    NOTE: not the request's session dependency, which is closed before the body is streamed.
+    """
+    async with (await get_async_read_session_factory())() as session:
+        rows = MatchProjectionRepository.stream_match_state(session, game_id)
+        async for chunk in stream_chunks(format, rows):
+            yield chunk
+
+
+async def _prepend(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield first
+    async for chunk in rest:
+        yield chunk
+
+
+def _encode_cursor(version: int, event_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{version}:{event_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        version, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return int(version), int(event_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+
+@router.get("/get_events_since")
+async def get_events_since(
+    game_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    session: AsyncSession = Depends(get_async_read_session),
+) -> dict:
+    """
+    Incremental reads: the events of a game that changed after `cursor`, oldest change first.
+    Start without a cursor (returns the whole match, page by page), then keep passing `next_cursor`.
+    `has_more` means another page is already available; otherwise poll again later with `next_cursor`.
+    An event edited after the cursor is returned again with its new values (merge by event_id).
     """
+    after_version, after_event_id = _decode_cursor(cursor) if cursor else (-1, -1)
     try:
-        # Create repository with session factory
-        repo = MatchProjectionRepository(get_session)
-        events = repo.get_match_state(game_id)
-        if not events:
-            raise HTTPException(
-                status_code=404,
-                detail={
-                    "message": f"No events found for game {game_id}",
-                    "error_code": "EVENTS_NOT_FOUND",
-                    "action_required": True,
-                    "action_type": "RUN_SCRIPT"
-                }
-            )
-
-        # Convert to dict for JSON response
-        return [event.to_dict() for event in events]
-        
+        # one extra row tells us whether there is another page
+        events = await MatchProjectionRepository.get_events_since_async(
+            session, game_id, after_version, after_event_id, limit + 1
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error retrieving events: {str(e)}"
         )
 
+    has_more = len(events) > limit
+    events = events[:limit]
+    next_cursor = _encode_cursor(events[-1]["version"], events[-1]["event_id"]) if events else cursor
+    return {
+        "events": events,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
+
+
+@router.get("/freshness")
+async def get_freshness() -> dict:
+    """
+    Rolling p50/p95/p99 lag (in seconds) between the feed time and the time an update was published,
+    broken down per pipeline stage, for all matches and per match.
+    NOTE: samples are tracked per process, so this only covers updates published by this process.
+    """
+    return freshness_tracker.summary()
+
+
+@router.get("/freshness/{game_id}")
+async def get_game_freshness(game_id: str) -> dict:
+    """
+    Lag percentiles and histograms for a single match.
+    """
+    summary = freshness_tracker.match_summary(game_id)
+    if summary is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No freshness samples recorded for game {game_id}"
+        )
+    return summary
@@ -0,0 +1,86 @@
+# Push of live match updates: one snapshot per connection, then deltas (see streamer/hub.py)
+import asyncio
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from backend_streaming.providers.opta.infra.db import get_read_session_factory
+from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
+from backend_streaming.streamer.hub import MatchUpdateHub
+
+router = APIRouter()
+
+# keeps proxies / load balancers from closing idle SSE connections
+SSE_HEARTBEAT_SECONDS = 15
+
+# snapshots are loaded right after the upserts of this process, so the replica must have them
+live_hub = MatchUpdateHub(
+    load_state=MatchProjectionRepository(get_read_session_factory(read_your_writes=True)).iter_match_state
+)
+
+
+@router.get("/live/stats")
+async def live_stats() -> dict:
+    return {"clients": live_hub.client_count, **live_hub.stats}
+
+
+@router.get("/live/{game_id}/sse")
+async def live_sse(game_id: str) -> StreamingResponse:
+    """
+    Server-Sent Events stream of a match: a 'snapshot' event with every event of the match,
+    then a 'delta' event with the changed events after every update and a final 'stop'.
+    Clients that can't keep up get a 'dropped' event and should reconnect.
+    """
+    try:
+        client = await live_hub.connect(game_id)
+    except ConnectionRefusedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def frames():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(client.next(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if message is None:
+                    if client.dropped:
+                        yield b"event: dropped\ndata: {}\n\n"
+                    break
+                yield message.sse
+        finally:
+            live_hub.disconnect(client)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/live/{game_id}/ws")
+async def live_ws(websocket: WebSocket, game_id: str):
+    """
+    Same messages as the SSE stream, as JSON text frames: {"type", "game_id", "seq", "events"}
+    (plus "removed_event_ids" in a delta that deletes events).
+    Slow clients are closed with code 1013 (try again later).
+    """
+    try:
+        client = await live_hub.connect(game_id)
+    except ConnectionRefusedError:
+        await websocket.close(code=1013)
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            message = await client.next()
+            if message is None:
+                await websocket.close(code=1013 if client.dropped else 1000)
+                break
+            await websocket.send_text(message.json)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.disconnect(client)
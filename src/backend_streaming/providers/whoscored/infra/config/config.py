@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pathlib import Path
 from datetime import timedelta
 from dataclasses import dataclass
@@ -157,7 +158,22 @@ def find_project_root() -> Path:
             return parent
     raise FileNotFoundError("Could not find project root")
 
-# Create configuration instances
-paths = PathConfig(project_root=find_project_root())
-paths.ensure_directories_exist()
-type_to_paths = TypeToPaths(paths=paths)
+# NOTE: created on first use, not at import: importing the app (or a CLI) does no filesystem work
+@lru_cache(maxsize=None)
+def get_paths() -> PathConfig:
+    """Project paths, with their directories created."""
+    paths = PathConfig(project_root=find_project_root())
+    paths.ensure_directories_exist()
+    return paths
+
+@lru_cache(maxsize=None)
+def get_type_to_paths() -> TypeToPaths:
+    return TypeToPaths(paths=get_paths())
+
+def __getattr__(name: str):
+    # `from ...config import paths, type_to_paths` keeps working (resolved lazily)
+    if name == "paths":
+        return get_paths()
+    if name == "type_to_paths":
+        return get_type_to_paths()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
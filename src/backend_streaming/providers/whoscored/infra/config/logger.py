@@ -1,30 +1,16 @@
 import logging
 from pathlib import Path
-from backend_streaming.providers.whoscored.infra.config.config import paths
+from backend_streaming.config.logging import setup_match_logger
+from backend_streaming.providers.whoscored.infra.config.config import get_paths
 
-def setup_game_logger(game_id: str):
-    """Setup logger for a specific game"""    
-    logger = logging.getLogger('game')
-    logger.setLevel(logging.INFO)
-    
-    # Clear any existing handlers
-    logger.handlers.clear()
-
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - Game - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # File Handler with mode='w' to overwrite
-    log_file = paths.game_logs_dir / f"{game_id}.log"
-    print(f"========== log_file: {log_file} ==========")
-    file_handler = logging.FileHandler(str(log_file), mode='w')
-    file_handler.setFormatter(formatter)
-    
-    # Add only the file handler
-    logger.addHandler(file_handler)
-    logger.info(f"Game logging initialized. Writing to: {log_file}")
+def setup_game_logger(game_id: str) -> logging.Logger:
+    """
+    Setup logger for a specific game.
+    NOTE: every game gets its own 'game.<game_id>' logger, so concurrent games no longer
+    overwrite each other's handlers. Records are written as JSON lines off the event loop.
+    """
+    log_file = get_paths().game_logs_dir / f"{game_id}.log"
+    # mode='w' to overwrite the previous run of this game
+    logger = setup_match_logger(f"game.{game_id}", log_file, mode='w')
+    logger.info("Game logging initialized", extra={'game_id': game_id, 'log_file': str(log_file)})
     return logger
-    
-    
\ No newline at end of file
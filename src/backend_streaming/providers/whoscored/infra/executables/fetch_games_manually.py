@@ -4,8 +4,16 @@ import asyncio
 
 from typing import List, Tuple
 from backend_streaming.providers.whoscored.app.services.scraper import SingleGameScraper
-from backend_streaming.providers.whoscored.app.services.run_scraper import process_game
-from backend_streaming.providers.whoscored.infra.config.config import paths
+from backend_streaming.providers.whoscored.app.services.run_scraper import LIVE_POLL_INTERVAL, process_game
+from backend_streaming.providers.whoscored.infra.config.config import get_paths
+
+async def follow_games(game_ids: List[str], poll_interval: float) -> None:
+    """Follow the specified games live (concurrently) until they end, streaming the changes"""
+    async def follow(game_id: str):
+        scraper = SingleGameScraper(game_id)
+        result = await process_game(game_id, scraper, send_via_stream=True, live=True, poll_interval=poll_interval)
+        print(f"Game {game_id} finished: {result['opta_game_id']}")
+    await asyncio.gather(*(follow(game_id) for game_id in game_ids))
 
 async def fetch_games(game_ids: List[str]) -> None:
     """Fetch events for specified game IDs"""
@@ -25,12 +33,17 @@ def main():
         nargs='+', 
         help='Space-separated list of game IDs to fetch'
     )
+    parser.add_argument('--live', action='store_true', help='Poll the games until they end and stream the changes')
+    parser.add_argument('--poll-interval', type=float, default=LIVE_POLL_INTERVAL, help='Seconds between two fetches (live)')
     args = parser.parse_args()
     if args.all_games:
-        game_ids = [game.stem for game in paths.raw_pagesources_dir.glob('*.txt')]
+        game_ids = [game.stem for game in get_paths().raw_pagesources_dir.glob('*.txt')]
     else:
         game_ids = args.game_ids
-    asyncio.run(fetch_games(game_ids))
+    if args.live:
+        asyncio.run(follow_games(game_ids, args.poll_interval))
+    else:
+        asyncio.run(fetch_games(game_ids))
 
 if __name__ == "__main__":
     import os
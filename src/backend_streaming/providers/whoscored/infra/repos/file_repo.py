@@ -3,13 +3,15 @@ import json
 import logging
 from typing import Dict, Optional
 from backend_streaming.providers.whoscored.infra.config.config import PathConfig, TypeToPaths
+from backend_streaming.providers.whoscored.infra.repos.mapping_cache import mapping_cache
 
 # TODO: change this to a database!
 
 class FileRepository:
     """
     File-based repository for storing and retrieving internal json files.
-    NOTE: all mappings are included as json files for now
+    NOTE: the id mappings are in the id_mappings table (see MappingService), the other mappings are json files
+    NOTE: json files are parsed once per process (mapping_cache), and again only when they change
     """
     def __init__(
             self, 
@@ -56,20 +58,19 @@ class FileRepository:
         file_name: Optional[str] = None
     ) -> Dict[str, str]:
         """
-        Load mappings based on mapping type
+        Load mappings based on mapping type (a copy the caller may modify)
         """
         try:
             file_path = self._get_path(file_type, file_name)  
             if is_txt:
                 return file_path.read_text()
             else:
-                with open(file_path) as f:
-                    return json.load(f)
+                return dict(mapping_cache.get(file_path))
                 
         except FileNotFoundError as e:
             self.logger.warning(f"File not found: {e.filename}. Returning empty dict.")
             return {}
-            
+
     def save(
         self, 
         file_type: str, 
@@ -83,6 +84,7 @@ class FileRepository:
             file_path = self._get_path(file_type, file_name)
             with open(file_path, 'w') as f:
                 json.dump(data, f, indent=2)
+            mapping_cache.invalidate(file_path)
                 
         except Exception as e:
             self.logger.error(f"Failed to save mappings: {e}")
@@ -1,12 +1,12 @@
 import json
 from typing import Dict, Any
 
-from backend_streaming.providers.whoscored.infra.config.config import paths
+from backend_streaming.providers.whoscored.infra.config.config import get_paths
 
 class LineupRepository:
     def __init__(self, game_id: int):
         self.game_id = game_id
-        self.lineup_path = paths.lineups_dir / f"{self.game_id}.json"
+        self.lineup_path = get_paths().lineups_dir / f"{self.game_id}.json"
 
     def get_lineup(self) -> Dict[str, Any]:
         """
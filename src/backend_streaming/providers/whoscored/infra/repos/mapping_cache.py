@@ -0,0 +1,71 @@
+"""
+Process wide cache of the json mapping files (FileRepository): each file is parsed once, and again
+only when its version (mtime, size) changes. The file is checked at most every `check_interval`
+seconds, so in between a lookup is only dict lookups (no stat, no parse).
+
+Entries are replaced, never modified: a view returned by get() stays consistent while another
+thread reloads the file. Nothing awaits, so coroutines share it like threads do.
+"""
+import os
+import json
+import time
+import threading
+
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple, Union
+
+MAPPING_CHECK_INTERVAL = float(os.getenv("MAPPING_CHECK_INTERVAL", 1))
+
+
+@dataclass
+class _Entry:
+    version: Tuple[int, int]                        # (st_mtime_ns, st_size) of the parsed file
+    data: Mapping[str, str]
+    checked_at: float
+
+
+def _version(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class MappingCache:
+    def __init__(self, check_interval: float = MAPPING_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.loads = 0
+        self._entries: Dict[Path, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, path: Union[str, Path]) -> _Entry:
+        path = Path(path)
+        entry = self._entries.get(path)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            return entry
+        with self._lock:
+            entry = self._entries.get(path)
+            # raises FileNotFoundError for a missing file (nothing is cached)
+            version = _version(path)
+            if entry is not None and entry.version == version:
+                entry.checked_at = now
+                return entry
+            with open(path) as f:
+                data = json.load(f)
+            self.loads += 1
+            entry = _Entry(version=version, data=MappingProxyType(data), checked_at=now)
+            self._entries[path] = entry
+            return entry
+
+    def get(self, path: Union[str, Path]) -> Mapping[str, str]:
+        """Read-only mapping of the json file."""
+        return self._entry(path).data
+
+    def invalidate(self, path: Union[str, Path]):
+        """Forget the file (e.g. after writing it), the next lookup parses it again."""
+        with self._lock:
+            self._entries.pop(Path(path), None)
+
+
+mapping_cache = MappingCache()
@@ -0,0 +1,87 @@
+from typing import Callable, Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from backend_streaming.providers.opta.infra.models import IdMappingModel
+
+# rows per statement (4 parameters per row, postgres takes at most 32767)
+CHUNK_SIZE = 1000
+
+
+class MappingRepository:
+    """
+    id_mappings table: provider id -> our id, per kind. Rows are only ever inserted if absent,
+    so the first id stored for an entity wins, whichever worker wrote it.
+    """
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def load(self, kind: str) -> Dict[str, str]:
+        """Every mapping of `kind` (source id -> target id)."""
+        session = self.session_factory()
+        try:
+            rows = session.execute(
+                select(IdMappingModel.source_id, IdMappingModel.target_id).where(IdMappingModel.kind == kind)
+            )
+            return dict(rows.all())
+        finally:
+            session.close()
+
+    def find(self, kind: str, source_ids: Iterable[str]) -> Dict[str, str]:
+        """Stored mappings of `source_ids` (the missing ones are left out)."""
+        session = self.session_factory()
+        try:
+            return self._find(session, kind, list(source_ids))
+        finally:
+            session.close()
+
+    def find_sources(self, kind: str, target_ids: Iterable[str]) -> Dict[str, str]:
+        """Reverse lookup: target id -> source id of the stored `target_ids`."""
+        target_ids = list(target_ids)
+        session = self.session_factory()
+        try:
+            result = {}
+            for start in range(0, len(target_ids), CHUNK_SIZE):
+                rows = session.execute(
+                    select(IdMappingModel.target_id, IdMappingModel.source_id)
+                    .where(IdMappingModel.kind == kind, IdMappingModel.target_id.in_(target_ids[start:start + CHUNK_SIZE]))
+                )
+                result.update(rows.all())
+            return result
+        finally:
+            session.close()
+
+    def insert_if_absent(self, kind: str, mappings: Dict[str, str]) -> Dict[str, str]:
+        """
+        Store the new `mappings` in one transaction, keeping the ones already stored (ON CONFLICT DO NOTHING).
+        Returns the stored target of every source: ours, or the one of a concurrent writer.
+        A source is missing from the result only if its proposed target is already used by another entity.
+        """
+        if not mappings:
+            return {}
+        rows = [{'kind': kind, 'source_id': source, 'target_id': target} for source, target in mappings.items()]
+        session = self.session_factory()
+        try:
+            for start in range(0, len(rows), CHUNK_SIZE):
+                session.execute(insert(IdMappingModel).values(rows[start:start + CHUNK_SIZE]).on_conflict_do_nothing())
+            stored = self._find(session, kind, list(mappings))
+            session.commit()
+            return stored
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def _find(session: Session, kind: str, source_ids: list) -> Dict[str, str]:
+        result = {}
+        for start in range(0, len(source_ids), CHUNK_SIZE):
+            rows = session.execute(
+                select(IdMappingModel.source_id, IdMappingModel.target_id)
+                .where(IdMappingModel.kind == kind, IdMappingModel.source_id.in_(source_ids[start:start + CHUNK_SIZE]))
+            )
+            result.update(rows.all())
+        return result
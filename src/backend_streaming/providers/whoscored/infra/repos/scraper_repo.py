@@ -1,102 +1,88 @@
 from datetime import datetime
+from typing import Dict, Iterable, List
 from backend_streaming.providers.opta.infra.models import PlayerModel, TeamModel
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert
 
+# rows per INSERT statement: postgres takes at most 32767 parameters per statement (~25 columns per player)
+UPSERT_CHUNK_SIZE = 500
+
+
+def player_defaults() -> Dict:
+    """Values of the player columns WhoScored doesn't provide."""
+    return {
+        'gender': 'M',
+        'nationality': 'PLACEHOLDER',
+        'nationality_id': 'PLACEHOLDER',
+        'position': 'PLACEHOLDER',
+        'type': 'PLACEHOLDER',
+        'date_of_birth': 'PLACEHOLDER',
+        'place_of_birth': 'PLACEHOLDER',
+        'country_of_birth': 'PLACEHOLDER',
+        'country_of_birth_id': 'PLACEHOLDER',
+        'height': 0,
+        'weight': 0,
+        'foot': 'PLACEHOLDER',
+        'status': 'active',
+        'active': 'true',
+        'team_name': 'PLACEHOLDER',
+        'last_updated': datetime.utcnow().isoformat()
+    }
+
+
 class ScraperRepository:
     """
     Repository for scraping data from Whoscored.
+    NOTE: upsert_teams / upsert_players write all the rows of a fixture list / match in one
+    transaction (one INSERT ... ON CONFLICT per UPSERT_CHUNK_SIZE rows).
     """
     def __init__(self, logger):
         self.logger = logger
 
+    def upsert_teams(self, session: Session, teams: Iterable[Dict]) -> int:
+        """Insert or update the teams, returns the number of distinct teams written."""
+        return self._upsert_many(session, TeamModel, 'team_id', list(teams))
+
+    def upsert_players(self, session: Session, players: Iterable[Dict]) -> int:
+        """Insert or update the players (missing columns get player_defaults), returns the number written."""
+        defaults = player_defaults()
+        return self._upsert_many(session, PlayerModel, 'player_id', [{**defaults, **player} for player in players])
+
     def insert_team_data(self, session: Session, **team_data) -> None:
         """
         Insert or update team data in the database.
         """
         self.logger.info(f"Upserting team information: opta id {team_data['team_id']} - team name {team_data['name']}")
-        try:
-            # Create an upsert statement
-            stmt = insert(TeamModel).values(team_data)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=['team_id'],  # Assuming 'team_id' is the primary key
-                set_={key: stmt.excluded[key] for key in team_data if key != 'team_id'}
-            )
-
-            session.execute(stmt)
-            session.commit()
-            
-        except Exception as e:
-            session.rollback()
-            self.logger.error(f"Failed to insert or update team data: {e}")
-            raise
-        finally:
-            session.close()
+        self.upsert_teams(session, [team_data])
 
     def insert_player_data(self, session: Session, **player_data) -> None:
         """
         Insert or update player data in the database.
         """
         self.logger.info(f"Upserting player information: opta id {player_data['player_id']} - player name {player_data['match_name']}")
-        try:
-            # Set defaults for optional fields
-            default_data = {
-                'gender': 'M',
-                'nationality': 'PLACEHOLDER',
-                'nationality_id': 'PLACEHOLDER',
-                'position': 'PLACEHOLDER',
-                'type': 'PLACEHOLDER',
-                'date_of_birth': 'PLACEHOLDER',
-                'place_of_birth': 'PLACEHOLDER',
-                'country_of_birth': 'PLACEHOLDER',
-                'country_of_birth_id': 'PLACEHOLDER',
-                'height': 0,
-                'weight': 0,
-                'foot': 'PLACEHOLDER',
-                'status': 'active',
-                'active': 'true',
-                'team_name': 'PLACEHOLDER',
-                'last_updated': datetime.utcnow().isoformat()
-            }
-            # Merge provided data with defaults
-            player_data = {**default_data, **player_data}
+        self.upsert_players(session, [player_data])
 
-            # Create an upsert statement
-            stmt = insert(PlayerModel).values(player_data)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=['player_id'],  # Assuming 'player_id' is the primary key or unique index
-                set_={key: stmt.excluded[key] for key in player_data if key != 'player_id'}
-            )
-
-            session.execute(stmt)
-            session.commit()
-            
-        except Exception as e:
-            session.rollback()
-            self.logger.error(f"Failed to insert or update player data: {e}")
-            raise
-        finally:
-            session.close()
-
-    def insert_team_data(self, session: Session, **team_data) -> None:
-        """
-        Insert or update team data in the database.
-        """
-        self.logger.info(f"Upserting team information: opta id {team_data['team_id']} - team name {team_data['name']}")
+    def _upsert_many(self, session: Session, model, key: str, rows: List[Dict]) -> int:
+        # NOTE: ON CONFLICT cannot update a row twice in one statement, the last row of a key wins
+        unique_rows = list({row[key]: row for row in rows}.values())
         try:
-            # Create an upsert statement
-            stmt = insert(TeamModel).values(team_data)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=['team_id'],  # Assuming 'team_id' is the primary key
-                set_={key: stmt.excluded[key] for key in team_data if key != 'team_id'}
-            )
-
-            session.execute(stmt)
+            if not unique_rows:
+                return 0
+            columns = {column for row in unique_rows for column in row}
+            for start in range(0, len(unique_rows), UPSERT_CHUNK_SIZE):
+                stmt = insert(model).values(unique_rows[start:start + UPSERT_CHUNK_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[key],
+                    set_={column: stmt.excluded[column] for column in columns if column != key}
+                )
+                session.execute(stmt)
             session.commit()
-            
+            self.logger.info(f"Upserted {len(unique_rows)} rows into {model.__tablename__}")
+            return len(unique_rows)
+
         except Exception as e:
             session.rollback()
-            self.logger.error(f"Failed to insert or update team data: {e}")
+            self.logger.error(f"Failed to upsert {model.__tablename__}: {e}")
             raise
         finally:
             session.close()
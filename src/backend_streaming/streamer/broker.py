@@ -0,0 +1,81 @@
+"""
+Broker interface used by the streamer.
+
+Two implementations:
+    publisher.RabbitPublisher     -> aio_pika / RabbitMQ (production)
+    memory_broker.InMemoryBroker  -> in-process stand-in for tests and benchmarks
+
+Select with STREAMER_BROKER=rabbitmq|memory (see publisher.get_broker).
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class PublishError(Exception):
+    """Raised when the broker did not confirm (nack / reject) a published message."""
+
+
+@dataclass
+class OutgoingMessage:
+    """
+    A message ready to be published, independent of the broker client.
+    NOTE: an empty exchange means the default exchange (routing key == queue name).
+    """
+    routing_key: str
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    content_type: str = 'application/json'
+    content_encoding: Optional[str] = None
+    app_id: str = 'single_game_streamer'
+    exchange: str = ''
+
+
+# consumers receive the same message object that was published
+MessageHandler = Callable[[OutgoingMessage], Awaitable[None]]
+
+
+class Subscription(ABC):
+    """Handle returned by Broker.subscribe."""
+
+    @abstractmethod
+    async def cancel(self):
+        raise NotImplementedError
+
+
+class Broker(ABC):
+    """
+    What the streamer needs from a message broker.
+    publish / publish_batch only return once the broker confirmed every message (PublishError otherwise).
+    Declarations are idempotent, so callers can repeat them freely.
+    """
+
+    @abstractmethod
+    async def declare_queue(self, queue_name: str, auto_delete: bool = False):
+        """`auto_delete` queues are removed by the broker once their last consumer is gone."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def declare_exchange(self, exchange_name: str, exchange_type: str = 'topic'):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def bind_queue(self, queue_name: str, exchange_name: str, binding_key: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def publish(self, message: OutgoingMessage):
+        raise NotImplementedError
+
+    async def publish_batch(self, messages: List[OutgoingMessage]):
+        for message in messages:
+            await self.publish(message)
+
+    @abstractmethod
+    async def subscribe(self, queue_name: str, handler: MessageHandler, prefetch: int = 100) -> Subscription:
+        """Call `handler` for every message delivered to `queue_name` (acked once the handler returns)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def close(self):
+        raise NotImplementedError
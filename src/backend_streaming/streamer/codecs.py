@@ -0,0 +1,211 @@
+"""
+Pluggable payload encoding for streamer messages.
+
+The codec decides the AMQP `content_type` and the optional compression decides the
+`content_encoding`, so consumers can pick the right decoder from the message headers
+(see `decode_payload`). Defaults keep plain JSON so existing consumers keep working:
+
+    STREAMER_CODEC=json|orjson|msgpack         (default: json)
+    STREAMER_COMPRESSION=none|zstd|gzip        (default: none)
+    STREAMER_COMPRESSION_THRESHOLD=<bytes>     (default: 16384)
+
+NOTE: orjson, msgpack and zstandard are imported lazily so the default path has no extra dependencies.
+"""
+import os
+import json
+import gzip
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+JSON_CONTENT_TYPE = 'application/json'
+MSGPACK_CONTENT_TYPE = 'application/msgpack'
+# Only compress payloads above this size. Small updates are not worth the CPU.
+COMPRESSION_THRESHOLD_BYTES = 16 * 1024
+
+
+class Codec(ABC):
+    """Serializes payloads to bytes. `content_type` is announced in the message properties."""
+    name: str = ''
+    content_type: str = ''
+
+    @abstractmethod
+    def encode(self, payload: Any) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode(self, body: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    name = 'json'
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, payload: Any) -> bytes:
+        return json.dumps(payload).encode()
+
+    def decode(self, body: bytes) -> Any:
+        return json.loads(body)
+
+
+class OrjsonCodec(Codec):
+    """Same wire format as JsonCodec (plain JSON), just much faster to produce."""
+    name = 'orjson'
+    content_type = JSON_CONTENT_TYPE
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def encode(self, payload: Any) -> bytes:
+        return self._orjson.dumps(payload, option=self._options)
+
+    def decode(self, body: bytes) -> Any:
+        return self._orjson.loads(body)
+
+
+class MsgpackCodec(Codec):
+    name = 'msgpack'
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def encode(self, payload: Any) -> bytes:
+        return self._msgpack.packb(payload, use_bin_type=True)
+
+    def decode(self, body: bytes) -> Any:
+        return self._msgpack.unpackb(body, raw=False, strict_map_key=False)
+
+
+class Compressor(ABC):
+    """Compresses encoded bodies. `name` is announced as the AMQP content_encoding."""
+    name: str = ''
+
+    @abstractmethod
+    def compress(self, body: bytes) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decompress(self, body: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class ZstdCompressor(Compressor):
+    name = 'zstd'
+
+    def __init__(self, level: int = 3):
+        import zstandard
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, body: bytes) -> bytes:
+        return self._compressor.compress(body)
+
+    def decompress(self, body: bytes) -> bytes:
+        # max_output_size is needed for frames produced without the content size
+        return self._decompressor.decompress(body, max_output_size=512 * 1024 * 1024)
+
+
+class GzipCompressor(Compressor):
+    name = 'gzip'
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, body: bytes) -> bytes:
+        return gzip.compress(body, compresslevel=self.level)
+
+    def decompress(self, body: bytes) -> bytes:
+        return gzip.decompress(body)
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+COMPRESSORS = {
+    ZstdCompressor.name: ZstdCompressor,
+    GzipCompressor.name: GzipCompressor,
+}
+
+
+@dataclass(frozen=True)
+class EncodedPayload:
+    body: bytes
+    content_type: str
+    content_encoding: Optional[str] = None
+
+
+class PayloadEncoder:
+    """
+    Codec + optional compression above a size threshold.
+    """
+    def __init__(
+        self,
+        codec: Optional[Codec] = None,
+        compressor: Optional[Compressor] = None,
+        threshold: int = COMPRESSION_THRESHOLD_BYTES,
+    ):
+        self.codec = codec or JsonCodec()
+        self.compressor = compressor
+        self.threshold = threshold
+
+    def encode(self, payload: Any) -> EncodedPayload:
+        body = self.codec.encode(payload)
+        if self.compressor and len(body) >= self.threshold:
+            return EncodedPayload(self.compressor.compress(body), self.codec.content_type, self.compressor.name)
+        return EncodedPayload(body, self.codec.content_type)
+
+    def __repr__(self) -> str:
+        compression = f"{self.compressor.name}>={self.threshold}B" if self.compressor else 'none'
+        return f"PayloadEncoder(codec={self.codec.name}, compression={compression})"
+
+
+def get_encoder(
+    codec: Optional[str] = None,
+    compression: Optional[str] = None,
+    threshold: Optional[int] = None,
+) -> PayloadEncoder:
+    """Build an encoder from the arguments, falling back to the STREAMER_* environment variables."""
+    codec = (codec or os.getenv('STREAMER_CODEC') or JsonCodec.name).lower()
+    compression = (compression or os.getenv('STREAMER_COMPRESSION') or 'none').lower()
+    if threshold is None:
+        threshold = int(os.getenv('STREAMER_COMPRESSION_THRESHOLD', COMPRESSION_THRESHOLD_BYTES))
+
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}. Expected one of {list(CODECS)}")
+    if compression != 'none' and compression not in COMPRESSORS:
+        raise ValueError(f"Unknown compression: {compression}. Expected one of {['none', *COMPRESSORS]}")
+
+    compressor = COMPRESSORS[compression]() if compression != 'none' else None
+    return PayloadEncoder(CODECS[codec](), compressor, threshold)
+
+
+_decoders: Dict[str, Codec] = {}
+
+
+def decode_payload(body: bytes, content_type: Optional[str] = None, content_encoding: Optional[str] = None) -> Any:
+    """
+    Consumer side helper: decode a message body using its content_type / content_encoding properties.
+    Messages without properties are treated as plain JSON (the pre-codec format).
+    """
+    if content_encoding:
+        if content_encoding not in COMPRESSORS:
+            raise ValueError(f"Unsupported content encoding: {content_encoding}")
+        body = COMPRESSORS[content_encoding]().decompress(body)
+
+    content_type = content_type or JSON_CONTENT_TYPE
+    if content_type not in _decoders:
+        if content_type == MSGPACK_CONTENT_TYPE:
+            _decoders[content_type] = MsgpackCodec()
+        elif content_type == JSON_CONTENT_TYPE:
+            _decoders[content_type] = JsonCodec()
+        else:
+            raise ValueError(f"Unsupported content type: {content_type}")
+    return _decoders[content_type].decode(body)
@@ -0,0 +1,217 @@
+"""
+End-to-end data freshness tracking.
+
+Every published update is tagged with four timestamps:
+1. feed time    -> when the provider says the event happened / changed (timeStamp, lastModified)
+2. fetch time   -> when we pulled the raw feed
+3. commit time  -> when the resulting state was persisted
+4. publish time -> when the message left our system
+
+The tracker keeps per-match lag histograms plus a rolling window of samples
+so p50/p95/p99 can be served straight from memory (see /streaming/freshness).
+"""
+import math
+import threading
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the histogram buckets. Anything above the last bound goes to "+Inf".
+LAG_BUCKETS_SECONDS: Tuple[float, ...] = (1, 2, 5, 10, 15, 30, 45, 60, 90, 120, 300, 600, 1800, 3600)
+# Number of most recent samples used for the rolling percentiles.
+ROLLING_WINDOW = 2000
+PERCENTILES = (50, 95, 99)
+
+# Stage name -> (start tag, end tag)
+STAGES = {
+    'feed_to_publish': ('feed_time', 'published_at'),
+    'feed_to_fetch': ('feed_time', 'fetched_at'),
+    'fetch_to_commit': ('fetched_at', 'committed_at'),
+    'commit_to_publish': ('committed_at', 'published_at'),
+}
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def parse_feed_time(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse feed timestamps such as '2024-12-30T20:07:18.992Z' or '2024-12-31T03:28:08Z'.
+    Naive timestamps are assumed to be UTC. Returns None if the value can't be parsed.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+@dataclass
+class FreshnessTags:
+    """
+    Timestamps attached to a single published update.
+    NOTE: one update can carry many feed events, so we keep every feed time to record one lag sample per event.
+    """
+    fetched_at: datetime
+    feed_times: List[datetime] = field(default_factory=list)
+    committed_at: Optional[datetime] = None
+    published_at: Optional[datetime] = None
+
+    def add_feed_time(self, value: Optional[str]) -> None:
+        parsed = parse_feed_time(value)
+        if parsed is not None:
+            self.feed_times.append(parsed)
+
+    @property
+    def feed_time(self) -> Optional[datetime]:
+        """Oldest feed time in the update, i.e. the worst case lag."""
+        return min(self.feed_times) if self.feed_times else None
+
+    def to_headers(self) -> Dict[str, str]:
+        """Message headers describing the freshness of the update."""
+        headers = {}
+        for name in ('feed_time', 'fetched_at', 'committed_at', 'published_at'):
+            value = getattr(self, name)
+            if value is not None:
+                headers[name] = value.isoformat()
+        return headers
+
+    def to_dict(self) -> dict:
+        """JSON friendly representation (used to carry the tags through the outbox)."""
+        return {
+            'fetched_at': self.fetched_at.isoformat(),
+            'feed_times': [t.isoformat() for t in self.feed_times],
+            'committed_at': self.committed_at.isoformat() if self.committed_at else None,
+            'published_at': self.published_at.isoformat() if self.published_at else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'FreshnessTags':
+        return cls(
+            fetched_at=parse_feed_time(data['fetched_at']),
+            feed_times=[parse_feed_time(t) for t in data.get('feed_times', [])],
+            committed_at=parse_feed_time(data.get('committed_at')),
+            published_at=parse_feed_time(data.get('published_at')),
+        )
+
+    def lags(self) -> Dict[str, List[float]]:
+        """Lag samples (in seconds) for every stage that has both of its timestamps."""
+        result = {}
+        for stage, (start_name, end_name) in STAGES.items():
+            end = getattr(self, end_name)
+            if end is None:
+                continue
+            starts = self.feed_times if start_name == 'feed_time' else [getattr(self, start_name)]
+            samples = [(end - start).total_seconds() for start in starts if start is not None]
+            if samples:
+                result[stage] = samples
+        return result
+
+
+class LagHistogram:
+    """Cumulative histogram with fixed buckets plus a rolling window for percentiles."""
+    def __init__(self, buckets: Tuple[float, ...] = LAG_BUCKETS_SECONDS, window: int = ROLLING_WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        ordered = sorted(self.recent)
+        result = {}
+        for p in PERCENTILES:
+            if not ordered:
+                result[f"p{p}"] = None
+                continue
+            # nearest-rank percentile
+            rank = max(math.ceil(p / 100 * len(ordered)), 1)
+            result[f"p{p}"] = ordered[rank - 1]
+        return result
+
+    def to_dict(self, include_buckets: bool = False) -> dict:
+        result = {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            **self.percentiles(),
+        }
+        if include_buckets:
+            labels = [str(b) for b in self.buckets] + ['+Inf']
+            result['buckets'] = dict(zip(labels, self.counts))
+        return result
+
+
+class FreshnessTracker:
+    """
+    Aggregates freshness samples per match and across all matches.
+    Thread safe since publishing can happen from several event loops / threads.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = LAG_BUCKETS_SECONDS, window: int = ROLLING_WINDOW):
+        self.buckets = buckets
+        self.window = window
+        self._lock = threading.Lock()
+        self._overall: Dict[str, LagHistogram] = {}
+        self._per_match: Dict[str, Dict[str, LagHistogram]] = {}
+
+    def _histogram(self, stages: Dict[str, LagHistogram], stage: str) -> LagHistogram:
+        if stage not in stages:
+            stages[stage] = LagHistogram(self.buckets, self.window)
+        return stages[stage]
+
+    def record(self, match_id: str, tags: FreshnessTags) -> None:
+        """Record every lag sample carried by the tags of a published update."""
+        lags = tags.lags()
+        if not lags:
+            return
+        with self._lock:
+            match_stages = self._per_match.setdefault(match_id, {})
+            for stage, samples in lags.items():
+                overall = self._histogram(self._overall, stage)
+                per_match = self._histogram(match_stages, stage)
+                for seconds in samples:
+                    overall.observe(seconds)
+                    per_match.observe(seconds)
+
+    def summary(self) -> dict:
+        """Rolling percentiles for all matches combined and for every tracked match."""
+        with self._lock:
+            return {
+                'overall': {stage: hist.to_dict() for stage, hist in self._overall.items()},
+                'matches': {
+                    match_id: {stage: hist.to_dict() for stage, hist in stages.items()}
+                    for match_id, stages in self._per_match.items()
+                },
+            }
+
+    def match_summary(self, match_id: str) -> Optional[dict]:
+        """Percentiles and full lag histograms for a single match."""
+        with self._lock:
+            stages = self._per_match.get(match_id)
+            if stages is None:
+                return None
+            return {stage: hist.to_dict(include_buckets=True) for stage, hist in stages.items()}
+
+    def reset(self, match_id: Optional[str] = None) -> None:
+        with self._lock:
+            if match_id is None:
+                self._overall.clear()
+                self._per_match.clear()
+            else:
+                self._per_match.pop(match_id, None)
+
+
+# Process wide tracker (same pattern as config.time.time_config)
+freshness_tracker = FreshnessTracker()
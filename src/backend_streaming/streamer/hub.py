@@ -0,0 +1,253 @@
+"""
+Fan-out of live match updates to API clients (SSE / WebSocket, see api_routes/live_routes.py).
+
+One broker subscription per API process feeds the MatchUpdateHub. The hub keeps the last known
+state of every live match, diffs each update against it and pushes only the changed events to the
+connected clients. Every client has a bounded buffer: a client that falls `CLIENT_BUFFER_SIZE`
+messages behind is disconnected (it can reconnect and get a fresh snapshot) instead of slowing
+down everyone else.
+"""
+import os
+import socket
+import asyncio
+import logging
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import orjson
+
+from backend_streaming.config.executor import sync_executor
+from backend_streaming.streamer.broker import Broker, OutgoingMessage, Subscription
+from backend_streaming.streamer.codecs import decode_payload
+from backend_streaming.streamer.streamer import SingleGameStreamer
+
+logger = logging.getLogger(__name__)
+
+CLIENT_BUFFER_SIZE = int(os.getenv('LIVE_CLIENT_BUFFER_SIZE', 64))
+MAX_CLIENTS = int(os.getenv('LIVE_MAX_CLIENTS', 10000))
+
+SNAPSHOT = 'snapshot'
+DELTA = 'delta'
+STOP = 'stop'
+
+# stamped by the database (save_match_state), not part of the event: rows loaded from match_projection
+# have them, the rows of the updates don't
+BOOKKEEPING_FIELDS = frozenset({'version', 'match_version'})
+
+
+def _same_event(stored: Optional[dict], row: dict) -> bool:
+    """Whether `row` is the stored event, its bookkeeping columns left out."""
+    if stored is None:
+        return False
+    keys = stored.keys() - BOOKKEEPING_FIELDS
+    if keys != row.keys() - BOOKKEEPING_FIELDS:
+        return False
+    return all(stored[key] == row[key] for key in keys)
+
+
+@dataclass
+class HubMessage:
+    """A message for every client of a match. Serialized once, whatever the number of clients."""
+    type: str
+    game_id: str
+    seq: int
+    events: List[dict] = field(default_factory=list)
+    removed_event_ids: List[int] = field(default_factory=list)
+
+    @cached_property
+    def json(self) -> str:
+        message = {'type': self.type, 'game_id': self.game_id, 'seq': self.seq, 'events': self.events}
+        if self.removed_event_ids:
+            message['removed_event_ids'] = self.removed_event_ids
+        return orjson.dumps(message).decode()
+
+    @cached_property
+    def sse(self) -> bytes:
+        return f"event: {self.type}\nid: {self.seq}\ndata: {self.json}\n\n".encode()
+
+
+class ClientConnection:
+    """Bounded send buffer of one connected client. `None` in the buffer means: close the connection."""
+    def __init__(self, game_id: str, buffer_size: int = CLIENT_BUFFER_SIZE):
+        self.game_id = game_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+    def offer(self, message: Optional[HubMessage]) -> bool:
+        """Queue a message without waiting. Returns False (and drops the client) if the buffer is full."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.close(dropped=True)
+            return False
+
+    def close(self, dropped: bool = False):
+        self.dropped = self.dropped or dropped
+        # make room for the close marker, the client won't read the rest anyway
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def next(self) -> Optional[HubMessage]:
+        return await self.queue.get()
+
+
+def _rows(payload) -> List[dict]:
+    """Event rows of an update: opta sends the list of projections, whoscored a dict with 'projections'."""
+    if isinstance(payload, dict):
+        return payload.get('projections') or []
+    return payload or []
+
+
+def _removed_ids(payload) -> List[int]:
+    """Deleted events of an update (whoscored diffs, see live_diff.py)."""
+    if isinstance(payload, dict):
+        return payload.get('removed_event_ids') or []
+    return []
+
+
+class MatchUpdateHub:
+    """
+    Keeps the latest state of every live match and fans out deltas to the connected clients.
+    NOTE: everything runs on the event loop, the hub is not thread-safe.
+    """
+    def __init__(
+        self,
+        broker: Optional[Broker] = None,
+        load_state: Optional[Callable[[str], Iterable[dict]]] = None,
+        queue_name: Optional[str] = None,
+        client_buffer_size: int = CLIENT_BUFFER_SIZE,
+        max_clients: int = MAX_CLIENTS,
+    ):
+        self.broker = broker
+        # fallback for matches the hub has not seen an update for yet (e.g. read model from the DB)
+        self.load_state = load_state
+        self.queue_name = queue_name or f"live_updates.{socket.gethostname()}.{os.getpid()}"
+        self.client_buffer_size = client_buffer_size
+        self.max_clients = max_clients
+        self._states: Dict[str, Dict[int, dict]] = {}
+        self._seq: Dict[str, int] = {}
+        self._snapshots: Dict[str, HubMessage] = {}
+        self._clients: Dict[str, Set[ClientConnection]] = {}
+        self._subscription: Optional[Subscription] = None
+        self._start_lock = asyncio.Lock()
+        self.stats = {'updates': 0, 'sent': 0, 'dropped_clients': 0}
+
+    @property
+    def client_count(self) -> int:
+        return sum(len(clients) for clients in self._clients.values())
+
+    async def start(self):
+        """Subscribe to every match update (idempotent)."""
+        async with self._start_lock:
+            if self._subscription is not None:
+                return
+            if self.broker is None:
+                from backend_streaming.streamer.publisher import get_broker
+                self.broker = get_broker()
+            await SingleGameStreamer.declare_topology(self.broker)
+            await self.broker.declare_queue(self.queue_name, auto_delete=True)
+            await self.broker.bind_queue(self.queue_name, SingleGameStreamer.EXCHANGE_NAME, '#')
+            self._subscription = await self.broker.subscribe(self.queue_name, self.on_message)
+            logger.info("Live update hub subscribed with queue %s", self.queue_name)
+
+    async def stop(self):
+        if self._subscription is not None:
+            await self._subscription.cancel()
+            self._subscription = None
+        for clients in self._clients.values():
+            for client in clients:
+                client.close()
+        self._clients.clear()
+
+    async def on_message(self, message: OutgoingMessage):
+        game_id = message.headers.get('game_id')
+        message_type = message.headers.get('message_type')
+        if not game_id:
+            return
+        # NOTE: a stop message may carry the last changes of the match, they are sent before the stop
+        payload = decode_payload(message.body, message.content_type, message.content_encoding) if message.body else None
+        self.apply_update(game_id, _rows(payload), _removed_ids(payload))
+        if message_type == SingleGameStreamer.STOP_MESSAGE_TYPE:
+            self.finish(game_id)
+
+    def _next_seq(self, game_id: str) -> int:
+        self._seq[game_id] = self._seq.get(game_id, 0) + 1
+        return self._seq[game_id]
+
+    def apply_update(self, game_id: str, rows: List[dict], removed_event_ids: Iterable[int] = ()):
+        """
+        Diff the rows of an update against the last known state, drop the removed events,
+        and push what changed.
+        """
+        if not rows and not removed_event_ids:
+            return
+        self.stats['updates'] += 1
+        state = self._states.setdefault(game_id, {})
+        changed = []
+        for row in rows:
+            event_id = row.get('event_id')
+            if not _same_event(state.get(event_id), row):
+                state[event_id] = row
+                changed.append(row)
+        removed = [event_id for event_id in removed_event_ids if state.pop(event_id, None) is not None]
+        if not changed and not removed:
+            return
+        self._snapshots.pop(game_id, None)
+        self._broadcast(game_id, HubMessage(DELTA, game_id, self._next_seq(game_id), changed, removed))
+
+    def finish(self, game_id: str):
+        """End of game: tell the clients, close their connections and forget the match."""
+        self._broadcast(game_id, HubMessage(STOP, game_id, self._next_seq(game_id)))
+        for client in self._clients.pop(game_id, set()):
+            client.offer(None)
+        self._states.pop(game_id, None)
+        self._snapshots.pop(game_id, None)
+
+    def _broadcast(self, game_id: str, message: HubMessage):
+        for client in list(self._clients.get(game_id, ())):
+            if client.offer(message):
+                self.stats['sent'] += 1
+            else:
+                self.stats['dropped_clients'] += 1
+                self._clients[game_id].discard(client)
+                logger.info("Dropped slow client of match %s", game_id)
+
+    def snapshot(self, game_id: str) -> HubMessage:
+        """Current state of the match, serialized once per state."""
+        snapshot = self._snapshots.get(game_id)
+        if snapshot is None:
+            events = sorted(self._states.get(game_id, {}).values(), key=lambda row: row.get('event_id') or 0)
+            snapshot = HubMessage(SNAPSHOT, game_id, self._seq.get(game_id, 0), events)
+            self._snapshots[game_id] = snapshot
+        return snapshot
+
+    async def connect(self, game_id: str) -> ClientConnection:
+        """
+        Register a client. Its buffer starts with the snapshot, then receives the deltas.
+        Raises ConnectionRefusedError when `max_clients` are already connected.
+        """
+        if self.client_count >= self.max_clients:
+            raise ConnectionRefusedError(f"Too many live clients ({self.max_clients})")
+        await self.start()
+        if game_id not in self._states and self.load_state is not None:
+            rows = await sync_executor.run(lambda: list(self.load_state(game_id)))
+            # an update may have arrived while loading, it is newer than the DB
+            if game_id not in self._states:
+                self._states[game_id] = {row['event_id']: row for row in rows}
+
+        # NOTE: no await between the snapshot and the registration, so no delta is missed
+        client = ClientConnection(game_id, self.client_buffer_size)
+        client.offer(self.snapshot(game_id))
+        self._clients.setdefault(game_id, set()).add(client)
+        return client
+
+    def disconnect(self, client: ClientConnection):
+        clients = self._clients.get(client.game_id)
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del self._clients[client.game_id]
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from backend_streaming.streamer.broker import Broker, MessageHandler, OutgoingMessage, PublishError, Subscription
+
+logger = logging.getLogger(__name__)
+
+EXCHANGE_TYPES = ('topic', 'direct', 'fanout')
+OVERFLOW_POLICIES = ('block', 'reject')
+
+
+@lru_cache(maxsize=4096)
+def topic_matches(binding_key: str, routing_key: str) -> bool:
+    """
+    AMQP topic matching: words are separated by '.',
+    '*' matches exactly one word and '#' matches zero or more words.
+    """
+    pattern = binding_key.split('.')
+    words = routing_key.split('.') if routing_key else []
+
+    def match(i: int, j: int) -> bool:
+        if i == len(pattern):
+            return j == len(words)
+        if pattern[i] == '#':
+            return any(match(i + 1, k) for k in range(j, len(words) + 1))
+        if j == len(words):
+            return False
+        return pattern[i] in ('*', words[j]) and match(i + 1, j + 1)
+
+    return match(0, 0)
+
+
+@dataclass
+class BrokerStats:
+    published: int = 0
+    delivered: int = 0
+    unroutable: int = 0
+    rejected: int = 0
+    # times a publish had to wait for a full queue
+    blocked: int = 0
+
+
+@dataclass
+class _Exchange:
+    name: str
+    type: str
+    # (queue name, binding key)
+    bindings: Set[Tuple[str, str]] = field(default_factory=set)
+
+
+class InMemorySubscription(Subscription):
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+
+    async def cancel(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+
+class InMemoryBroker(Broker):
+    """
+    In-process stand-in for RabbitMQ with the same semantics the streamer relies on:
+    - queues, the default exchange and topic / direct / fanout exchanges with bindings
+    - publish returns once the message is "confirmed", i.e. enqueued on every matching queue
+    - `latency` simulates the confirm round trip (once per publish, once per confirm batch)
+    - bounded queues (`max_queue_size`) give backpressure: 'block' makes publishers wait for
+      consumers (like flow control), 'reject' nacks the message (like x-overflow=reject-publish)
+    Unroutable messages are dropped and counted, as RabbitMQ does without the mandatory flag.
+    """
+    def __init__(
+        self,
+        latency: float = 0.0,
+        max_queue_size: int = 0,
+        overflow: str = 'block',
+        confirm_batch_size: int = 256,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}. Expected one of {OVERFLOW_POLICIES}")
+        self.latency = latency
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+        self.confirm_batch_size = confirm_batch_size
+        self.stats = BrokerStats()
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._exchanges: Dict[str, _Exchange] = {}
+        self._subscriptions: List[InMemorySubscription] = []
+
+    async def declare_queue(self, queue_name: str, auto_delete: bool = False) -> asyncio.Queue:
+        if queue_name not in self._queues:
+            self._queues[queue_name] = asyncio.Queue(maxsize=self.max_queue_size)
+        return self._queues[queue_name]
+
+    async def declare_exchange(self, exchange_name: str, exchange_type: str = 'topic'):
+        exchange_type = getattr(exchange_type, 'value', exchange_type)
+        if exchange_type not in EXCHANGE_TYPES:
+            raise ValueError(f"Unsupported exchange type: {exchange_type}")
+        existing = self._exchanges.get(exchange_name)
+        if existing and existing.type != exchange_type:
+            # same error RabbitMQ gives (PRECONDITION_FAILED)
+            raise ValueError(f"Exchange {exchange_name} already declared as {existing.type}")
+        if not existing:
+            self._exchanges[exchange_name] = _Exchange(exchange_name, exchange_type)
+
+    async def bind_queue(self, queue_name: str, exchange_name: str, binding_key: str):
+        if exchange_name not in self._exchanges:
+            raise ValueError(f"Exchange {exchange_name} is not declared")
+        await self.declare_queue(queue_name)
+        self._exchanges[exchange_name].bindings.add((queue_name, binding_key))
+
+    def route(self, message: OutgoingMessage) -> List[str]:
+        """Names of the queues the message is delivered to."""
+        if not message.exchange:
+            return [message.routing_key] if message.routing_key in self._queues else []
+        exchange = self._exchanges.get(message.exchange)
+        if exchange is None:
+            raise PublishError(f"Exchange {message.exchange} is not declared")
+        if exchange.type == 'fanout':
+            return sorted({queue for queue, _ in exchange.bindings})
+        if exchange.type == 'direct':
+            return sorted({queue for queue, key in exchange.bindings if key == message.routing_key})
+        return sorted({queue for queue, key in exchange.bindings if topic_matches(key, message.routing_key)})
+
+    async def _enqueue(self, message: OutgoingMessage):
+        queues = self.route(message)
+        if not queues:
+            self.stats.unroutable += 1
+            return
+        if self.overflow == 'reject':
+            full = [name for name in queues if self._queues[name].full()]
+            if full:
+                self.stats.rejected += 1
+                raise PublishError(f"Queue {full[0]} is full, message for {message.routing_key} rejected")
+        for name in queues:
+            queue = self._queues[name]
+            if queue.full():
+                self.stats.blocked += 1
+            # every queue gets its own copy, like the real broker
+            await queue.put(replace(message, headers=dict(message.headers)))
+        self.stats.published += 1
+
+    async def publish(self, message: OutgoingMessage):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        await self._enqueue(message)
+
+    async def publish_batch(self, messages: List[OutgoingMessage]):
+        """Same as RabbitPublisher: one confirm round trip per `confirm_batch_size` messages."""
+        errors = []
+        for start in range(0, len(messages), self.confirm_batch_size):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            for message in messages[start:start + self.confirm_batch_size]:
+                try:
+                    await self._enqueue(message)
+                except PublishError as e:
+                    errors.append(e)
+        if errors:
+            raise PublishError(f"{len(errors)}/{len(messages)} messages were not confirmed: {errors[0]}")
+
+    async def get(self, queue_name: str, timeout: Optional[float] = None) -> OutgoingMessage:
+        """Pop the next message of a queue (handy in tests)."""
+        queue = await self.declare_queue(queue_name)
+        message = await asyncio.wait_for(queue.get(), timeout)
+        queue.task_done()
+        self.stats.delivered += 1
+        return message
+
+    def qsize(self, queue_name: str) -> int:
+        queue = self._queues.get(queue_name)
+        return queue.qsize() if queue else 0
+
+    async def subscribe(self, queue_name: str, handler: MessageHandler, prefetch: int = 100) -> InMemorySubscription:
+        """Deliver messages to `handler` one at a time. Errors are logged and the message dropped."""
+        queue = await self.declare_queue(queue_name)
+
+        async def consume():
+            while True:
+                message = await queue.get()
+                try:
+                    await handler(message)
+                    self.stats.delivered += 1
+                except Exception as e:
+                    logger.error("Handler failed for message %s: %s", message.routing_key, e, exc_info=True)
+                finally:
+                    queue.task_done()
+
+        subscription = InMemorySubscription(asyncio.create_task(consume()))
+        self._subscriptions.append(subscription)
+        return subscription
+
+    async def join(self, queue_name: str):
+        """Wait until every message published to the queue so far was consumed."""
+        await (await self.declare_queue(queue_name)).join()
+
+    async def close(self):
+        for subscription in self._subscriptions:
+            await subscription.cancel()
+        self._subscriptions.clear()
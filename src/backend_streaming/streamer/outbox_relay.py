@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import logging
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from backend_streaming.providers.opta.infra.repo.outbox import OutboxRepository
+from backend_streaming.streamer.freshness import freshness_tracker, utc_now
+from backend_streaming.streamer.broker import Broker
+from backend_streaming.streamer.publisher import get_broker
+from backend_streaming.streamer.streamer import SingleGameStreamer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 500))
+DEFAULT_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 0.5))
+# published rows are kept this long (e.g. to inspect what was sent), then purged every PURGE_INTERVAL seconds
+DEFAULT_RETENTION = timedelta(hours=float(os.getenv('OUTBOX_RETENTION_HOURS', 24)))
+DEFAULT_PURGE_INTERVAL = float(os.getenv('OUTBOX_PURGE_INTERVAL', 300))
+
+
+class OutboxRelay:
+    """
+    Drains the outbox table to the broker.
+    Every drain claims a batch of unpublished rows (FOR UPDATE SKIP LOCKED), publishes them with
+    confirms and marks them published in the same transaction. If the publish fails the transaction
+    is rolled back and the rows are retried on the next drain, so delivery is at-least-once:
+    consumers should be idempotent on (game_id, message_type, timestamp).
+    Published rows are deleted once older than `retention` (checked every `purge_interval` seconds).
+    NOTE: the ingest loop only writes rows, it never waits on the broker.
+    """
+    def __init__(
+        self,
+        outbox_repo: OutboxRepository,
+        publisher: Optional[Broker] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        retention: timedelta = DEFAULT_RETENTION,
+        purge_interval: float = DEFAULT_PURGE_INTERVAL,
+    ):
+        self.outbox_repo = outbox_repo
+        self.publisher = publisher or get_broker()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._last_purge: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def drain_once(self) -> int:
+        """Publish one batch. Returns the number of published rows."""
+        session: Session = self.outbox_repo.session_factory()
+        try:
+            rows = await asyncio.to_thread(self.outbox_repo.claim_batch, session, self.batch_size)
+            if not rows:
+                session.rollback()
+                return 0
+
+            messages, tags = [], []
+            published_at = utc_now()
+            for row in rows:
+                row.attempts = (row.attempts or 0) + 1
+                message, freshness = self.outbox_repo.to_message(row)
+                if freshness:
+                    freshness.published_at = published_at
+                    message.headers.update(freshness.to_headers())
+                messages.append(message)
+                tags.append((row.aggregate_id, freshness))
+
+            try:
+                await SingleGameStreamer.declare_topology(self.publisher)
+                await self.publisher.publish_batch(messages)
+            except Exception:
+                session.rollback()
+                # keep track of the failed attempts (outside of the rolled back transaction)
+                await asyncio.to_thread(self._record_failed_attempt, [row.id for row in rows])
+                raise
+
+            now = datetime.utcnow()
+            for row in rows:
+                row.published_on = now
+            await asyncio.to_thread(session.commit)
+        finally:
+            session.close()
+
+        for aggregate_id, freshness in tags:
+            if freshness:
+                freshness_tracker.record(aggregate_id, freshness)
+        return len(rows)
+
+    def _record_failed_attempt(self, ids):
+        session: Session = self.outbox_repo.session_factory()
+        try:
+            self.outbox_repo.increment_attempts(session, ids)
+            session.commit()
+        except Exception:
+            session.rollback()
+            logger.warning("Could not record failed outbox attempt for %s rows", len(ids), exc_info=True)
+        finally:
+            session.close()
+
+    async def purge_once(self) -> int:
+        """Delete the rows published more than `retention` ago. Returns the number of deleted rows."""
+        self._last_purge = time.monotonic()
+        deleted = await asyncio.to_thread(self.outbox_repo.delete_published, datetime.utcnow() - self.retention)
+        if deleted:
+            logger.info("Purged %s published outbox rows", deleted)
+        return deleted
+
+    async def run(self):
+        """Drain until stopped. Full batches are drained back to back, otherwise wait `poll_interval`."""
+        logger.info("Outbox relay started (batch_size=%s, poll_interval=%ss)", self.batch_size, self.poll_interval)
+        while not self._stopping:
+            try:
+                published = await self.drain_once()
+            except Exception as e:
+                logger.error("Outbox relay failed to publish a batch: %s", e, exc_info=True)
+                published = 0
+            if self._last_purge is None or time.monotonic() - self._last_purge >= self.purge_interval:
+                try:
+                    await self.purge_once()
+                except Exception as e:
+                    logger.error("Outbox relay failed to purge published rows: %s", e, exc_info=True)
+            if published < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+        logger.info("Outbox relay stopped")
+
+    def start(self) -> asyncio.Task:
+        """Run the relay as a background task on the current event loop."""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self, drain: bool = True):
+        """Stop the background task. If `drain`, publish whatever is left in the outbox first."""
+        self._stopping = True
+        if self._task:
+            await self._task
+            self._task = None
+        if drain:
+            while await self.drain_once():
+                pass
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import os
+import asyncio
+import logging
+import itertools
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+from backend_streaming.streamer.broker import Broker, MessageHandler, OutgoingMessage, PublishError, Subscription
+from backend_streaming.streamer.memory_broker import InMemoryBroker
+
+if TYPE_CHECKING:
+    # NOTE: imported when connecting, the API and the memory broker never load aio_pika
+    import aio_pika
+
+logger = logging.getLogger(__name__)
+
+# Small pool is enough: channels are multiplexed over a single connection and
+# every channel can have many unconfirmed publishes in flight.
+DEFAULT_CHANNEL_POOL_SIZE = int(os.getenv('RABBITMQ_CHANNEL_POOL_SIZE', 4))
+# Max number of unconfirmed messages in flight for a single publish_batch call.
+DEFAULT_CONFIRM_BATCH_SIZE = int(os.getenv('RABBITMQ_CONFIRM_BATCH_SIZE', 256))
+
+
+class RabbitSubscription(Subscription):
+    def __init__(self, channel: aio_pika.abc.AbstractChannel, queue: aio_pika.abc.AbstractQueue, consumer_tag: str):
+        self.channel = channel
+        self.queue = queue
+        self.consumer_tag = consumer_tag
+
+    async def cancel(self):
+        await self.queue.cancel(self.consumer_tag)
+        await self.channel.close()
+
+
+class RabbitPublisher(Broker):
+    """
+    Long-lived publisher shared by every match in the process.
+    - one robust connection (reconnects and restores channels automatically)
+    - a small round-robin pool of channels with publisher confirms enabled
+    - batches of messages are published without waiting for each confirm in between
+    Use get_publisher() instead of creating one per match.
+    """
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = DEFAULT_CHANNEL_POOL_SIZE,
+        confirm_batch_size: int = DEFAULT_CONFIRM_BATCH_SIZE,
+    ):
+        self.url = url
+        self.pool_size = pool_size
+        self.confirm_batch_size = confirm_batch_size
+        # queues / exchanges / bindings are declared once per process instead of once per match
+        self._queues: Dict[str, aio_pika.abc.AbstractQueue] = {}
+        self._declared_exchanges = set()
+        self._declared_bindings = set()
+        # (channel number, exchange name) -> exchange object
+        self._exchanges: Dict[tuple, aio_pika.abc.AbstractExchange] = {}
+        self.connection: Optional[aio_pika.abc.AbstractRobustConnection] = None
+        self._channels: List[aio_pika.abc.AbstractRobustChannel] = []
+        self._next_channel = None
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        return self.connection is not None and not self.connection.is_closed
+
+    async def connect(self):
+        """Open the shared connection and channel pool (no-op if already open)."""
+        if self.is_connected:
+            return
+        async with self._connect_lock:
+            if self.is_connected:
+                return
+            import aio_pika
+
+            self.connection = await aio_pika.connect_robust(self.url)
+            self._channels = [
+                await self.connection.channel(publisher_confirms=True)
+                for _ in range(self.pool_size)
+            ]
+            self._next_channel = itertools.cycle(self._channels)
+            self._queues.clear()
+            self._declared_exchanges.clear()
+            self._declared_bindings.clear()
+            self._exchanges.clear()
+            logger.info(f"Publisher connected with {self.pool_size} channels")
+
+    async def declare_queue(self, queue_name: str, auto_delete: bool = False):
+        """Declare a queue once for the lifetime of the connection."""
+        await self.connect()
+        if queue_name not in self._queues:
+            self._queues[queue_name] = await self._channels[0].declare_queue(queue_name, auto_delete=auto_delete)
+        return self._queues[queue_name]
+
+    async def declare_exchange(
+        self,
+        exchange_name: str,
+        exchange_type: Union[str, aio_pika.ExchangeType] = 'topic',
+    ):
+        """Declare a durable exchange once for the lifetime of the connection."""
+        import aio_pika
+
+        await self.connect()
+        if exchange_name not in self._declared_exchanges:
+            await self._channels[0].declare_exchange(exchange_name, aio_pika.ExchangeType(exchange_type), durable=True)
+            self._declared_exchanges.add(exchange_name)
+
+    async def bind_queue(self, queue_name: str, exchange_name: str, binding_key: str):
+        """Declare `queue_name` and bind it to `exchange_name` with `binding_key` (once)."""
+        queue = await self.declare_queue(queue_name)
+        binding = (queue_name, exchange_name, binding_key)
+        if binding not in self._declared_bindings:
+            await queue.bind(exchange_name, routing_key=binding_key)
+            self._declared_bindings.add(binding)
+
+    def _channel(self) -> aio_pika.abc.AbstractRobustChannel:
+        return next(self._next_channel)
+
+    async def _exchange(self, channel, exchange_name: str) -> aio_pika.abc.AbstractExchange:
+        if not exchange_name:
+            return channel.default_exchange
+        key = (channel.number, exchange_name)
+        if key not in self._exchanges:
+            self._exchanges[key] = await channel.get_exchange(exchange_name, ensure=False)
+        return self._exchanges[key]
+
+    def _build(self, message: OutgoingMessage) -> aio_pika.Message:
+        import aio_pika
+
+        return aio_pika.Message(
+            body=message.body,
+            app_id=message.app_id,
+            content_type=message.content_type,
+            content_encoding=message.content_encoding,
+            headers=message.headers,
+        )
+
+    async def _publish(self, channel, message: OutgoingMessage):
+        from pamqp.commands import Basic
+
+        exchange = await self._exchange(channel, message.exchange)
+        confirmation = await exchange.publish(
+            self._build(message),
+            routing_key=message.routing_key,
+        )
+        if not isinstance(confirmation, Basic.Ack):
+            raise PublishError(f"Broker did not confirm message for {message.routing_key}: {confirmation}")
+
+    async def publish(self, message: OutgoingMessage):
+        """Publish a single message and wait for the broker confirm."""
+        await self.connect()
+        await self._publish(self._channel(), message)
+
+    async def publish_batch(self, messages: List[OutgoingMessage]):
+        """
+        Publish many messages and wait for all confirms.
+        Up to `confirm_batch_size` messages are in flight on one channel before we wait,
+        which keeps ordering per channel while removing one round trip per message.
+        """
+        await self.connect()
+        channel = self._channel()
+        for start in range(0, len(messages), self.confirm_batch_size):
+            chunk = messages[start:start + self.confirm_batch_size]
+            results = await asyncio.gather(
+                *(self._publish(channel, message) for message in chunk),
+                return_exceptions=True,
+            )
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                raise PublishError(f"{len(errors)}/{len(chunk)} messages were not confirmed: {errors[0]}")
+
+    async def subscribe(self, queue_name: str, handler: MessageHandler, prefetch: int = 100) -> RabbitSubscription:
+        """
+        Consume `queue_name` on a dedicated channel. Messages are acked after `handler` returns
+        and rejected (not requeued) if it raises.
+        """
+        # declared (with its arguments) through the publisher, looked up on the consumer channel
+        await self.declare_queue(queue_name)
+        channel = await self.connection.channel()
+        await channel.set_qos(prefetch_count=prefetch)
+        queue = await channel.get_queue(queue_name, ensure=False)
+
+        async def on_message(incoming: aio_pika.abc.AbstractIncomingMessage):
+            async with incoming.process(requeue=False):
+                await handler(OutgoingMessage(
+                    exchange=incoming.exchange or '',
+                    routing_key=incoming.routing_key or '',
+                    body=incoming.body,
+                    headers=dict(incoming.headers or {}),
+                    content_type=incoming.content_type,
+                    content_encoding=incoming.content_encoding,
+                    app_id=incoming.app_id,
+                ))
+
+        consumer_tag = await queue.consume(on_message)
+        return RabbitSubscription(channel, queue, consumer_tag)
+
+    async def close(self):
+        """Close the shared connection. Only call this on process shutdown."""
+        if self.connection:
+            await self.connection.close()
+        self.connection = None
+        self._channels = []
+        self._next_channel = None
+
+
+_publishers: Dict[str, RabbitPublisher] = {}
+
+
+def get_publisher(url: Optional[str] = None, **kwargs) -> RabbitPublisher:
+    """Return the process wide publisher for `url` (defaults to RABBITMQ_URL)."""
+    url = url or os.getenv('RABBITMQ_URL')
+    if url not in _publishers:
+        _publishers[url] = RabbitPublisher(url, **kwargs)
+    return _publishers[url]
+
+
+_memory_broker: Optional[InMemoryBroker] = None
+
+
+def get_broker(url: Optional[str] = None) -> Broker:
+    """
+    Return the process wide broker selected by STREAMER_BROKER:
+        rabbitmq (default) -> get_publisher(url)
+        memory             -> a single InMemoryBroker, no external services needed
+    """
+    global _memory_broker
+    kind = os.getenv('STREAMER_BROKER', 'rabbitmq').lower()
+    if kind == 'memory':
+        if _memory_broker is None:
+            _memory_broker = InMemoryBroker()
+        return _memory_broker
+    if kind != 'rabbitmq':
+        raise ValueError(f"Unknown broker: {kind}. Expected 'rabbitmq' or 'memory'")
+    return get_publisher(url)
+
+
+async def close_publishers():
+    """Close every shared publisher / broker. Call on process shutdown."""
+    global _memory_broker
+    for publisher in list(_publishers.values()):
+        await publisher.close()
+    _publishers.clear()
+    if _memory_broker is not None:
+        await _memory_broker.close()
+        _memory_broker = None
@@ -0,0 +1,68 @@
+# tests/config_tests/test_logging.py
+import json
+import logging
+import sys
+import time
+
+from backend_streaming.config import logging as log_config
+from backend_streaming.config.logging import JsonFormatter, RateLimitFilter, close_match_logger, setup_match_logger
+
+
+def record(msg, *args, name='game.1', **extra):
+    return logging.makeLogRecord({'name': name, 'msg': msg, 'args': args, 'levelno': logging.INFO, 'levelname': 'INFO', **extra})
+
+
+def wait_closed(route, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while route in log_config._router._routes:
+        assert time.monotonic() < deadline, f"route {route} was not closed"
+        time.sleep(0.01)
+
+
+def test_json_formatter_keeps_extra_fields_and_traceback():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        exc_info = sys.exc_info()
+    entry = json.loads(JsonFormatter().format(record("New event %s", 7, game_id='1', at=object(), exc_info=exc_info)))
+
+    assert entry['message'] == "New event 7" and entry['logger'] == 'game.1' and entry['level'] == 'INFO'
+    assert entry['game_id'] == '1' and entry['at'].startswith('<object')
+    assert 'ValueError: boom' in entry['exc_info']
+    assert not {'args', 'msg', 'levelno', 'route'} & entry.keys()
+
+
+def test_rate_limit_groups_by_template_and_reports_suppressed(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(log_config.time, 'monotonic', lambda: now[0])
+    limit = RateLimitFilter(rate=2, per=10)
+
+    assert [limit.filter(record("New event %s", i)) for i in range(5)] == [True, True, False, False, False]
+    # another template, or another logger, has its own window
+    assert limit.filter(record("Score changed"))
+    assert limit.filter(record("New event %s", 5, name='game.2'))
+
+    now[0] = 10.0
+    passed = record("New event %s", 6)
+    assert limit.filter(passed) and passed.suppressed == 3
+    # reported once
+    following = record("New event %s", 7)
+    assert limit.filter(following) and not hasattr(following, 'suppressed')
+
+
+def test_match_logger_writes_json_lines_off_the_calling_thread(tmp_path):
+    log_file = tmp_path / 'game.log'
+    # set up twice: the handlers are replaced, not stacked
+    setup_match_logger('test_logging.game', tmp_path / 'first.log')
+    logger = setup_match_logger('test_logging.game', log_file, propagate=False)
+    assert len(logger.handlers) == 1 and isinstance(logger.handlers[0], log_config._RoutedQueueHandler)
+    assert sum(isinstance(f, RateLimitFilter) for f in logger.filters) == 1
+
+    logger.info("New event %s", 1, extra={'game_id': 'g1'})
+    logger.debug("not written")
+    close_match_logger(logger.name)
+    wait_closed(logger.name)
+
+    assert not logger.handlers
+    lines = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [(line['message'], line['game_id']) for line in lines] == [("New event 1", 'g1')]
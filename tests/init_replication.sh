@@ -0,0 +1,4 @@
+#!/bin/sh
+# tests/init_replication.sh
+# Purpose: lets postgres_streaming_replica stream from the primary (runs once, at initdb)
+echo "host replication all all trust" >> "$PGDATA/pg_hba.conf"
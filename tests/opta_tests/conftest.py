@@ -1,7 +1,9 @@
 # tests/conftest.py
 
+import os
+
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 from backend_streaming.providers.opta.infra.models import Base, TeamModel, PlayerModel
@@ -18,6 +20,25 @@ def test_engine():
     yield engine
     Base.metadata.drop_all(bind=engine)    # teardown - drop all tables
 
+# with tests/docker-compose.yml up: TEST_PRIMARY_URL=postgresql://jlee@localhost:5429/streaming-db-local
+@pytest.fixture
+def postgres_sessions():
+    if not os.getenv("TEST_PRIMARY_URL"):
+        pytest.skip("needs a Postgres database (TEST_PRIMARY_URL)")
+    schema = "test_opta_repos"
+    engine = create_engine(os.environ["TEST_PRIMARY_URL"], connect_args={"options": f"-csearch_path={schema}"})
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    # with the partitions and indexes (GIN on the qualifiers)
+    Base.metadata.create_all(engine)
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        engine.dispose()
+
 @pytest.fixture
 def session(test_engine):
     """
@@ -0,0 +1,15 @@
+# tests/opta_tests/test_domain_event_ids.py
+import uuid
+
+from backend_streaming.providers.opta.domain.events import new_domain_event_id
+
+
+def test_domain_event_ids_are_time_ordered_uuid7():
+    ids = [new_domain_event_id() for _ in range(10000)]
+
+    assert len(set(ids)) == len(ids)
+    # many ids per ms: the counter keeps them in creation order
+    assert ids == sorted(ids)
+    parsed = uuid.UUID(ids[0])
+    assert parsed.version == 7
+    assert parsed.variant == uuid.RFC_4122
@@ -0,0 +1,78 @@
+# tests/opta_tests/test_event_history.py
+import datetime
+
+from backend_streaming.providers.opta.domain.events import EventEdited, GlobalEventAdded, new_domain_event_id
+from backend_streaming.providers.opta.infra.models import MatchProjectionModel
+from backend_streaming.providers.opta.infra.repo.event_store.local import LocalFileEventStore
+from backend_streaming.providers.opta.infra.repo.event_store.postgres import PostgresEventStore
+from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
+
+START = datetime.datetime(2024, 3, 20, 19, 0)
+
+
+def added(match_id, feed_event_id, minute):
+    return GlobalEventAdded(
+        domain_event_id=new_domain_event_id(), aggregate_id=match_id, occurred_on=START + datetime.timedelta(minutes=minute),
+        feed_event_id=feed_event_id, local_event_id=feed_event_id, type_id=1, period_id=1, time_min=minute, time_sec=0,
+    )
+
+
+def edited(match_id, feed_event_id, minute, **changed_fields):
+    return EventEdited(
+        domain_event_id=new_domain_event_id(), aggregate_id=match_id, occurred_on=START + datetime.timedelta(minutes=minute),
+        feed_event_id=feed_event_id, changed_fields=changed_fields,
+    )
+
+
+def history_events():
+    return [
+        added("m1", 1, 0), added("m1", 2, 1), edited("m1", 1, 2, type_id=3), edited("m1", 2, 3, x=10.0),
+        edited("m1", 1, 4, outcome=0), added("m2", 1, 0),
+    ]
+
+
+def assert_history(store):
+    history = store.load_event_history("m1", 1)
+    assert [type(evt).__name__ for evt in history] == ["GlobalEventAdded", "EventEdited", "EventEdited"]
+    assert [evt.changed_fields for evt in history[1:]] == [{"type_id": 3}, {"outcome": 0}]
+    assert all(evt.aggregate_id == "m1" and evt.feed_event_id == 1 for evt in history)
+    assert store.load_event_history("m1", 99) == []
+
+
+def test_local_store_loads_the_history_of_one_feed_event(tmp_path):
+    store = LocalFileEventStore(filename=str(tmp_path / "domain_events.json"))
+    events = history_events()
+    store.save_events("m1", events[:-1])
+    store.save_events("m2", events[-1:])
+
+    assert_history(store)
+    # read back from the file
+    assert_history(LocalFileEventStore(filename=str(tmp_path / "domain_events.json")))
+
+
+def test_postgres_store_loads_the_history_of_one_feed_event(postgres_sessions):
+    store = PostgresEventStore(session_factory=postgres_sessions)
+    events = history_events()
+    store.save_events("m1", events[:-1])
+    store.save_events("m2", events[-1:])
+
+    assert_history(store)
+
+
+def test_events_with_qualifier(postgres_sessions):
+    session = postgres_sessions()
+    session.add_all([
+        MatchProjectionModel(match_id="m1", event_id=1, qualifiers=[{"qualifierId": 28}, {"qualifierId": 140, "value": "p3"}]),
+        MatchProjectionModel(match_id="m1", event_id=2, qualifiers=[{"qualifierId": 140, "value": "p2"}]),
+        MatchProjectionModel(match_id="m1", event_id=3, qualifiers=[]),
+        MatchProjectionModel(match_id="m2", event_id=4, qualifiers=[{"qualifierId": 28}]),
+    ])
+    session.commit()
+    session.close()
+
+    repo = MatchProjectionRepository(postgres_sessions)
+    assert [(row["match_id"], row["event_id"]) for row in repo.get_events_with_qualifier(28)] == [("m1", 1), ("m2", 4)]
+    assert [row["event_id"] for row in repo.get_events_with_qualifier(28, match_id="m2")] == [4]
+    assert [row["event_id"] for row in repo.get_events_with_qualifier(140, value="p2")] == [2]
+    assert [row["event_id"] for row in repo.get_events_with_qualifier(140, limit=1)] == [1]
+    assert repo.get_events_with_qualifier(999) == []
@@ -0,0 +1,59 @@
+# tests/opta_tests/test_event_row_cache.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend_streaming.providers.opta.infra.models import Base, MatchProjectionModel, MatchProjectionVersionModel
+from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
+from backend_streaming.providers.opta.services.queries.event_row_cache import EventRowCache
+
+
+@pytest.fixture(scope="module")
+def repo(tmp_path_factory):
+    # file based: lookups run in a worker thread, which gets its own connection
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('rows') / 'rows.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    session = session_factory()
+    session.add_all([MatchProjectionModel(match_id="rows_match", event_id=500 + i, type_id=1) for i in range(5)])
+    session.add(MatchProjectionVersionModel(match_id="rows_match", version=1))
+    session.commit()
+    session.close()
+    return MatchProjectionRepository(session_factory)
+
+
+def set_version(repo, version):
+    session = repo.session_factory()
+    session.query(MatchProjectionVersionModel).filter_by(match_id="rows_match").update({"version": version})
+    session.query(MatchProjectionModel).filter_by(event_id=500).update({"type_id": version})
+    session.commit()
+    session.close()
+
+
+def test_lookup_is_chunked(repo):
+    rows = repo.get_events_by_ids([504, 500, 502, 999], chunk_size=2, with_match_version=True)
+    assert sorted(row["event_id"] for row in rows) == [500, 502, 504]
+    assert {row["match_version"] for row in rows} == {1}
+
+
+@pytest.mark.asyncio
+async def test_rows_are_cached_until_the_match_version_changes(repo):
+    version = {"value": 1}
+
+    async def get_version(match_id):
+        return version["value"]
+
+    cache = EventRowCache(repo, get_version)
+    assert [row["event_id"] for row in await cache.get_many([502, 500, 502])] == [502, 500]
+    assert (await cache.get_many([500, 501]))[0]["type_id"] == 1
+    assert cache.stats == {"hits": 1, "misses": 3, "stale": 0}
+
+    # upsert by another process: new version, cached rows of the match are stale
+    set_version(repo, 2)
+    version["value"] = 2
+    assert (await cache.get_many([500]))[0]["type_id"] == 2
+    assert cache.stats["stale"] == 1
+
+    # upsert in this process: dropped right away
+    cache.invalidate_matches({"rows_match"})
+    assert cache._rows == {} and cache._by_match == {}
@@ -0,0 +1,76 @@
+# tests/opta_tests/test_match_events_cache.py
+import gzip
+import json
+import time
+import asyncio
+import pytest
+
+from backend_streaming.providers.opta.services.queries.match_events_cache import MatchEventsCache, etag_matches
+
+
+class FakeProjectionRepo:
+    def __init__(self, rows):
+        self.rows = rows
+        self.version = 1
+        # version of the reader serving the rows (a replica may lag behind the one serving get_version)
+        self.rows_version = None
+        self.reads = 0
+        self.version_reads = 0
+
+    def get_version(self, match_id):
+        self.version_reads += 1
+        return self.version
+
+    def iter_match_state(self, match_id, with_match_version=False):
+        self.reads += 1
+        time.sleep(0.05)  # slow query, so concurrent requests overlap
+        version = self.version if self.rows_version is None else self.rows_version
+        for row in self.rows:
+            if row['match_id'] == match_id:
+                yield {**row, 'match_version': version} if with_match_version else dict(row)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_query():
+    repo = FakeProjectionRepo([{'match_id': 'm1', 'event_id': i} for i in range(3)])
+    cache = MatchEventsCache(repo, version_ttl=60)
+
+    versions = await asyncio.gather(*(cache.get_version('m1') for _ in range(20)))
+    responses = await asyncio.gather(*(cache.get('m1', versions[0]) for _ in range(20)))
+
+    assert repo.version_reads == 1 and repo.reads == 1
+    assert len({id(response) for response in responses}) == 1
+    assert json.loads(gzip.decompress(responses[0].gzip_body)) == json.loads(responses[0].body) == repo.rows
+
+    # a new version is a new key
+    repo.version = 2
+    assert (await cache.get('m1', 2)).etag != responses[0].etag
+    assert repo.reads == 2
+    assert await cache.get('missing', 1) is None
+
+
+@pytest.mark.asyncio
+async def test_rows_are_cached_under_the_version_they_were_read_at():
+    repo = FakeProjectionRepo([{'match_id': 'm1', 'event_id': 1}])
+    cache = MatchEventsCache(repo, version_ttl=60)
+    repo.version, repo.rows_version = 2, 1
+
+    # the version lookup saw version 2, the rows come from a reader still at version 1
+    response = await cache.get('m1', await cache.get_version('m1'))
+    assert response.version == 1 and response.etag == 'W/"m1:1:json"'
+    assert json.loads(response.body) == repo.rows
+
+    # nothing is cached as version 2: the next request reads again, from an up to date reader
+    repo.rows_version = None
+    assert (await cache.get('m1', 2)).version == 2
+    assert await cache.get('m1', 1) is response
+    assert repo.reads == 2
+
+
+def test_etag_matches():
+    etag = 'W/"m1:3:json"'
+    assert etag_matches('W/"m1:3:json"', etag)
+    assert etag_matches('"other", "m1:3:json"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('W/"m1:2:json"', etag)
+    assert not etag_matches(None, etag)
@@ -0,0 +1,141 @@
+# tests/opta_tests/test_match_projection_repo.py
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend_streaming.providers.opta.infra.models import Base, MatchProjectionModel, MatchProjectionVersionModel
+from backend_streaming.providers.opta.infra.repo.match_projection import MatchProjectionRepository
+from backend_streaming.providers.opta.services.queries.match_events_cache import SERIALIZERS, stream_chunks
+
+
+def test_iter_match_state_matches_orm_to_dict(test_engine):
+    session_factory = sessionmaker(bind=test_engine)
+    session = session_factory()
+    session.add_all([
+        MatchProjectionModel(
+            match_id="iter_match", event_id=event_id, local_event_id=i, type_id=1,
+            player_id="p1", contestant_id="Home", x=50.0, y=25.5,
+            qualifiers=[{"qualifierId": 140, "value": "p3"}],
+            time_stamp="2024-03-20T19:00:00.000Z",
+        )
+        for i, event_id in enumerate([30, 10, 20])
+    ])
+    session.add(MatchProjectionModel(match_id="other_match", event_id=40))
+    session.commit()
+    session.close()
+
+    repo = MatchProjectionRepository(session_factory)
+    rows = list(repo.iter_match_state("iter_match", batch_size=2))
+
+    assert [row["event_id"] for row in rows] == [10, 20, 30]
+    expected = sorted((model.to_dict() for model in repo.get_match_state("iter_match")), key=lambda r: r["event_id"])
+    assert rows == expected
+    assert list(repo.iter_match_state("missing_match")) == []
+
+    # the match version comes with the rows (None until the match has one)
+    assert {row["match_version"] for row in repo.iter_match_state("iter_match", with_match_version=True)} == {None}
+    session = session_factory()
+    session.add(MatchProjectionVersionModel(match_id="iter_match", version=3))
+    session.commit()
+    session.close()
+    versioned = list(repo.iter_match_state("iter_match", with_match_version=True))
+    assert [row.pop("match_version") for row in versioned] == [3, 3, 3] and versioned == expected
+
+
+def test_get_events_since_pages_in_version_order(test_engine):
+    session_factory = sessionmaker(bind=test_engine)
+    session = session_factory()
+    # (event_id, version): event 50 was edited in version 3
+    session.add_all([
+        MatchProjectionModel(match_id="since_match", event_id=event_id, version=version)
+        for event_id, version in [(50, 3), (60, 1), (70, 2), (80, 2)]
+    ])
+    session.commit()
+    session.close()
+
+    repo = MatchProjectionRepository(session_factory)
+    first_page = repo.get_events_since("since_match", limit=2)
+    assert [(row["version"], row["event_id"]) for row in first_page] == [(1, 60), (2, 70)]
+
+    rest = repo.get_events_since("since_match", after_version=2, after_event_id=70)
+    assert [(row["version"], row["event_id"]) for row in rest] == [(2, 80), (3, 50)]
+    assert repo.get_events_since("since_match", after_version=3, after_event_id=50) == []
+
+
+@pytest.mark.asyncio
+async def test_async_reads_match_sync_reads(tmp_path):
+    # file based: the sync and the async (aiosqlite) engines must see the same database
+    db_path = tmp_path / "async_reads.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    session = session_factory()
+    session.add_all([
+        MatchProjectionModel(match_id="async_match", event_id=event_id, version=event_id % 3, x=float(event_id))
+        for event_id in range(1, 451)
+    ])
+    session.commit()
+    session.close()
+
+    repo = MatchProjectionRepository(session_factory)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    try:
+        async with async_sessionmaker(async_engine)() as async_session:
+            assert (
+                await repo.get_events_since_async(async_session, "async_match", 1, 100, limit=50)
+                == repo.get_events_since("async_match", 1, 100, limit=50)
+            )
+            streamed = [row async for row in repo.stream_match_state(async_session, "async_match", batch_size=100)]
+            assert streamed == list(repo.iter_match_state("async_match"))
+
+            for format, serializer in SERIALIZERS.items():
+                chunks = [c async for c in stream_chunks(format, repo.stream_match_state(async_session, "async_match"))]
+                assert b"".join(chunks) == b"".join(serializer(streamed[0], iter(streamed[1:])))
+            assert [c async for c in stream_chunks("json", repo.stream_match_state(async_session, "missing"))] == []
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+
+
+def test_get_events_between_orders_by_match_time(test_engine):
+    session_factory = sessionmaker(bind=test_engine)
+    session = session_factory()
+    # (event_id, period_id, time_min, time_sec)
+    session.add_all([
+        MatchProjectionModel(match_id="timeline_match", event_id=event_id, period_id=period, time_min=minute, time_sec=second)
+        for event_id, period, minute, second in [
+            (1, 1, 10, 5), (2, 2, 61, 30), (3, 2, 61, 2), (4, 2, 75, 0), (5, 2, 80, 0), (6, 2, 59, 59),
+        ]
+    ])
+    session.commit()
+    session.close()
+
+    repo = MatchProjectionRepository(session_factory)
+    rows = repo.get_events_between("timeline_match", period_id=2, from_min=60, to_min=75)
+    assert [row["event_id"] for row in rows] == [3, 2, 4]
+    assert [row["event_id"] for row in repo.get_events_between("timeline_match", period_id=2, from_min=75)] == [4, 5]
+
+
+def test_version_is_bumped_only_when_a_row_changes(postgres_sessions):
+    repo = MatchProjectionRepository(postgres_sessions)
+    notified = []
+    MatchProjectionRepository.add_upsert_listener(notified.append)
+    try:
+        rows = [{"match_id": "v1", "event_id": event_id, "type_id": 1, "x": 10.0, "qualifiers": [{"qualifierId": 140}]}
+                for event_id in (1, 2)]
+        repo.save_match_state(rows)
+        assert repo.get_version("v1") == 1
+
+        # same content (json compared by value): nothing is written, the version is kept
+        repo.save_match_state([{**row, "qualifiers": [{"qualifierId": 140}]} for row in rows])
+        assert repo.get_version("v1") == 1
+
+        repo.save_match_state([rows[0], {**rows[1], "x": 20.0}, {**rows[0], "match_id": "v2", "event_id": 3}])
+        assert (repo.get_version("v1"), repo.get_version("v2")) == (2, 1)
+        # the unchanged row keeps its version
+        assert [(row["event_id"], row["version"]) for row in repo.get_events_since("v1")] == [(1, 1), (2, 2)]
+        assert notified == [{"v1"}, {"v1", "v2"}]
+    finally:
+        MatchProjectionRepository._upsert_listeners.remove(notified.append)
@@ -0,0 +1,72 @@
+# tests/opta_tests/test_player_stats.py
+import random
+
+from backend_streaming.providers.opta.domain.player_stats import event_stats, match_stats, stats_delta
+from backend_streaming.providers.opta.domain.value_objects.sport_event_enums import EventType, QualifierType
+
+
+def _event(event_id, type_id, player_id="p1", outcome=1, qualifiers=None):
+    return {
+        "event_id": event_id, "type_id": type_id, "player_id": player_id,
+        "outcome": outcome, "qualifiers": qualifiers or [],
+    }
+
+
+def test_event_stats_counts_shots_goals_and_duels():
+    own_goal = _event(1, EventType.GOAL, qualifiers=[{"qualifierId": QualifierType.OWN_GOAL}])
+    blocked = _event(2, EventType.ATTEMPT_SAVED, qualifiers=[{"qualifierId": QualifierType.BLOCKED}])
+
+    assert event_stats(_event(1, EventType.GOAL))[1] == {"events": 1, "shots": 1, "shots_on_target": 1, "goals": 1}
+    assert event_stats(own_goal)[1] == {"events": 1, "own_goals": 1}
+    assert event_stats(blocked)[1] == {"events": 1, "shots": 1}
+    assert event_stats(_event(3, EventType.AERIAL, outcome=0))[1] == {"events": 1, "aerials": 1, "duels": 1}
+    assert event_stats(_event(4, EventType.CHALLENGE))[1] == {"events": 1, "duels": 1}
+    assert event_stats(_event(5, EventType.PASS_, player_id=None)) is None
+    assert event_stats(_event(6, EventType.DELETED_EVENT)) is None
+
+
+def test_edits_undo_the_old_contribution():
+    stored = {1: _event(1, EventType.PASS_, outcome=1)}
+
+    # outcome edited: the completed pass is undone, the total stays
+    assert stats_delta(stored, [_event(1, EventType.PASS_, outcome=0)]) == {"p1": {"passes_completed": -1}}
+    # type edited
+    assert stats_delta(stored, [_event(1, EventType.MISS)]) == {
+        "p1": {"passes": -1, "passes_completed": -1, "shots": 1}
+    }
+    # player edited: moves from one player to the other
+    assert stats_delta(stored, [_event(1, EventType.PASS_, player_id="p2")]) == {
+        "p1": {"events": -1, "passes": -1, "passes_completed": -1},
+        "p2": {"events": 1, "passes": 1, "passes_completed": 1},
+    }
+    # deleted, and unchanged rows
+    assert stats_delta(stored, [_event(1, EventType.DELETED_EVENT)]) == {
+        "p1": {"events": -1, "passes": -1, "passes_completed": -1}
+    }
+    assert stats_delta(stored, [_event(1, EventType.PASS_, outcome=1)]) == {}
+
+
+def test_incremental_deltas_add_up_to_the_match_stats():
+    rng = random.Random(7)
+    types = [EventType.PASS_, EventType.TAKE_ON, EventType.TACKLE, EventType.INTERCEPTION, EventType.MISS,
+             EventType.ATTEMPT_SAVED, EventType.GOAL, EventType.AERIAL, EventType.CHALLENGE, EventType.DELETED_EVENT]
+    stored, totals = {}, {}
+    for _ in range(50):
+        batch = {}
+        for _ in range(20):
+            event_id = rng.randrange(100)
+            batch[event_id] = _event(
+                event_id, rng.choice(types), player_id=rng.choice(["p1", "p2", "p3", None]), outcome=rng.randint(0, 1),
+                qualifiers=rng.choice([[], [{"qualifierId": QualifierType.OWN_GOAL}], [{"qualifierId": "82"}]]),
+            )
+        for player_id, counts in stats_delta(stored, batch.values()).items():
+            for stat, count in counts.items():
+                totals.setdefault(player_id, {}).setdefault(stat, 0)
+                totals[player_id][stat] += count
+        stored.update(batch)
+
+    totals = {
+        player_id: {stat: count for stat, count in counts.items() if count}
+        for player_id, counts in totals.items()
+    }
+    assert {player_id: counts for player_id, counts in totals.items() if counts} == match_stats(stored.values())
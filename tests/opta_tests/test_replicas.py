@@ -0,0 +1,136 @@
+# tests/opta_tests/test_replicas.py
+import os
+import time
+
+import pytest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend_streaming.providers.opta.infra.replicas import ReplicaState, RoutingSessionFactory, parse_lsn
+
+
+def _database(session):
+    return session.execute(text("SELECT name FROM which")).scalar_one()
+
+
+@pytest.fixture
+def engines(tmp_path):
+    engines = {}
+    for name in ("primary", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE which (name TEXT)"))
+            conn.execute(text("INSERT INTO which VALUES (:name)"), {"name": name})
+        engines[name] = engine
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+
+def test_reads_go_to_a_fresh_replica_and_writes_to_the_primary(engines):
+    states = {"lag": 0.5, "lsn": 10}
+    probes = []
+
+    def probe(engine):
+        probes.append(engine)
+        return ReplicaState(lag=states["lag"], replay_lsn=states["lsn"])
+
+    sessions = RoutingSessionFactory(
+        sessionmaker(bind=engines["primary"]), [engines["replica"]],
+        probe=probe, write_position=lambda engine: 20,
+    )
+    sessions.tracker.max_lag = 1.0
+    sessions.tracker.check_interval = 60
+
+    assert _database(sessions()) == "primary"
+    assert _database(sessions.reader()) == "replica"
+    assert _database(sessions.reader_factory()()) == "replica"
+    # the state is only checked once per interval
+    assert len(probes) == 1
+
+    # too far behind: the primary serves the reads, until the next check sees it caught up
+    states["lag"] = 3.0
+    sessions.tracker.states[0].checked_at = float("-inf")
+    assert _database(sessions.reader()) == "primary"
+    states["lag"] = 0.0
+    assert _database(sessions.reader()) == "primary"
+    sessions.tracker.states[0].checked_at = float("-inf")
+    assert _database(sessions.reader()) == "replica"
+
+
+def test_read_your_writes_waits_for_the_replica_to_replay_the_commit(engines):
+    states = {"lsn": 10}
+    sessions = RoutingSessionFactory(
+        sessionmaker(bind=engines["primary"]), [engines["replica"]],
+        probe=lambda engine: ReplicaState(lag=0.0, replay_lsn=states["lsn"]),
+        write_position=lambda engine: 20,
+    )
+    sessions.tracker.check_interval = 60
+
+    session = sessions()
+    session.execute(text("UPDATE which SET name = name"))
+    session.commit()
+    session.close()
+    assert sessions.tracker.last_write_lsn == 20
+
+    # the replica is fresh enough for plain reads, but has not replayed our commit yet
+    assert _database(sessions.reader()) == "replica"
+    assert _database(sessions.reader(read_your_writes=True)) == "primary"
+    # checked again right away (not after the interval) once it may have caught up
+    states["lsn"] = 20
+    assert _database(sessions.reader(read_your_writes=True)) == "replica"
+
+
+def test_unreachable_replica_is_skipped(engines):
+    def probe(engine):
+        raise ConnectionError("replica down")
+
+    sessions = RoutingSessionFactory(sessionmaker(bind=engines["primary"]), [engines["replica"]], probe=probe)
+    assert _database(sessions.reader()) == "primary"
+    assert sessions.tracker.states[0].lag == float("inf")
+
+
+def test_parse_lsn():
+    assert parse_lsn("16/B374D848") == 0x16B374D848
+    assert parse_lsn("0/10") < parse_lsn("1/0")
+    assert parse_lsn(None) is None
+
+
+# with tests/docker-compose.yml up: TEST_PRIMARY_URL=postgresql://jlee@localhost:5429/streaming-db-local
+# TEST_REPLICA_URL=postgresql://jlee@localhost:5430/streaming-db-local
+@pytest.mark.skipif(
+    not (os.getenv("TEST_PRIMARY_URL") and os.getenv("TEST_REPLICA_URL")),
+    reason="needs a Postgres primary and a streaming replica (TEST_PRIMARY_URL / TEST_REPLICA_URL)",
+)
+def test_read_your_writes_on_postgres_streaming_replica():
+    primary = create_engine(os.environ["TEST_PRIMARY_URL"])
+    replica = create_engine(os.environ["TEST_REPLICA_URL"])
+    sessions = RoutingSessionFactory(sessionmaker(bind=primary), [replica])
+    with primary.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS replica_check (id BIGINT)"))
+    try:
+        for i in range(20):
+            session = sessions()
+            session.execute(text("INSERT INTO replica_check VALUES (:id)"), {"id": i})
+            session.commit()
+            session.close()
+
+            reader = sessions.reader(read_your_writes=True)
+            try:
+                # a replica that has not replayed the insert is never chosen
+                assert reader.execute(text("SELECT count(*) FROM replica_check WHERE id = :id"), {"id": i}).scalar() == 1
+            finally:
+                reader.close()
+
+        time.sleep(0.5)
+        reader = sessions.reader()
+        try:
+            assert reader.execute(text("SELECT pg_is_in_recovery()")).scalar() is True
+        finally:
+            reader.close()
+    finally:
+        with primary.begin() as conn:
+            conn.execute(text("DROP TABLE replica_check"))
+        primary.dispose()
+        replica.dispose()
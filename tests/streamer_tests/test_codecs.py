@@ -0,0 +1,35 @@
+# tests/streamer_tests/test_codecs.py
+import pytest
+
+from backend_streaming.streamer.codecs import get_encoder, decode_payload
+
+PAYLOAD = {
+    'score': {'home_score': 1, 'away_score': 0},
+    'projections': [{'event_id': 2762916859, 'x': 50.5, 'qualifiers': [{'qualifierId': 140, 'value': 'p3'}]}] * 50,
+}
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson", "msgpack"])
+@pytest.mark.parametrize("compression", ["none", "zstd", "gzip"])
+def test_roundtrip_through_message_properties(codec, compression):
+    pytest.importorskip({"orjson": "orjson", "msgpack": "msgpack"}.get(codec, "json"))
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+
+    encoded = get_encoder(codec, compression, threshold=0).encode(PAYLOAD)
+
+    assert encoded.content_encoding == (None if compression == "none" else compression)
+    assert decode_payload(encoded.body, encoded.content_type, encoded.content_encoding) == PAYLOAD
+
+
+def test_small_payloads_are_not_compressed():
+    encoded = get_encoder("json", "gzip", threshold=1024 * 1024).encode(PAYLOAD)
+    assert encoded.content_encoding is None
+    assert encoded.content_type == "application/json"
+
+
+def test_default_encoder_is_plain_json(monkeypatch):
+    monkeypatch.delenv("STREAMER_CODEC", raising=False)
+    monkeypatch.delenv("STREAMER_COMPRESSION", raising=False)
+    encoded = get_encoder().encode(PAYLOAD)
+    assert (encoded.content_type, encoded.content_encoding) == ("application/json", None)
@@ -0,0 +1,38 @@
+# tests/streamer_tests/test_freshness.py
+from datetime import datetime, timedelta, timezone
+
+from backend_streaming.streamer.freshness import FreshnessTags, FreshnessTracker, parse_feed_time
+
+
+def test_parse_feed_time_formats():
+    assert parse_feed_time("2024-12-30T20:07:18.992Z") == datetime(2024, 12, 30, 20, 7, 18, 992000, tzinfo=timezone.utc)
+    assert parse_feed_time("2024-12-31T03:28:08Z") == datetime(2024, 12, 31, 3, 28, 8, tzinfo=timezone.utc)
+    assert parse_feed_time(None) is None
+    assert parse_feed_time("not a timestamp") is None
+
+
+def test_tracker_records_one_sample_per_feed_event():
+    fetched_at = datetime(2024, 3, 20, 19, 0, 10, tzinfo=timezone.utc)
+    tags = FreshnessTags(fetched_at=fetched_at)
+    tags.add_feed_time("2024-03-20T19:00:00Z")
+    tags.add_feed_time("2024-03-20T19:00:05Z")
+    tags.committed_at = fetched_at + timedelta(seconds=1)
+    tags.published_at = fetched_at + timedelta(seconds=2)
+
+    tracker = FreshnessTracker(buckets=(5, 10, 15))
+    tracker.record("matchA", tags)
+
+    summary = tracker.match_summary("matchA")
+    assert summary["feed_to_publish"]["count"] == 2
+    assert summary["feed_to_publish"]["buckets"] == {"5": 0, "10": 1, "15": 1, "+Inf": 0}
+    assert summary["fetch_to_commit"]["p50"] == 1.0
+    assert summary["commit_to_publish"]["p99"] == 1.0
+    assert tracker.summary()["overall"]["feed_to_publish"]["p50"] == 7.0
+    assert tracker.summary()["overall"]["feed_to_publish"]["p99"] == 12.0
+    assert tags.to_headers()["feed_time"] == "2024-03-20T19:00:00+00:00"
+
+
+def test_tracker_skips_updates_without_publish_time():
+    tracker = FreshnessTracker()
+    tracker.record("matchA", FreshnessTags(fetched_at=datetime.now(timezone.utc)))
+    assert tracker.match_summary("matchA") is None
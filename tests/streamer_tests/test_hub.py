@@ -0,0 +1,87 @@
+# tests/streamer_tests/test_hub.py
+import pytest
+
+from backend_streaming.streamer.hub import MatchUpdateHub, SNAPSHOT, DELTA, STOP
+from backend_streaming.streamer.memory_broker import InMemoryBroker
+from backend_streaming.streamer.streamer import SingleGameStreamer
+
+
+def event(event_id, last_modified="2025-01-25T15:00:00Z"):
+    return {'match_id': 'm1', 'event_id': event_id, 'last_modified': last_modified}
+
+
+@pytest.mark.asyncio
+async def test_snapshot_then_deltas_from_broker():
+    broker = InMemoryBroker()
+    hub = MatchUpdateHub(broker=broker, load_state=lambda game_id: [event(1)])
+    client = await hub.connect('m1')
+
+    streamer = SingleGameStreamer('m1', publisher=broker)
+    await streamer.send_message('update', [event(1), event(2)])
+    await streamer.send_message('update', [event(1, "2025-01-25T15:05:00Z"), event(2)])
+    await streamer.send_message('stop', [])
+    await broker.join(hub.queue_name)
+
+    messages = [await client.next() for _ in range(4)]
+    assert [m.type for m in messages] == [SNAPSHOT, DELTA, DELTA, STOP]
+    assert [e['event_id'] for e in messages[0].events] == [1]
+    assert messages[1].events == [event(2)]
+    assert messages[2].events == [event(1, "2025-01-25T15:05:00Z")]
+    assert await client.next() is None
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_message_payload_and_removed_events_are_applied():
+    broker = InMemoryBroker()
+    hub = MatchUpdateHub(broker=broker)
+    client = await hub.connect('m1')
+
+    streamer = SingleGameStreamer('m1', publisher=broker, provider='whoscored')
+    await streamer.send_message('update', {'projections': [event(1), event(2)]})
+    # the last changes of the match come with the stop message
+    await streamer.send_message('stop', {'projections': [event(3)], 'removed_event_ids': [1, 99]})
+    await broker.join(hub.queue_name)
+
+    messages = [await client.next() for _ in range(4)]
+    assert [m.type for m in messages] == [SNAPSHOT, DELTA, DELTA, STOP]
+    assert messages[2].events == [event(3)] and messages[2].removed_event_ids == [1]
+    assert '"removed_event_ids":[1]' in messages[2].json
+    assert await client.next() is None
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_rows_loaded_with_a_version_equal_the_same_broker_rows():
+    # match_projection rows carry the version stamped by save_match_state, the update rows don't
+    hub = MatchUpdateHub(broker=InMemoryBroker(), load_state=lambda game_id: [{**event(1), 'version': 3}, {**event(2), 'version': 3}])
+    client = await hub.connect('m1')
+    assert (await client.next()).type == SNAPSHOT
+
+    hub.apply_update('m1', [event(1), {**event(2), 'version': None}])
+    assert client.queue.empty()
+    hub.apply_update('m1', [event(1), event(2, "2025-01-25T15:05:00Z")])
+    delta = await client.next()
+    assert delta.type == DELTA and delta.events == [event(2, "2025-01-25T15:05:00Z")]
+    await hub.stop()
+
+
+def test_removed_events_leave_the_snapshot():
+    hub = MatchUpdateHub(broker=InMemoryBroker())
+    hub.apply_update('m1', [event(1), event(2)])
+    hub.apply_update('m1', [], removed_event_ids=[2])
+    assert [e['event_id'] for e in hub.snapshot('m1').events] == [1]
+
+
+@pytest.mark.asyncio
+async def test_slow_client_is_dropped_without_affecting_others():
+    hub = MatchUpdateHub(broker=InMemoryBroker(), client_buffer_size=3)
+    slow, fast = await hub.connect('m1'), await hub.connect('m1')
+
+    for i in range(5):
+        hub.apply_update('m1', [event(i)])
+        assert (await fast.next()).type in (SNAPSHOT, DELTA)
+
+    assert slow.dropped and await slow.next() is None
+    assert hub.client_count == 1 and hub.stats['dropped_clients'] == 1
+    await hub.stop()
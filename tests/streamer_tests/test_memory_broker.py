@@ -0,0 +1,60 @@
+# tests/streamer_tests/test_memory_broker.py
+import asyncio
+import pytest
+
+from backend_streaming.streamer.broker import OutgoingMessage, PublishError
+from backend_streaming.streamer.codecs import decode_payload
+from backend_streaming.streamer.memory_broker import InMemoryBroker, topic_matches
+from backend_streaming.streamer.streamer import SingleGameStreamer
+
+
+@pytest.mark.parametrize("binding_key, routing_key, expected", [
+    ("opta.match1.*", "opta.match1.update", True),
+    ("opta.match1.*", "opta.match2.update", False),
+    ("*.*.stop", "whoscored.123.stop", True),
+    ("#", "opta.match1.update", True),
+    ("opta.#", "opta", True),
+    ("opta.#.stop", "opta.match1.stop", True),
+    ("*", "opta.match1", False),
+])
+def test_topic_matches(binding_key, routing_key, expected):
+    assert topic_matches(binding_key, routing_key) is expected
+
+
+@pytest.mark.asyncio
+async def test_streamer_publishes_to_bound_queues():
+    broker = InMemoryBroker()
+    streamer = SingleGameStreamer("match1", publisher=broker)
+    await streamer.connect()
+    await broker.bind_queue("stops", streamer.exchange_name, "*.*.stop")
+
+    await streamer.send_message(streamer.PROGRESS_MESSAGE_TYPE, [{'event_id': 1}])
+    await streamer.send_message(streamer.STOP_MESSAGE_TYPE, [])
+
+    # legacy queue gets everything, the 'stops' queue only the end of game
+    update = await broker.get(SingleGameStreamer.QUEUE_NAME, timeout=1)
+    assert update.routing_key == "opta.match1.update"
+    assert decode_payload(update.body, update.content_type, update.content_encoding) == [{'event_id': 1}]
+    assert broker.qsize(SingleGameStreamer.QUEUE_NAME) == 1
+    assert (await broker.get("stops", timeout=1)).headers['message_type'] == 'stop'
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_or_blocks():
+    message = OutgoingMessage(routing_key="q", body=b"{}")
+
+    rejecting = InMemoryBroker(max_queue_size=1, overflow='reject')
+    await rejecting.declare_queue("q")
+    await rejecting.publish(message)
+    with pytest.raises(PublishError):
+        await rejecting.publish(message)
+
+    blocking = InMemoryBroker(max_queue_size=1)
+    await blocking.declare_queue("q")
+    await blocking.publish(message)
+    pending = asyncio.create_task(blocking.publish(message))
+    await asyncio.sleep(0)
+    assert not pending.done()
+    await blocking.get("q")
+    await asyncio.wait_for(pending, timeout=1)
+    assert blocking.stats.blocked == 1
@@ -0,0 +1,95 @@
+# tests/streamer_tests/test_outbox_relay.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend_streaming.providers.opta.infra.models import Base, OutboxMessageModel
+from backend_streaming.providers.opta.infra.repo.outbox import OutboxRepository
+from backend_streaming.streamer.freshness import FreshnessTags, utc_now
+from backend_streaming.streamer.outbox_relay import OutboxRelay
+from backend_streaming.streamer.publisher import OutgoingMessage, PublishError
+
+
+class FakePublisher:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.published = []
+
+    async def declare_exchange(self, *args, **kwargs):
+        pass
+
+    async def bind_queue(self, *args, **kwargs):
+        pass
+
+    async def publish_batch(self, messages):
+        if self.fail:
+            raise PublishError("nack")
+        self.published.extend(messages)
+
+
+@pytest.fixture
+def outbox_repo(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(engine, tables=[OutboxMessageModel.__table__])
+    return OutboxRepository(session_factory=sessionmaker(bind=engine))
+
+
+def enqueue(repo: OutboxRepository, n: int):
+    rows = []
+    for i in range(n):
+        message = OutgoingMessage(routing_key="opta.match1.update", body=f"[{i}]".encode(), exchange='match_events')
+        rows.append(OutboxRepository.to_model("match1", message, FreshnessTags(fetched_at=utc_now())))
+    repo.enqueue(rows)
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_in_order_and_marks_rows(outbox_repo):
+    enqueue(outbox_repo, 5)
+    publisher = FakePublisher()
+    relay = OutboxRelay(outbox_repo, publisher=publisher, batch_size=3)
+
+    assert await relay.drain_once() == 3
+    assert await relay.drain_once() == 2
+    assert await relay.drain_once() == 0
+
+    assert [m.body for m in publisher.published] == [f"[{i}]".encode() for i in range(5)]
+    assert all('published_at' in m.headers for m in publisher.published)
+    assert outbox_repo.count_pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_keeps_rows_for_retry(outbox_repo):
+    enqueue(outbox_repo, 2)
+    relay = OutboxRelay(outbox_repo, publisher=FakePublisher(fail=True))
+
+    with pytest.raises(PublishError):
+        await relay.drain_once()
+    assert outbox_repo.count_pending() == 2
+
+    relay.publisher = FakePublisher()
+    assert await relay.drain_once() == 2
+    session = outbox_repo.session_factory()
+    assert [row.attempts for row in session.query(OutboxMessageModel).all()] == [2, 2]
+    session.close()
+
+
+@pytest.mark.asyncio
+async def test_purge_deletes_only_rows_published_before_the_retention(outbox_repo):
+    enqueue(outbox_repo, 3)
+    relay = OutboxRelay(outbox_repo, publisher=FakePublisher(), batch_size=2, retention=timedelta(hours=1))
+    assert await relay.drain_once() == 2
+
+    session = outbox_repo.session_factory()
+    old = session.query(OutboxMessageModel).order_by(OutboxMessageModel.id).first()
+    old.published_on = datetime.utcnow() - timedelta(hours=2)
+    session.commit()
+    session.close()
+
+    assert await relay.purge_once() == 1
+    # the recently published row and the pending one are kept
+    session = outbox_repo.session_factory()
+    assert session.query(OutboxMessageModel).count() == 2
+    session.close()
+    assert outbox_repo.count_pending() == 1
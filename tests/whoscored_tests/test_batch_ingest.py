@@ -0,0 +1,74 @@
+# tests/whoscored_tests/test_batch_ingest.py
+import json
+
+import pytest
+
+from backend_streaming.config.executor import process_executor
+from backend_streaming.providers.whoscored.app.services.batch_ingest import ingest_page_sources
+
+
+def page(match_id, n_events):
+    data = {
+        'score': '1 : 0',
+        'events': [{'id': match_id * 1000 + i, 'minute': i} for i in range(n_events)],
+    }
+    return f"<script>var args = {{ matchId:{match_id}, matchCentreData: {json.dumps(data)}, formationIdNameMappings: {{}} }};</script>"
+
+
+closed = []
+
+
+class FakeScraper:
+    def __init__(self, match_id):
+        if match_id == '13':
+            raise KeyError(match_id)
+        self.ws_to_opta_mapping = {match_id: f"opta{match_id}"}
+        self.match_id = match_id
+
+    def fetch_events(self, data):
+        self.json_data = data
+        return data['events']
+
+    def get_score(self):
+        return self.json_data['score']
+
+    def build_player_data(self):
+        return [{'player_id': f"p{self.match_id}"}]
+
+    def extract_lineup(self):
+        return {}
+
+    def build_projections(self, events):
+        return [{'match_id': f"opta{self.match_id}", 'event_id': event['id']} for event in events]
+
+    def close(self):
+        closed.append(self.match_id)
+
+
+@pytest.fixture
+def writes():
+    written = []
+    yield written
+    process_executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_batch_is_parsed_built_and_written_once(writes):
+    pages = [page(1, 3), page(2, 5), "<html>no match data</html>", page(1, 3), page(13, 1)]
+
+    response = await ingest_page_sources(pages, scraper_factory=FakeScraper, write=writes.append)
+
+    games = response['games']
+    assert [game['status'] for game in games] == ['ok', 'ok', 'error', 'error', 'error']
+    assert [game['opta_game_id'] for game in games[:2]] == ['opta1', 'opta2']
+    assert [game['events'] for game in games[:2]] == [3, 5]
+    assert 'matchId' in games[2]['error'] and 'Duplicate' in games[3]['error'] and 'KeyError' in games[4]['error']
+    assert set(games[0]['timings_ms']) == {'parse', 'build'} and games[0]['payload'] is None
+    assert set(response['timings_ms']) == {'parse', 'build', 'write', 'total'}
+    # the game loggers are closed once built
+    assert sorted(closed) == ['1', '2']
+
+    # one write with the payloads of every game built
+    assert len(writes) == 1
+    assert [projection['event_id'] for payload in writes[0] for projection in payload['projections']] == \
+        [1000, 1001, 1002, 2000, 2001, 2002, 2003, 2004]
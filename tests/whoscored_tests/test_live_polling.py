@@ -0,0 +1,147 @@
+# tests/whoscored_tests/test_live_polling.py
+import copy
+import logging
+
+import pytest
+
+from backend_streaming.streamer.codecs import decode_payload
+from backend_streaming.streamer.memory_broker import InMemoryBroker
+from backend_streaming.streamer.streamer import SingleGameStreamer
+from backend_streaming.providers.whoscored.app.services.live_diff import diff_payload, is_end_of_game
+from backend_streaming.providers.whoscored.app.services.run_scraper import process_game
+
+
+def event(event_id, minute, period=2, **fields):
+    return {'id': event_id, 'minute': minute, 'period': {'value': period}, **fields}
+
+
+class FakeScraper:
+    """SingleGameScraper over a list of matchCentreData (one per fetch), recording what is saved."""
+    _is_manual_scraper = False
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.ws_to_opta_mapping = {'1': 'opta1'}
+        self.json_data = None
+        self.saved_projections = []
+        self.saved_players = []
+
+    def fetch_events(self, page=None):
+        self.json_data = page if page is not None else self.pages.pop(0)
+        return self.json_data['events']
+
+    def get_score(self):
+        home, away = self.json_data['score'].split(':')
+        return {'home_score': int(home), 'away_score': int(away)}
+
+    def build_player_data(self):
+        return [{'player_id': f"p{player_id}", 'match_name': name} for player_id, name in self.json_data['players'].items()]
+
+    def extract_lineup(self):
+        return {'home': self.json_data['players'].get('1')}
+
+    def build_projections(self, events):
+        return [
+            {'match_id': 'opta1', 'event_id': e['id'], 'time_min': e['minute'], 'x': e.get('x'), 'last_modified': str(id(events))}
+            for e in events
+        ]
+
+    def upsert_players(self, player_data):
+        self.saved_players.append([row['player_id'] for row in player_data])
+
+    def save_projection_rows(self, projections):
+        self.saved_projections.append([row['event_id'] for row in projections])
+        self.saved_rows = projections
+
+
+async def published(broker):
+    messages = []
+    while broker.qsize(SingleGameStreamer.QUEUE_NAME):
+        message = await broker.get(SingleGameStreamer.QUEUE_NAME, timeout=1)
+        messages.append((message.headers['message_type'], decode_payload(message.body, message.content_type, message.content_encoding)))
+    return messages
+
+
+def test_end_of_game_detection():
+    assert not is_end_of_game({'elapsed': "67'", 'events': [event(1, 67)]})
+    assert is_end_of_game({'elapsed': 'FT', 'events': []})
+    # end of the second half (extra time may follow), then the post game period
+    assert not is_end_of_game({'events': [event(1, 90, type={'value': 30})]})
+    assert is_end_of_game({'events': [event(1, 90), event(2, 90, period=14)]})
+
+
+def test_diff_ignores_fetch_timestamps():
+    previous = {
+        'score': {'home_score': 0, 'away_score': 0},
+        'projections': [{'event_id': 1, 'x': 1.0, 'last_modified': 'a'}, {'event_id': 2, 'x': 2.0, 'last_modified': 'a'}],
+        'player_data': [{'player_id': 'p1', 'shirt_number': 9}],
+        'lineup_info': {'home': 'x'},
+    }
+    current = copy.deepcopy(previous)
+    for projection in current['projections']:
+        projection['last_modified'] = 'b'
+    assert diff_payload(previous, current).empty
+
+    current['projections'] = [{'event_id': 2, 'x': 2.5, 'last_modified': 'b'}, {'event_id': 3, 'x': 0, 'last_modified': 'b'}]
+    current['score'] = {'home_score': 1, 'away_score': 0}
+    diff = diff_payload(previous, current)
+    assert [p['event_id'] for p in diff.projections] == [2, 3]
+    assert diff.removed_event_ids == [1]
+    assert diff.payload().keys() == {'score', 'projections', 'removed_event_ids'}
+    assert diff_payload(None, current).payload().keys() == {'score', 'projections', 'player_data', 'lineup_info'}
+
+
+@pytest.mark.asyncio
+async def test_live_game_saves_and_publishes_only_the_changes():
+    players = {'1': 'A Player', '2': 'B Player'}
+    first = {'score': '0:0', 'elapsed': "88'", 'players': players, 'events': [event(1, 10), event(2, 88)]}
+    unchanged = copy.deepcopy(first)
+    goal = {**copy.deepcopy(first), 'score': '1:0', 'events': [event(1, 10), event(2, 88, x=50.0), event(3, 90)]}
+    final = {**copy.deepcopy(goal), 'elapsed': 'FT', 'players': {**players, '3': 'Sub'}}
+    scraper = FakeScraper([unchanged, goal, final])
+    broker = InMemoryBroker()
+
+    result = await process_game('1', scraper, match_centre_data=first, broker=broker, live=True, poll_interval=0)
+
+    assert scraper.saved_projections == [[1, 2], [], [2, 3], []]
+    assert scraper.saved_players == [['p1', 'p2'], [], [], ['p3']]
+    assert [p['event_id'] for p in result['payloads'][-1]['projections']] == [1, 2, 3]
+
+    messages = await published(broker)
+    # nothing is published for the unchanged fetch, the changes of the last one are an update
+    assert [message_type for message_type, _ in messages] == ['update', 'update', 'update', 'stop']
+    assert messages[1][1].keys() == {'score', 'projections'}
+    assert messages[2][1].keys() == {'player_data'}
+    assert messages[3][1] == {}
+
+
+@pytest.mark.asyncio
+async def test_single_fetch_publishes_the_game_then_stops():
+    page = {'score': '2:1', 'elapsed': 'FT', 'players': {'1': 'A Player'}, 'events': [event(1, 10), event(2, 80)]}
+    scraper = FakeScraper([])
+    broker = InMemoryBroker()
+
+    await process_game('1', scraper, match_centre_data=page, broker=broker)
+
+    messages = await published(broker)
+    assert [message_type for message_type, _ in messages] == ['update', 'stop']
+    assert [p['event_id'] for p in messages[0][1]['projections']] == [1, 2]
+    assert messages[0][1]['score'] == {'home_score': 2, 'away_score': 1}
+    # the game logger is closed with the game
+    assert not logging.getLogger('game.1').handlers
+
+
+@pytest.mark.asyncio
+async def test_removed_events_are_saved_as_deleted_and_published():
+    first = {'score': '0:0', 'elapsed': "50'", 'players': {'1': 'A Player'}, 'events': [event(1, 10), event(2, 50)]}
+    final = {**copy.deepcopy(first), 'elapsed': 'FT', 'events': [event(1, 10)]}
+    scraper = FakeScraper([final])
+    broker = InMemoryBroker()
+
+    await process_game('1', scraper, match_centre_data=first, broker=broker, live=True, poll_interval=0)
+
+    assert scraper.saved_projections == [[1, 2], [2]]
+    assert scraper.saved_rows[0]['type_id'] == 43
+    messages = await published(broker)
+    assert [message_type for message_type, _ in messages] == ['update', 'update', 'stop']
+    assert messages[1][1] == {'removed_event_ids': [2]}
@@ -0,0 +1,66 @@
+# tests/whoscored_tests/test_mapping_cache.py
+import os
+import json
+import threading
+
+import pytest
+
+from backend_streaming.providers.whoscored.infra.repos.mapping_cache import MappingCache
+
+
+def write(path, data, mtime_ns):
+    path.write_text(json.dumps(data))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_file_is_parsed_again_only_when_it_changes(tmp_path):
+    path = tmp_path / "standard_team_name.json"
+    write(path, {"Arsenal": "Arsenal FC"}, 1_000_000_000)
+    cache = MappingCache(check_interval=0)
+
+    data = cache.get(path)
+    assert data["Arsenal"] == "Arsenal FC"
+    assert cache.get(path) is data
+    assert cache.loads == 1
+
+    write(path, {"Arsenal": "Arsenal FC", "Chelsea": "Chelsea FC"}, 2_000_000_000)
+    assert cache.get(path)["Chelsea"] == "Chelsea FC"
+    assert cache.get(path) is not data and "Chelsea" not in data
+    assert cache.loads == 2
+    with pytest.raises(TypeError):
+        cache.get(path)["Arsenal"] = "changed"
+
+
+def test_file_is_not_checked_within_the_interval(tmp_path):
+    path = tmp_path / "mapping.json"
+    write(path, {"1": "a"}, 1_000_000_000)
+    cache = MappingCache(check_interval=3600)
+
+    assert cache.get(path) == {"1": "a"}
+    write(path, {"1": "b"}, 2_000_000_000)
+    assert cache.get(path) == {"1": "a"}
+    cache.invalidate(path)
+    assert cache.get(path) == {"1": "b"}
+
+    with pytest.raises(FileNotFoundError):
+        cache.get(tmp_path / "missing.json")
+
+
+def test_concurrent_readers_share_one_load(tmp_path):
+    path = tmp_path / "mapping.json"
+    write(path, {str(i): f"t{i}" for i in range(1000)}, 1_000_000_000)
+    cache = MappingCache(check_interval=0)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def read():
+        barrier.wait()
+        results.append(cache.get(path)["500"])
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["t500"] * 8
+    assert cache.loads == 1
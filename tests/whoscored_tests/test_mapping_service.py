@@ -0,0 +1,149 @@
+# tests/whoscored_tests/test_mapping_service.py
+import os
+import itertools
+import threading
+
+import pytest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend_streaming.providers.opta.infra.models import IdMappingModel
+from backend_streaming.providers.whoscored.app.services.mapping_service import MappingService
+from backend_streaming.providers.whoscored.infra.repos.mapping_repo import MappingRepository
+
+
+class MemoryMappingRepository:
+    """id_mappings in a dict, with the insert-if-absent semantics (and a count of the queries)."""
+
+    def __init__(self):
+        self.rows = {}
+        self.queries = 0
+        self.lock = threading.Lock()
+
+    def load(self, kind):
+        self.queries += 1
+        return {source: target for (k, source), target in self.rows.items() if k == kind}
+
+    def find(self, kind, source_ids):
+        self.queries += 1
+        return {source: self.rows[kind, source] for source in source_ids if (kind, source) in self.rows}
+
+    def find_sources(self, kind, target_ids):
+        self.queries += 1
+        return {target: source for (k, source), target in self.rows.items() if k == kind and target in target_ids}
+
+    def insert_if_absent(self, kind, mappings):
+        self.queries += 1
+        with self.lock:
+            used = {target for (k, _), target in self.rows.items() if k == kind}
+            for source, target in mappings.items():
+                if (kind, source) not in self.rows and target not in used:
+                    self.rows[kind, source] = target
+                    used.add(target)
+            return {source: self.rows[kind, source] for source in mappings if (kind, source) in self.rows}
+
+
+def test_lookups_are_served_from_the_cache():
+    repo = MemoryMappingRepository()
+    repo.rows = {("player", "1"): "a", ("player", "2"): "b"}
+    mappings = MappingService(repo)
+
+    assert mappings.get("player", 1) == "a"
+    assert mappings.source_of("player", "b") == "2"
+    assert mappings.mapping("player")["2"] == "b"
+    assert repo.queries == 1
+
+    # added by another worker after the load: found in the table, then cached
+    repo.rows["player", "3"] = "c"
+    assert mappings.get("player", "3") == "c"
+    assert mappings.get("player", "3") == "c"
+    assert repo.queries == 2
+    with pytest.raises(ValueError):
+        mappings.get("referee", "1")
+
+
+def test_mapping_view_is_shared_and_falls_back_to_the_table():
+    repo = MemoryMappingRepository()
+    repo.rows = {("match", "1"): "a"}
+    mappings = MappingService(repo)
+
+    view = mappings.mapping("match")
+    assert mappings.mapping("match") is view
+    assert view[1] == "a" and len(view) == 1
+    repo.rows["match", "2"] = "b"
+    assert view["2"] == "b"
+    assert mappings.source_of("match", "b") == "2"
+    assert "2" in view
+    # get() and `in` only read the cache, unknown ids are not queried
+    repo.rows["match", "3"] = "c"
+    assert view.get("3", "missing") == "missing" and "3" not in view
+    assert repo.queries == 2  # the load and the miss of view["2"]
+
+
+def test_ensure_stores_new_ids_in_one_batch():
+    repo = MemoryMappingRepository()
+    repo.rows = {("team", "1"): "a"}
+    mappings = MappingService(repo)
+    counter = itertools.count()
+
+    ids, created = mappings.ensure("team", ["1", "2", 3, "2"], lambda source: f"new{next(counter)}")
+    assert ids == {"1": "a", "2": "new0", "3": "new1"}
+    assert created == {"2", "3"}
+    assert repo.queries == 2  # the load and one insert
+    assert mappings.ensure("team", ["2", "3"], lambda source: "unused") == ({"2": "new0", "3": "new1"}, set())
+
+
+def test_concurrent_workers_agree_on_one_id():
+    repo = MemoryMappingRepository()
+    workers = [MappingService(repo) for _ in range(2)]
+    for worker in workers:
+        worker.mapping("player")  # both loaded before either inserts
+
+    first, _ = workers[0].ensure("player", ["7"], lambda source: "from_worker_0")
+    second, created = workers[1].ensure("player", ["7"], lambda source: "from_worker_1")
+    assert first == second == {"7": "from_worker_0"}
+    assert created == set()
+
+
+def test_colliding_new_ids_are_minted_again():
+    repo = MemoryMappingRepository()
+    repo.rows = {("match", "1"): "taken"}
+    proposals = iter(["taken", "free"])
+    ids, created = MappingService(repo).ensure("match", ["2"], lambda source: next(proposals))
+    assert ids == {"2": "free"} and created == {"2"}
+
+
+# with tests/docker-compose.yml up: TEST_PRIMARY_URL=postgresql://jlee@localhost:5429/streaming-db-local
+@pytest.mark.skipif(not os.getenv("TEST_PRIMARY_URL"), reason="needs a Postgres database (TEST_PRIMARY_URL)")
+def test_insert_if_absent_on_postgres_under_concurrency():
+    schema = "test_mapping_repo"
+    engine = create_engine(os.environ["TEST_PRIMARY_URL"], connect_args={"options": f"-csearch_path={schema}"})
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    IdMappingModel.__table__.create(engine)
+    try:
+        repo = MappingRepository(sessionmaker(bind=engine))
+        results = []
+        barrier = threading.Barrier(4)
+
+        def worker(n):
+            barrier.wait()
+            ids, _ = MappingService(repo).ensure("player", [str(i) for i in range(200)], lambda source: f"{source}-{n}")
+            results.append(ids)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # every worker got the same id for every player, and only one was stored
+        assert len(results) == 4 and all(ids == results[0] for ids in results)
+        assert repo.load("player") == results[0]
+        assert repo.find_sources("player", [results[0]["5"]]) == {results[0]["5"]: "5"}
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        engine.dispose()
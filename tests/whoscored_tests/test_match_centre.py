@@ -0,0 +1,76 @@
+# tests/whoscored_tests/test_match_centre.py
+import json
+
+import pytest
+
+from backend_streaming.providers.whoscored.app.services.match_centre import (
+    decode_object, find_match_centre, load_match_centre, parse_page_source
+)
+
+MATCH_CENTRE = {
+    "playerIdNameDictionary": {"1": "Bob \"The Brace\" {Smith}", "2": "Back\\slash }"},
+    "events": [{"id": 1, "qualifiers": [{"type": {"displayName": "}}{"}, "value": "a \\\" }"}]}],
+    "home": {"teamId": 1, "name": "{Home}"},
+    "away": {"teamId": 2, "name": "Awayé"},
+}
+
+
+# as on the real pages: accented names, not \u escapes
+ACCENTED = {
+    "playerIdNameDictionary": {"1": "Thomas Müller", "2": "Martin Ødegaard", "3": "Đorđe Petrović 𝄞 }"},
+    "events": [{"id": 1, "qualifiers": [{"value": "Señor {é}"}]}],
+}
+
+
+def _page(data=MATCH_CENTRE, ensure_ascii=True):
+    return (
+        "<script>require.config.params['args'] = {\n"
+        "    matchId:1821372,\n"
+        f"    matchCentreData: {json.dumps(data, ensure_ascii=ensure_ascii)},\n"
+        "    matchCentreEventTypeJson: {\"shotSixYardBox\": 0},\n"
+        "    formationIdNameMappings: {\"2\": \"442\"}\n"
+        "};</script>"
+    )
+
+
+def test_braces_inside_strings_do_not_end_the_object():
+    page = _page()
+    data, end = decode_object(page, find_match_centre(page))
+    assert data == MATCH_CENTRE
+    assert page[end:].startswith(",\n    matchCentreEventTypeJson")
+    assert parse_page_source(page) == ("1821372", MATCH_CENTRE)
+
+
+def test_bytes_pages_are_decoded_in_place():
+    assert parse_page_source(_page().encode()) == ("1821372", MATCH_CENTRE)
+
+
+def test_non_ascii_pages():
+    page = _page(ACCENTED, ensure_ascii=False)
+    assert parse_page_source(page) == ("1821372", ACCENTED)
+
+    # the end offset of a bytes page is a byte offset (the characters before it are up to 4 bytes long)
+    raw = page.encode()
+    data, end = decode_object(raw, find_match_centre(raw))
+    assert data == ACCENTED
+    assert raw[end:].startswith(b",\n    matchCentreEventTypeJson")
+    assert parse_page_source(raw) == ("1821372", ACCENTED)
+    assert load_match_centre(json.dumps(ACCENTED, ensure_ascii=False).encode() + b",\n") == ACCENTED
+
+
+def test_saved_object_with_trailing_comma():
+    text = json.dumps(MATCH_CENTRE) + ",\n"
+    assert load_match_centre(text) == MATCH_CENTRE
+    assert load_match_centre(_page()) == MATCH_CENTRE
+
+
+def test_errors():
+    with pytest.raises(ValueError, match="matchCentreData"):
+        parse_page_source("matchId:1, nothing else")
+    with pytest.raises(ValueError, match="matchId"):
+        parse_page_source("matchCentreData: {}")
+    # unterminated: the closing braces are inside a string
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        decode_object('{"a": {"b": "}"}', 0)
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        load_match_centre("{'single': 'quotes'}")
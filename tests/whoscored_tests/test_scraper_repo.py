@@ -0,0 +1,58 @@
+# tests/whoscored_tests/test_scraper_repo.py
+import os
+import logging
+
+import pytest
+
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.orm import sessionmaker
+
+from backend_streaming.providers.opta.infra.models import PlayerModel, TeamModel
+from backend_streaming.providers.whoscored.infra.repos.scraper_repo import ScraperRepository
+
+SCHEMA = "test_scraper_repo"
+
+
+# the upserts are postgres statements (ON CONFLICT), e.g. with tests/docker-compose.yml up:
+# TEST_PRIMARY_URL=postgresql://jlee@localhost:5429/streaming-db-local
+@pytest.fixture
+def postgres():
+    url = os.getenv("TEST_PRIMARY_URL")
+    if not url:
+        pytest.skip("needs a Postgres database (TEST_PRIMARY_URL)")
+    engine = create_engine(url, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    TeamModel.metadata.create_all(engine, tables=[TeamModel.__table__, PlayerModel.__table__])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    yield sessionmaker(bind=engine), statements
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+def test_players_of_a_match_are_upserted_in_one_statement(postgres):
+    session_factory, statements = postgres
+    repo = ScraperRepository(logging.getLogger(__name__))
+    repo.upsert_teams(session_factory(), [{"team_id": "t1", "name": "Home"}, {"team_id": "t2", "name": "Away"}])
+
+    players = [
+        {"player_id": f"p{i}", "team_id": f"t{i % 2 + 1}", "match_name": f"Player {i}", "shirt_number": i}
+        for i in range(40)
+    ]
+    statements.clear()
+    # a duplicate of p0 in the same batch: the last one wins
+    assert repo.upsert_players(session_factory(), players + [{**players[0], "shirt_number": 99}]) == 40
+    assert len([s for s in statements if s.lstrip().upper().startswith("INSERT")]) == 1
+
+    # updates go through the same statement
+    repo.upsert_players(session_factory(), [{**players[1], "match_name": "Renamed"}])
+    session = session_factory()
+    rows = {p.player_id: p for p in session.execute(select(PlayerModel)).scalars()}
+    session.close()
+    assert len(rows) == 40
+    assert rows["p0"].shirt_number == 99
+    assert rows["p1"].match_name == "Renamed"
+    assert rows["p2"].nationality == "PLACEHOLDER"